@@ -0,0 +1,120 @@
+"""
+Boilerplate stripping on a synthetic site
+
+Generates article pages that share a header with navigation, a cookie banner, a
+sidebar of popular posts and a footer, as most sites do. Every page is cleaned with
+and without the site's learned template; the report shows the markdown words per page,
+the share of them removed, the cleaning time per page, and the number of pages that
+lost any of their article text. Pages cleaned before `min_pages` were learned are left
+out of the averages.
+
+Usage:
+    python benchmarks/bench_boilerplate.py --pages 200 --min-share 0.5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+NAVIGATION = "".join(
+    f'<li><a href="/section/{i}">Section {i} news and analysis</a></li>'
+    for i in range(12)
+)
+
+SHELL = """<!DOCTYPE html>
+<html><head><title>{title}</title></head><body>
+<div class="cookie-banner"><p>We use cookies to give you the best experience on our
+website. By continuing to browse you agree to our use of cookies.</p>
+<button>Accept all cookies</button></div>
+<header><nav><ul>{navigation}</ul></nav></header>
+<main><article><h1>{title}</h1>{article}</article>
+<aside><h2>Popular this week</h2><ul>{popular}</ul></aside></main>
+<footer><p>Copyright 2024 Example Media Group. All rights reserved. Reproduction
+without permission is prohibited.</p><p>About us, careers, advertise with us, contact,
+terms of use and privacy policy.</p></footer></body></html>"""
+
+
+def make_site(pages):
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    popular = "".join(
+        f'<li><a href="/post/{i}">Popular post number {i} that everyone reads</a></li>'
+        for i in range(6)
+    )
+    site = []
+    for index in range(pages):
+        paragraphs = [
+            " ".join(rng.choice(vocabulary) for _ in range(rng.randint(40, 120)))
+            for _ in range(rng.randint(3, 8))
+        ]
+        html = SHELL.format(
+            title=f"Article {index}",
+            navigation=NAVIGATION,
+            article="".join(f"<p>{paragraph}</p>" for paragraph in paragraphs),
+            popular=popular,
+        )
+        site.append((f"https://example.com/article/{index}", html, paragraphs))
+    return site
+
+
+def _load_web_modules():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import boilerplate, html_cleaner
+
+    return boilerplate, html_cleaner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--min-pages", type=int, default=5)
+    parser.add_argument("--min-share", type=float, default=0.5)
+    args = parser.parse_args()
+
+    boilerplate, html_cleaner = _load_web_modules()
+    site = make_site(args.pages)
+    store = boilerplate.BoilerplateStore(
+        tempfile.mkdtemp(), min_pages=args.min_pages, min_share=args.min_share
+    )
+
+    print(
+        f"{'template':>8} {'pages':>6} {'words/page':>11} {'removed':>8} "
+        f"{'ms/page':>8} {'lost text':>10}"
+    )
+    baseline = None
+    for use_template in (False, True):
+        words, seconds, lost, measured = 0, 0.0, 0, 0
+        for index, (url, html, paragraphs) in enumerate(site):
+            template = store.template(url) if use_template else None
+            start = time.perf_counter()
+            result = html_cleaner.clean_html(url, html, 5, template=template)
+            elapsed = time.perf_counter() - start
+            if index < args.min_pages:
+                continue
+            measured += 1
+            seconds += elapsed
+            markdown = " ".join(result["markdown"].split())
+            words += len(markdown.split())
+            if any(paragraph not in markdown for paragraph in paragraphs):
+                lost += 1
+        words_per_page = words / measured
+        baseline = baseline or words_per_page
+        print(
+            f"{'on' if use_template else 'off':>8} {measured:>6} "
+            f"{words_per_page:>11.0f} {1 - words_per_page / baseline:>8.1%} "
+            f"{seconds / measured * 1000:>8.2f} {lost:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Browser pool throughput against a local HTTP fixture server
+
+Crawls the same set of fixture pages with pools of increasing size and reports pages
+per second. Every fixture page sets a cookie and a localStorage entry and echoes back
+what the browser sent, so any state leaking from one page load into the next shows up
+as contamination.
+
+Usage:
+    python benchmarks/bench_browser_pool.py --pages 64 --sizes 1 2 4 --latency-ms 200
+"""
+
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Fixture {index}</title></head>
+<body>
+<p id="cookie">cookie sent: [{cookie}]</p>
+<p id="storage"></p>
+<script>
+document.getElementById("storage").textContent =
+    "storage seen: [" + (localStorage.getItem("visitor") || "") + "]";
+localStorage.setItem("visitor", "{index}");
+</script>
+<p>{filler}</p>
+</body></html>"""
+
+
+def make_handler(latency):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            match = re.match(r"/page/(\d+)", self.path)
+            if not match:
+                self.send_error(404)
+                return
+            # Stands in for server and network time, which the pool overlaps
+            time.sleep(latency)
+            index = match.group(1)
+            body = PAGE.format(
+                index=index,
+                cookie=self.headers.get("Cookie", ""),
+                filler="lorem ipsum dolor sit amet " * 200,
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Set-Cookie", f"visitor={index}; Path=/")
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FixtureHandler
+
+
+def _load_crawler_strategy():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import crawler_strategy
+
+    return crawler_strategy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=64)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--max-pages", type=int, default=20, help="Pages per driver")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [
+        f"http://127.0.0.1:{server.server_port}/page/{i}" for i in range(args.pages)
+    ]
+
+    crawler_strategy = _load_crawler_strategy()
+    print(f"{'pool':>5} {'pages/s':>8} {'started':>8} {'recycled':>9} {'leaks':>6}")
+    for size in args.sizes:
+        strategy = crawler_strategy.LocalSeleniumCrawlerStrategy(
+            pool_settings={"size": size, "max_pages": args.max_pages}
+        )
+        strategy.pool.start(size)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            pages = list(executor.map(strategy.crawl, urls))
+        elapsed = time.perf_counter() - start
+
+        leaks = sum(
+            1
+            for html in pages
+            if "cookie sent: []" not in html or "storage seen: []" not in html
+        )
+        stats = strategy.pool.stats()
+        print(
+            f"{size:>5} {len(urls) / elapsed:>8.2f} {stats['started']:>8} "
+            f"{stats['recycled']:>9} {leaks:>6}"
+        )
+        strategy.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
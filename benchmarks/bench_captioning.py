@@ -0,0 +1,84 @@
+"""
+Batched Florence-2 captioning against one generate call per image
+
+Captions every fixture image once with run_example (N single calls) and once with
+run_batch for every batch size, and reports the wall time, images per second and how
+many batched captions match the single-call caption exactly.
+
+Usage:
+    python benchmarks/bench_captioning.py --fixtures /path/to/images
+    python benchmarks/bench_captioning.py --fixtures /path/to/images --batch-sizes 4 8 16
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import torch
+from PIL import Image
+from transformers import AutoProcessor
+
+from omniparse.image.process import (
+    CAPTION_BATCH_SIZE,
+    CAPTION_TASK_PROMPTS,
+    load_vision_model,
+    run_batch,
+    run_example,
+)
+
+
+def load_fixtures(fixtures_dir):
+    paths = sorted(glob.glob(os.path.join(fixtures_dir, "*")))
+    return [Image.open(path).convert("RGB") for path in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", required=True, help="Directory of images")
+    parser.add_argument("--task", default="Caption", choices=list(CAPTION_TASK_PROMPTS))
+    parser.add_argument(
+        "--batch-sizes", nargs="+", type=int, default=[2, 4, CAPTION_BATCH_SIZE]
+    )
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--model", default="microsoft/Florence-2-base")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = load_vision_model(args.model, backend=args.backend, device=device)
+    processor = AutoProcessor.from_pretrained(args.model, trust_remote_code=True)
+    images = load_fixtures(args.fixtures)
+    task_prompt = CAPTION_TASK_PROMPTS[args.task]
+
+    # Warm-up so model initialisation is not attributed to the single calls
+    run_example(task_prompt, images[0], model, processor)
+
+    print(f"{len(images)} images, backend={args.backend}, device={device}\n")
+    print(f"{'mode':<14}{'time (s)':>10}{'images/s':>10}{'same caption':>14}")
+
+    start = time.perf_counter()
+    singles = [
+        run_example(task_prompt, image, model, processor)[task_prompt].strip()
+        for image in images
+    ]
+    elapsed = time.perf_counter() - start
+    print(f"{'single':<14}{elapsed:>10.2f}{len(images) / elapsed:>10.2f}{'-':>14}")
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        captions = []
+        for i in range(0, len(images), batch_size):
+            results = run_batch(
+                task_prompt, images[i : i + batch_size], model, processor
+            )
+            captions.extend(result[task_prompt].strip() for result in results)
+        elapsed = time.perf_counter() - start
+        same = sum(caption == single for caption, single in zip(captions, singles))
+        print(
+            f"{f'batch {batch_size}':<14}{elapsed:>10.2f}"
+            f"{len(images) / elapsed:>10.2f}{f'{same}/{len(images)}':>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Latency and output similarity of the Florence-2 decoding profiles
+
+Every profile is run on every fixture image for every task. Similarity is measured
+against the output of the reference profile ("accurate" by default) with difflib,
+so 1.000 means identical output.
+
+Usage:
+    python benchmarks/bench_florence_profiles.py --fixtures /path/to/images
+    python benchmarks/bench_florence_profiles.py --backend onnx --tasks "<CAPTION>" "<OCR>"
+"""
+
+import argparse
+import glob
+import os
+import time
+from difflib import SequenceMatcher
+
+import torch
+from PIL import Image
+from transformers import AutoProcessor
+
+from omniparse.image.process import (
+    DECODING_PROFILES,
+    load_vision_model,
+    run_example,
+)
+
+DEFAULT_TASKS = [
+    "<CAPTION>",
+    "<DETAILED_CAPTION>",
+    "<MORE_DETAILED_CAPTION>",
+    "<OCR>",
+    "<OD>",
+]
+
+
+def load_fixtures(fixtures_dir):
+    paths = sorted(glob.glob(os.path.join(fixtures_dir, "*")))
+    return [(os.path.basename(path), Image.open(path).convert("RGB")) for path in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", required=True, help="Directory of images")
+    parser.add_argument("--tasks", nargs="+", default=DEFAULT_TASKS)
+    parser.add_argument("--profiles", nargs="+", default=list(DECODING_PROFILES))
+    parser.add_argument("--reference", default="accurate")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--model", default="microsoft/Florence-2-base")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = load_vision_model(args.model, backend=args.backend, device=device)
+    processor = AutoProcessor.from_pretrained(args.model, trust_remote_code=True)
+    images = load_fixtures(args.fixtures)
+    profiles = [args.reference] + [p for p in args.profiles if p != args.reference]
+
+    # Warm-up so model initialisation is not attributed to the first profile
+    run_example(args.tasks[0], images[0][1], model, processor, args.reference)
+
+    print(f"{len(images)} images, backend={args.backend}, device={device}\n")
+    print(
+        f"{'task':<26}{'profile':<10}{'mean (s)':>10}{'p95 (s)':>10}{'similarity':>12}"
+    )
+    for task in args.tasks:
+        reference_outputs = {}
+        for profile in profiles:
+            latencies, similarities = [], []
+            for name, image in images:
+                start = time.perf_counter()
+                result = run_example(task, image, model, processor, profile)
+                latencies.append(time.perf_counter() - start)
+
+                output = str(result[task])
+                if profile == args.reference:
+                    reference_outputs[name] = output
+                similarities.append(
+                    SequenceMatcher(None, reference_outputs[name], output).ratio()
+                )
+
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            print(
+                f"{task:<26}{profile:<10}{sum(latencies) / len(latencies):>10.3f}"
+                f"{p95:>10.3f}{sum(similarities) / len(similarities):>12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
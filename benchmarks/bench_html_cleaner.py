@@ -0,0 +1,144 @@
+"""
+Benchmark the single-parse HTML cleaner against the BeautifulSoup pipeline
+
+Times omniparse.web.html_cleaner.clean_html against get_content_of_website +
+extract_metadata on synthetic article pages of increasing size (or on saved pages), and
+checks that both produce the same markdown, cleaned HTML, links and metadata.
+
+Usage:
+    python benchmarks/bench_html_cleaner.py                       # synthetic 100 KB / 1 MB / 10 MB
+    python benchmarks/bench_html_cleaner.py --pages page1.html page2.html
+"""
+
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+import types
+
+PAGE_SIZES = {"100 KB": 100_000, "1 MB": 1_000_000, "10 MB": 10_000_000}
+WORDS = (
+    "the parser reads every node once and keeps word counts for each subtree "
+    "markdown output stays identical while cleaning runs in linear time"
+).split()
+
+
+def _load_web_modules():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import html_cleaner, utils
+
+    return html_cleaner, utils
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _section(rng, index):
+    paragraphs = "".join(
+        f"<p>{_sentence(rng, rng.randint(4, 30))} <b>{_sentence(rng, 2)}</b> "
+        f'<a href="/post/{index}-{i}">read more</a> {_sentence(rng, 8)}</p>\n'
+        for i in range(rng.randint(2, 6))
+    )
+    items = "".join(
+        f"<li><span>{_sentence(rng, rng.randint(1, 9))}</span></li>\n"
+        for _ in range(rng.randint(0, 5))
+    )
+    return f"""
+<div class="section" id="s{index}">
+  <div><div><h2>{_sentence(rng, 6)}</h2></div></div>
+  <!-- section {index} -->
+  <script>window.track({index}, "view");</script>
+  {paragraphs}
+  <img src="/img/{index}.png" alt="{_sentence(rng, 5)}"> <img src="/pixel.gif">
+  <ul>{items}</ul>
+  <pre><code>def f(x):\n    return x &lt; {index} and "quoted" &amp; 'single'</code><span> # {_sentence(rng, 1)}</span></pre>
+  <p>Tom &amp; Jerry said "<i>{_sentence(rng, 4)}</i>" &mdash; see <a href="https://other.example.org/{index}">elsewhere</a>.</p>
+  <table><tr><td>{_sentence(rng, 5)}</td><td>{_sentence(rng, 5)}</td></tr></table>
+  <noscript><a href="/nojs">{_sentence(rng, 3)}</a></noscript>
+  <style>.s{index} {{ color: red; }}</style>
+</div>"""
+
+
+def make_page(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    head = """<!DOCTYPE html>
+<html><head><title>Synthetic article</title>
+<meta name="description" content="A synthetic page">
+<meta property="og:title" content="Synthetic">
+<meta name="twitter:card" content="summary">
+<link rel="stylesheet" href="/site.css"></head>
+<body><nav><a href="/">Home</a> <a href="https://example.com/about">About</a></nav>
+<main>"""
+    sections, length, index = [], len(head), 0
+    while length < size:
+        section = _section(rng, index)
+        sections.append(section)
+        length += len(section)
+        index += 1
+    return (
+        head + "".join(sections) + "</main><footer>footer text</footer></body></html>"
+    )
+
+
+def _time(function, *args, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", nargs="*", help="Saved HTML pages to benchmark")
+    parser.add_argument("--url", default="https://example.com/article")
+    parser.add_argument("--threshold", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    html_cleaner, utils = _load_web_modules()
+    if args.pages:
+        pages = {os.path.basename(path): open(path).read() for path in args.pages}
+    else:
+        pages = {label: make_page(size) for label, size in PAGE_SIZES.items()}
+
+    def old(html):
+        result = utils.get_content_of_website(args.url, html, args.threshold)
+        result["metadata"] = utils.extract_metadata(html)
+        return result
+
+    print(
+        f"{'page':>12} {'size':>9} {'bs4 (s)':>9} {'lxml (s)':>9} {'speedup':>8} "
+        f"{'markdown':>9} {'html':>6} {'links':>6} {'meta':>5}"
+    )
+    for label, html in pages.items():
+        repeat = 1 if len(html) > 5_000_000 else args.repeat
+        old_seconds, expected = _time(old, html, repeat=repeat)
+        new_seconds, result = _time(
+            html_cleaner.clean_html, args.url, html, args.threshold, repeat=repeat
+        )
+        similarity = difflib.SequenceMatcher(
+            None, expected["markdown"], result["markdown"], autojunk=False
+        ).quick_ratio()
+        print(
+            f"{label:>12} {len(html) / 1e6:>7.2f}MB {old_seconds:>9.3f} {new_seconds:>9.3f} "
+            f"{old_seconds / new_seconds:>7.1f}x "
+            f"{'same' if expected['markdown'] == result['markdown'] else f'{similarity:.4f}':>9} "
+            f"{'same' if expected['cleaned_html'] == result['cleaned_html'] else 'diff':>6} "
+            f"{'same' if expected['links'] == result['links'] else 'diff':>6} "
+            f"{'same' if expected['metadata'] == result['metadata'] else 'diff':>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
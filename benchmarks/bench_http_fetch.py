@@ -0,0 +1,133 @@
+"""
+Plain-HTTP fetching with browser fallback against always rendering in the browser
+
+A local server serves static fixture pages and client-side rendered ones (an empty
+`<div id="root">` filled in by a script). Both strategies crawl the same mix; the
+report shows pages per second, which path each page took, and whether the rendered
+content of every page made it into the HTML.
+
+Usage:
+    python benchmarks/bench_http_fetch.py --pages 100 --spa-ratio 0.2 --workers 4
+"""
+
+import argparse
+import collections
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATIC_PAGE = """<!DOCTYPE html>
+<html><head><title>Static {index}</title></head>
+<body><article><h1>Static page {index}</h1>{paragraphs}
+<p>marker-{index}</p></article></body></html>"""
+
+SPA_PAGE = """<!DOCTYPE html>
+<html><head><title>App {index}</title></head>
+<body><noscript>You need to enable JavaScript to run this app.</noscript>
+<div id="root"></div>
+<script>
+document.getElementById("root").innerHTML =
+    "<article><h1>Rendered page {index}</h1>" + "{paragraphs}" + "<p>marker-{index}</p></article>";
+</script></body></html>"""
+
+PARAGRAPH = "<p>" + "Fixture text for the fetch benchmark. " * 12 + "</p>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        match = re.match(r"/(static|spa)/(\d+)", self.path)
+        if not match:
+            self.send_error(404)
+            return
+        kind, index = match.groups()
+        template = STATIC_PAGE if kind == "static" else SPA_PAGE
+        body = template.format(index=index, paragraphs=PARAGRAPH * 8).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _load_crawler_strategy():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import crawler_strategy
+
+    return crawler_strategy
+
+
+def run(strategy, urls, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pages = list(executor.map(strategy.crawl_page, urls))
+    elapsed = time.perf_counter() - start
+
+    paths = collections.Counter(
+        (page.get("fetch") or {}).get("path", "browser") for page in pages
+    )
+    missing = sum(
+        1
+        for url, page in zip(urls, pages)
+        if f"marker-{url.rsplit('/', 1)[1]}" not in page["html"]
+    )
+    return len(urls) / elapsed, paths, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--spa-ratio", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rng = random.Random(0)
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [
+        f"{base}/{'spa' if rng.random() < args.spa_ratio else 'static'}/{i}"
+        for i in range(args.pages)
+    ]
+
+    crawler_strategy = _load_crawler_strategy()
+    browser = crawler_strategy.LocalSeleniumCrawlerStrategy(
+        pool_settings={"size": args.workers}
+    )
+    browser.pool.start(args.workers)
+    strategies = {
+        "browser": browser,
+        "http+fallback": crawler_strategy.HttpCrawlerStrategy(
+            browser_factory=lambda: browser
+        ),
+    }
+
+    print(f"{'strategy':>14} {'pages/s':>8} {'http':>6} {'browser':>8} {'missing':>8}")
+    for name, strategy in strategies.items():
+        pages_per_second, paths, missing = run(strategy, urls, args.workers)
+        print(
+            f"{name:>14} {pages_per_second:>8.2f} {paths['http']:>6} "
+            f"{paths['browser']:>8} {missing:>8}"
+        )
+    browser.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
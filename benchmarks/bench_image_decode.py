@@ -0,0 +1,114 @@
+"""
+Benchmark full-resolution decoding against omniparse.image.decode.decode_image
+
+Every measurement runs in a fresh process so that peak RSS is attributable to a
+single decode.
+
+Usage:
+    python benchmarks/bench_image_decode.py                      # synthetic 12/24/48 MP JPEGs
+    python benchmarks/bench_image_decode.py --fixtures /path/to/photos
+"""
+
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def _make_fixtures(output_dir, megapixels, queue):
+    paths = []
+    rng = np.random.default_rng(0)
+    for mpx in megapixels:
+        width = int((mpx * 1e6 * 4 / 3) ** 0.5)
+        height = int(width * 3 / 4)
+        # Smooth gradient plus noise so the JPEG does not compress to nothing
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        base = (x[None, :] * 0.5 + y * 0.5).astype(np.uint8)
+        noise = rng.integers(0, 32, size=(height, width), dtype=np.uint8)
+        pixels = np.stack([base, base + noise, 255 - base], axis=-1)
+        path = os.path.join(output_dir, f"synthetic_{mpx}mp.jpg")
+        Image.fromarray(pixels).save(path, quality=90)
+        paths.append(path)
+    queue.put(paths)
+
+
+def make_fixtures(output_dir, megapixels=(12, 24, 48)):
+    # Generated in a child process so the parent (whose peak RSS every spawned
+    # measurement inherits) stays small
+    return _run_in_process(_make_fixtures, output_dir, megapixels)
+
+
+def _run_in_process(target, *args):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=target, args=(*args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _load_decode_image():
+    # Load the module by path: importing the omniparse package pulls in torch and
+    # every model, which would dominate the RSS numbers
+    import importlib.util
+
+    module_path = os.path.join(
+        os.path.dirname(__file__), "..", "omniparse", "image", "decode.py"
+    )
+    spec = importlib.util.spec_from_file_location("omniparse_image_decode", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.decode_image
+
+
+def _measure(path, max_side, queue):
+    decode_image = _load_decode_image()
+
+    start = time.perf_counter()
+    if max_side is None:
+        image = Image.open(path).convert("RGB")
+    else:
+        image = decode_image(path, max_side=max_side).convert("RGB")
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((elapsed, peak_mb, image.size))
+
+
+def measure(path, max_side):
+    return _run_in_process(_measure, path, max_side)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", help="Directory of large images to decode")
+    parser.add_argument("--max-side", type=int, nargs="+", default=[4096, 1024])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.fixtures:
+            paths = sorted(glob.glob(os.path.join(args.fixtures, "*")))
+        else:
+            paths = make_fixtures(tmp_dir)
+
+        print(f"{'image':<28}{'mode':<14}{'size':<14}{'time (s)':>10}{'peak RSS (MB)':>16}")
+        for path in paths:
+            name = os.path.basename(path)
+            for max_side in [None] + args.max_side:
+                elapsed, peak_mb, size = measure(path, max_side)
+                mode = "full" if max_side is None else f"max {max_side}"
+                print(
+                    f"{name:<28}{mode:<14}{size[0]}x{size[1]:<8}{elapsed:>10.3f}{peak_mb:>16.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Near-duplicate detection on a synthetic site
+
+Generates distinct articles and, for each, the variants a site serves: listing pages
+that differ in a page number and their links, a print view with other link targets,
+and an edited copy with a few words changed. Every page goes through
+NearDuplicateIndex.check; the report shows the time per page, how many variants were
+put in their article's cluster and how many pages were wrongly clustered, per
+Hamming threshold.
+
+Usage:
+    python benchmarks/bench_near_duplicates.py --articles 1000 --words 600 --edits 2
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+
+def _load_near_duplicates():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import near_duplicates
+
+    return near_duplicates
+
+
+def make_site(args):
+    """(url, markdown, article) of every page, the variants of an article shuffled in."""
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(20000)]
+    pages = []
+    for article in range(args.articles):
+        words = [rng.choice(vocabulary) for _ in range(args.words)]
+        body = " ".join(words)
+        for number in range(1, 4):
+            pages.append(
+                (
+                    f"https://example.com/a/{article}?page={number}",
+                    f"# Article {article}\n\n{body}\n\nPage {number} of 3 "
+                    f"[Next](https://example.com/a/{article}?page={number + 1})",
+                    article,
+                )
+            )
+        pages.append(
+            (
+                f"https://example.com/print/{article}",
+                f"# Article {article}\n\n{body}\n\n[Home](https://example.com/?print=1)",
+                article,
+            )
+        )
+        edited = list(words)
+        for _ in range(args.edits):
+            edited[rng.randrange(len(edited))] = rng.choice(vocabulary)
+        pages.append(
+            (
+                f"https://example.com/a/{article}/edited",
+                f"# Article {article}\n\n{' '.join(edited)}",
+                article,
+            )
+        )
+    rng.shuffle(pages)
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=600)
+    parser.add_argument("--edits", type=int, default=2, help="Words changed per copy")
+    parser.add_argument("--thresholds", type=int, nargs="+", default=[2, 3, 4, 6])
+    args = parser.parse_args()
+
+    near_duplicates = _load_near_duplicates()
+    pages = make_site(args)
+    print(
+        f"{'threshold':>9} {'pages':>6} {'ms/page':>8} {'clustered':>10} "
+        f"{'missed':>7} {'wrong':>6}"
+    )
+    for threshold in args.thresholds:
+        index = near_duplicates.NearDuplicateIndex(hamming_threshold=threshold)
+        first_seen, clustered, missed, wrong = {}, 0, 0, 0
+        start = time.perf_counter()
+        results = [index.check(url, markdown) for url, markdown, _ in pages]
+        elapsed = time.perf_counter() - start
+        articles = {url: article for url, _, article in pages}
+        for (url, _, article), result in zip(pages, results):
+            if result["duplicate_of"] is None:
+                if article in first_seen:
+                    missed += 1
+                first_seen.setdefault(article, url)
+            elif articles[result["duplicate_of"]] == article:
+                clustered += 1
+            else:
+                wrong += 1
+        print(
+            f"{threshold:>9} {len(pages):>6} {elapsed / len(pages) * 1000:>8.3f} "
+            f"{clustered:>10} {missed:>7} {wrong:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Sequential Whisper transcription vs VAD-segmented parallel transcription
+
+Worker pools are warmed up (model loaded in every worker) before timing, the same
+way they stay warm between requests on the server.
+
+Usage:
+    python benchmarks/bench_parallel_transcription.py /path/to/long_recording.mp3 --model small
+"""
+
+import argparse
+import time
+
+import numpy as np
+import whisper
+
+from omniparse.media.utils import (
+    SAMPLE_RATE,
+    WHISPER_DEFAULT_SETTINGS,
+    shutdown_transcription_pool,
+    split_on_silence,
+    transcribe,
+    transcribe_parallel,
+    transcription_pool,
+)
+
+
+def warm_up(model_name, workers):
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    with transcription_pool(model_name, workers) as pool:
+        futures = [pool.submit(np.sum, silence) for _ in range(workers)]
+        for future in futures:
+            future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", help="Audio or video file")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    audio = whisper.load_audio(args.audio)
+    duration = len(audio) / SAMPLE_RATE
+    chunks = split_on_silence(audio)
+    print(f"{duration:.0f} s of audio, {len(chunks)} VAD chunks, model={args.model}\n")
+
+    model = whisper.load_model(args.model, device="cpu")
+    start = time.perf_counter()
+    transcribe(audio, model, **WHISPER_DEFAULT_SETTINGS)
+    sequential = time.perf_counter() - start
+    del model
+
+    print(f"{'mode':<16}{'time (s)':>10}{'x realtime':>12}{'speedup':>10}")
+    print(
+        f"{'sequential':<16}{sequential:>10.1f}{duration / sequential:>12.2f}{1.0:>9.2f}x"
+    )
+    for workers in args.workers:
+        warm_up(args.model, workers)
+        start = time.perf_counter()
+        transcribe_parallel(audio, args.model, workers, **WHISPER_DEFAULT_SETTINGS)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{f'{workers} workers':<16}{elapsed:>10.1f}{duration / elapsed:>12.2f}"
+            f"{sequential / elapsed:>9.2f}x"
+        )
+        shutdown_transcription_pool(args.model)
+
+
+if __name__ == "__main__":
+    main()
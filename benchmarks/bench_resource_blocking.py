@@ -0,0 +1,169 @@
+"""
+Page load time and bytes transferred with and without resource blocking
+
+A local server serves article pages that pull in images, a stylesheet with web fonts, an
+autoplaying video and an analytics script from a "third-party" host (localhost instead
+of 127.0.0.1), every resource delayed like a remote server. The browser renders the
+pages with blocking off and on; the report shows, per page, the mean load time, the
+bytes the browser reports and the bytes and requests the server actually sent, plus
+the number of pages whose article text did not make it into the HTML.
+
+Usage:
+    python benchmarks/bench_resource_blocking.py --pages 20 --images 30 --latency-ms 50
+"""
+
+import argparse
+import os
+import re
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Article {index}</title>
+<link rel="stylesheet" href="/static/site.css">
+<script async src="http://localhost:{port}/analytics.js"></script></head>
+<body><article><h1>Article {index}</h1>
+{paragraphs}
+<p>marker-{index}</p>
+<video src="/media/clip-{index}.mp4" autoplay muted preload="auto"></video>
+{images}
+</article></body></html>"""
+
+STYLESHEET = """
+@font-face { font-family: Body; src: url(/static/body.woff2) format("woff2"); }
+@font-face { font-family: Title; src: url(/static/title.woff2) format("woff2"); }
+body { font-family: Body; } h1 { font-family: Title; }
+"""
+
+ANALYTICS = "new Image().src = '/collect?page=' + encodeURIComponent(location.href);"
+
+PARAGRAPH = "<p>" + "Fixture text for the resource blocking benchmark. " * 12 + "</p>"
+
+CONTENT_TYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".png": "image/png",
+    ".woff2": "font/woff2",
+    ".mp4": "video/mp4",
+}
+
+
+def make_handler(args, stats):
+    sizes = {".png": args.image_kb, ".woff2": 80, ".mp4": args.video_kb}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            match = re.match(r"/article/(\d+)$", path)
+            if match:
+                index = match.group(1)
+                images = "".join(
+                    f'<img src="/img/{index}-{i}.png" alt="figure {i}">'
+                    for i in range(args.images)
+                )
+                body = PAGE.format(
+                    index=index,
+                    port=self.server.server_port,
+                    paragraphs=PARAGRAPH * 6,
+                    images=images,
+                ).encode()
+                content_type = "text/html; charset=utf-8"
+            else:
+                extension = os.path.splitext(path)[1]
+                if path == "/static/site.css":
+                    body = STYLESHEET.encode()
+                elif path == "/analytics.js":
+                    body = ANALYTICS.encode()
+                elif extension in sizes:
+                    body = os.urandom(sizes[extension] * 1024)
+                else:
+                    body = b""
+                content_type = CONTENT_TYPES.get(extension, "image/gif")
+                # Stands in for a remote server, the page itself is not delayed
+                time.sleep(args.latency_ms / 1000)
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+            with stats["lock"]:
+                stats["requests"] += 1
+                stats["bytes"] += len(body)
+
+    return FixtureHandler
+
+
+def _load_crawler_strategy():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import crawler_strategy
+
+    return crawler_strategy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--image-kb", type=int, default=120)
+    parser.add_argument("--video-kb", type=int, default=2048)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    stats = {"lock": threading.Lock()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args, stats))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    urls = [f"http://127.0.0.1:{port}/article/{i}" for i in range(args.pages)]
+
+    crawler_strategy = _load_crawler_strategy()
+    print(
+        f"{'blocking':>9} {'load (s)':>9} {'browser MB':>11} {'server MB':>10} "
+        f"{'requests':>9} {'missing':>8}"
+    )
+    for block in (False, True):
+        strategy = crawler_strategy.LocalSeleniumCrawlerStrategy(
+            block_resources=block,
+            blocked_hosts=crawler_strategy.BLOCKED_HOSTS + [f"localhost:{port}"],
+            pool_settings={"size": 1},
+        )
+        # Warm up the driver so that its start is not timed
+        strategy.crawl_page(urls[0])
+        stats.update(requests=0, bytes=0)
+
+        seconds, transferred, missing = 0.0, 0, 0
+        for url in urls:
+            page = strategy.crawl_page(url)
+            seconds += page["fetch"]["seconds"]
+            transferred += page["fetch"]["bytes"]
+            if f"marker-{url.rsplit('/', 1)[1]}" not in page["html"]:
+                missing += 1
+        # Let requests the page started late (analytics beacons) reach the server
+        time.sleep(0.5)
+        print(
+            f"{'on' if block else 'off':>9} {seconds / len(urls):>9.3f} "
+            f"{transferred / len(urls) / 1e6:>11.2f} "
+            f"{stats['bytes'] / len(urls) / 1e6:>10.2f} "
+            f"{stats['requests'] / len(urls):>9.1f} {missing:>8}"
+        )
+        strategy.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
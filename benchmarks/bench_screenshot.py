@@ -0,0 +1,173 @@
+"""
+Screenshot memory and latency on a very long page
+
+Loads a fixture page tens of thousands of pixels tall and captures it the old way
+(resize the window to the full scroll height, PNG, re-encode to JPEG with PIL) and with
+the clipped DevTools capture in each output format. The report shows capture time,
+the peak memory of Chrome's processes and of this process, and the size and
+dimensions of the image.
+
+Usage:
+    python benchmarks/bench_screenshot.py --height 60000 --repeat 3
+"""
+
+import argparse
+import base64
+import os
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import psutil
+from PIL import Image
+
+BLOCK = """<section style="height:{height}px;background:hsl({hue},60%,85%)">
+<h2>Section {index}</h2><p>{text}</p></section>"""
+
+
+def make_handler(page_height):
+    blocks = "".join(
+        BLOCK.format(
+            height=500,
+            hue=(index * 37) % 360,
+            index=index,
+            text="Long fixture page for the screenshot benchmark. " * 20,
+        )
+        for index in range(page_height // 500)
+    )
+    body = (
+        f"<!DOCTYPE html><html><body style='margin:0'>{blocks}</body></html>".encode()
+    )
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FixtureHandler
+
+
+def _load_crawler_strategy():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import crawler_strategy
+
+    return crawler_strategy
+
+
+def legacy_screenshot(driver) -> str:
+    """The capture the crawler used before: full-height window, PNG, PIL to JPEG."""
+    total_width = driver.execute_script("return document.body.scrollWidth")
+    total_height = driver.execute_script("return document.body.scrollHeight")
+    driver.set_window_size(total_width, total_height)
+    image = Image.open(BytesIO(driver.get_screenshot_as_png()))
+    buffered = BytesIO()
+    image.convert("RGB").save(buffered, format="JPEG", quality=85)
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+class PeakMemory:
+    """Samples the RSS of Chrome's processes and of this process in the background."""
+
+    def __init__(self, driver, interval: float = 0.01):
+        self.root = psutil.Process(driver.service.process.pid)
+        self.interval = interval
+        self.chrome_mb = self.python_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        own = psutil.Process()
+        while not self._stop.is_set():
+            try:
+                chrome = sum(
+                    child.memory_info().rss
+                    for child in self.root.children(recursive=True)
+                )
+            except psutil.Error:
+                chrome = 0
+            self.chrome_mb = max(self.chrome_mb, chrome / 1024 / 1024)
+            self.python_mb = max(self.python_mb, own.memory_info().rss / 1024 / 1024)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--height", type=int, default=60000, help="Page height in px")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.height))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    crawler_strategy = _load_crawler_strategy()
+    strategy = crawler_strategy.LocalSeleniumCrawlerStrategy(pool_settings={"size": 1})
+
+    def clipped(image_format):
+        def capture(driver):
+            strategy.screenshot_settings.update(
+                format=image_format, quality=args.quality
+            )
+            return strategy.take_screenshot(driver)
+
+        return capture
+
+    methods = {
+        image_format: clipped(image_format)
+        for image_format in crawler_strategy.SCREENSHOT_FORMATS
+    }
+    # Last, the memory it takes from this process is not handed back to the OS
+    methods["legacy"] = legacy_screenshot
+
+    print(
+        f"{'capture':>8} {'seconds':>8} {'chrome MB':>10} {'python MB':>10} "
+        f"{'image KB':>9} {'size':>12}"
+    )
+    for name, capture in methods.items():
+        timings, chrome_mb, python_mb = [], 0.0, 0.0
+        for _ in range(args.repeat):
+            # A fresh page load per capture, the pool resets the window size on checkin
+            with strategy.pool.driver() as driver:
+                strategy._load_page(driver, url)
+                with PeakMemory(driver) as memory:
+                    start = time.perf_counter()
+                    data = capture(driver)
+                    timings.append(time.perf_counter() - start)
+            chrome_mb = max(chrome_mb, memory.chrome_mb)
+            python_mb = max(python_mb, memory.python_mb)
+        image = Image.open(BytesIO(base64.b64decode(data)))
+        print(
+            f"{name:>8} {min(timings):>8.3f} {chrome_mb:>10.0f} "
+            f"{python_mb:>10.0f} {len(data) * 3 / 4 / 1024:>9.0f} "
+            f"{f'{image.width}x{image.height}':>12}"
+        )
+    strategy.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
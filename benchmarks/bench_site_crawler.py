@@ -0,0 +1,171 @@
+"""
+Site crawler against a local fixture site
+
+Serves a site of linked pages: every page links to its neighbours, a few random pages,
+the same pages again with fragments, tracking parameters and absolute URLs, a PDF,
+an off-site page and a section that robots.txt disallows. The crawler walks it with
+several settings; the report shows pages per second, the time to the first streamed
+page, and checks that no URL was fetched twice, robots.txt was obeyed, no off-site or
+file link was followed and per-host concurrency never went over its limit.
+
+Usage:
+    python benchmarks/bench_site_crawler.py --pages 500 --concurrency 1 4 8 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Page {index}</title></head>
+<body><nav>{nav}</nav>
+<article><h1>Fixture page {index}</h1>{paragraphs}</article>
+<footer>{links}</footer></body></html>"""
+
+PARAGRAPH = "<p>" + "Fixture text for the site crawler benchmark. " * 10 + "</p>"
+
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+
+def make_handler(pages, latency, stats):
+    rng = random.Random(0)
+    # Random long-range links, fixed per page so that every run sees the same site
+    extra = {i: rng.sample(range(pages), min(3, pages)) for i in range(pages)}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, content_type="text/html; charset=utf-8"):
+            body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/robots.txt":
+                self._send(200, ROBOTS, "text/plain")
+                return
+            with stats["lock"]:
+                stats["hits"][self.path] += 1
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                # Stands in for server and network time
+                time.sleep(latency)
+                match = re.match(r"/page/(\d+)$", self.path)
+                if not match or int(match.group(1)) >= pages:
+                    self._send(404, "<html><body>Not found</body></html>")
+                    return
+                index = int(match.group(1))
+                host = self.headers.get("Host")
+                neighbours = [(index + 1) % pages, (index - 1) % pages, *extra[index]]
+                links = "".join(
+                    f'<a href="/page/{i}">page {i}</a> '
+                    f'<a href="/page/{i}#top">top</a> '
+                    f'<a href="http://{host}/page/{i}?utm_source=bench">tracked</a> '
+                    for i in neighbours
+                )
+                links += (
+                    f'<a href="/private/{index}">private</a> '
+                    f'<a href="/files/{index}.pdf">pdf</a> '
+                    f'<a href="https://offsite.example.com/{index}">offsite</a> '
+                    '<a href="mailto:someone@example.com">mail</a>'
+                )
+                body = PAGE.format(
+                    index=index,
+                    nav='<a href="/page/0">Home</a> <a href="./">here</a>',
+                    paragraphs=PARAGRAPH * 4,
+                    links=links,
+                )
+                self._send(200, body)
+            finally:
+                with stats["lock"]:
+                    stats["in_flight"] -= 1
+
+    return FixtureHandler
+
+
+def _load_web_modules():
+    # Register the packages by path: omniparse/__init__.py loads torch and every model
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+    for name, path in (("omniparse", root), ("omniparse.web", f"{root}/web")):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    from omniparse.web import site_crawler, web_crawler
+
+    return site_crawler, web_crawler
+
+
+async def crawl(site_crawler, crawler, start_url, concurrency, delay, args):
+    site = site_crawler.SiteCrawler(
+        crawler, per_host_concurrency=concurrency, delay_seconds=delay
+    )
+    start = time.perf_counter()
+    first, urls = None, []
+    async for result in site.crawl(
+        start_url, max_depth=args.max_depth, max_pages=args.pages
+    ):
+        first = first or time.perf_counter() - start
+        urls.append(result["url"])
+    elapsed = time.perf_counter() - start
+    await crawler.async_strategy.close()
+    return elapsed, first, urls, site.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--max-depth", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    stats = {"lock": threading.Lock()}
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(args.pages, args.latency_ms / 1000, stats)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    start_url = f"http://127.0.0.1:{server.server_port}/page/0"
+
+    site_crawler, web_crawler = _load_web_modules()
+    print(
+        f"{'per host':>8} {'pages':>6} {'pages/s':>8} {'first (s)':>10} "
+        f"{'refetched':>10} {'stray':>6} {'max in flight':>14} {'errors':>7}"
+    )
+    for concurrency in args.concurrency:
+        stats.update(hits=collections.Counter(), in_flight=0, max_in_flight=0)
+        crawler = web_crawler.WebCrawler(verbose=False)
+        elapsed, first, urls, crawl_stats = asyncio.run(
+            crawl(site_crawler, crawler, start_url, concurrency, args.delay, args)
+        )
+        refetched = sum(count - 1 for count in stats["hits"].values())
+        # Disallowed by robots.txt or not a page
+        stray = sum(
+            1 for path in stats["hits"] if path.startswith(("/private/", "/files/"))
+        )
+        print(
+            f"{concurrency:>8} {len(urls):>6} {len(urls) / elapsed:>8.2f} "
+            f"{first:>10.3f} {refetched:>10} {stray:>6} "
+            f"{stats['max_in_flight']:>14} {crawl_stats['errors']:>7}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Transcribing remote media while it downloads, against a local throttled HTTP server
+
+Serves a media file from a local HTTP server that honours Range requests and limits
+its bandwidth, optionally dropping the connection once mid-download so ffmpeg has to
+resume with a range request. Reports when the download finished, when the first
+transcribed chunk arrived and when transcription finished.
+
+Usage:
+    python benchmarks/bench_url_media.py /path/to/podcast.mp3 --kbps 512 --drop-at 0.3
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import whisper
+
+from omniparse.media.remote import iter_transcribe_url
+from omniparse.media.utils import WHISPER_DEFAULT_SETTINGS
+
+
+def make_handler(path, bytes_per_second, drop_at):
+    size = os.path.getsize(path)
+    state = {"dropped": drop_at is None, "served": 0, "finished_at": None}
+
+    class RangeHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            start = 0
+            match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if match:
+                start = int(match.group(1))
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(size - start))
+            self.end_headers()
+
+            with open(path, "rb") as f:
+                f.seek(start)
+                position = start
+                while chunk := f.read(16 * 1024):
+                    if not state["dropped"] and position >= drop_at * size:
+                        state["dropped"] = True
+                        print(f"[server] dropping connection at byte {position}")
+                        return
+                    try:
+                        self.wfile.write(chunk)
+                    except (BrokenPipeError, ConnectionResetError):
+                        return
+                    position += len(chunk)
+                    state["served"] += len(chunk)
+                    time.sleep(len(chunk) / bytes_per_second)
+            if position >= size:
+                state["finished_at"] = time.perf_counter()
+
+    return RangeHandler, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("media")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--kbps", type=int, default=512, help="Server bandwidth")
+    parser.add_argument(
+        "--drop-at", type=float, default=None, help="Drop once at this fraction"
+    )
+    args = parser.parse_args()
+
+    handler, state = make_handler(args.media, args.kbps * 1024 / 8, args.drop_at)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/{os.path.basename(args.media)}"
+
+    model = whisper.load_model(args.model, device="cpu")
+    start = time.perf_counter()
+    first_chunk = None
+    for result in iter_transcribe_url(url, model, **WHISPER_DEFAULT_SETTINGS):
+        elapsed = time.perf_counter() - start
+        first_chunk = first_chunk or elapsed
+        print(
+            f"{elapsed:>7.1f} s  transcribed up to {result['transcribed_seconds']:>7.1f} s"
+        )
+    done = time.perf_counter() - start
+    server.shutdown()
+
+    download = (state["finished_at"] or time.perf_counter()) - start
+    print(f"\nfile size          {os.path.getsize(args.media) / 1e6:>8.1f} MB")
+    print(f"bytes served       {state['served'] / 1e6:>8.1f} MB")
+    print(f"download finished  {download:>8.1f} s")
+    print(f"first chunk        {first_chunk:>8.1f} s")
+    print(f"transcript done    {done:>8.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Time to get Whisper-ready PCM out of a video: moviepy + MP3 vs an ffmpeg pipe
+
+The moviepy path is the one video parsing used before: re-encode the audio track to an
+MP3 with moviepy, then let whisper.load_audio decode that MP3 again. Requires
+moviepy, which omniparse itself no longer depends on.
+
+Usage:
+    python benchmarks/bench_video_audio_decode.py /path/to/one_hour_video.mp4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import whisper
+from moviepy.editor import VideoFileClip
+
+from omniparse.media.utils import SAMPLE_RATE, load_audio
+
+
+def decode_with_moviepy(video_path):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = os.path.join(tmp_dir, "audio.mp3")
+        video_clip = VideoFileClip(video_path)
+        video_clip.audio.write_audiofile(audio_path, logger=None)
+        video_clip.close()
+        return whisper.load_audio(audio_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("video")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for name, decode in [
+        ("moviepy + mp3", decode_with_moviepy),
+        ("ffmpeg pipe", load_audio),
+    ]:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            audio = decode(args.video)
+            timings.append(time.perf_counter() - start)
+        results[name] = min(timings)
+        print(
+            f"{name:<16}{results[name]:>8.1f} s  ({len(audio) / SAMPLE_RATE:.0f} s of audio)"
+        )
+
+    saved = results["moviepy + mp3"] - results["ffmpeg pipe"]
+    print(f"\nsaved {saved:.1f} s ({saved / results['moviepy + mp3']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
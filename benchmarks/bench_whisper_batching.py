@@ -0,0 +1,68 @@
+"""
+Short-clip throughput (clips/sec): one whisper.transcribe call per clip vs batched decoding
+
+Clips are cut from a longer speech recording at random offsets so every clip contains
+speech. Runs on CPU with the `tiny` model by default.
+
+Usage:
+    python benchmarks/bench_whisper_batching.py /path/to/speech.mp3 --clips 32
+"""
+
+import argparse
+import random
+import time
+
+import torch
+import whisper
+
+from omniparse.media.batching import decode_batch
+from omniparse.media.utils import SAMPLE_RATE, WHISPER_DEFAULT_SETTINGS, transcribe
+
+
+def make_clips(audio, count, min_seconds, max_seconds, seed=0):
+    rng = random.Random(seed)
+    clips = []
+    for _ in range(count):
+        length = int(rng.uniform(min_seconds, max_seconds) * SAMPLE_RATE)
+        start = rng.randrange(0, max(1, len(audio) - length))
+        clips.append(audio[start : start + length])
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("audio", help="Speech recording the clips are cut from")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--clips", type=int, default=32)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = whisper.load_model(args.model, device="cpu")
+    clips = make_clips(whisper.load_audio(args.audio), args.clips, 10, 30)
+    print(f"{len(clips)} clips of 10-30 s, model={args.model}, device=cpu\n")
+
+    # Warm-up
+    decode_batch(model, clips[:1])
+
+    start = time.perf_counter()
+    for clip in clips:
+        transcribe(clip, model, **WHISPER_DEFAULT_SETTINGS)
+    baseline = len(clips) / (time.perf_counter() - start)
+
+    print(f"{'mode':<22}{'clips/sec':>10}{'speedup':>10}")
+    print(f"{'transcribe per clip':<22}{baseline:>10.2f}{1.0:>9.2f}x")
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(clips), batch_size):
+            decode_batch(model, clips[i : i + batch_size])
+        throughput = len(clips) / (time.perf_counter() - start)
+        print(
+            f"{f'batch {batch_size}':<22}{throughput:>10.2f}{throughput / baseline:>9.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
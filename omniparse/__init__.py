@@ -20,10 +20,11 @@ All credits for the original implementation go to VikParuchuri.
 import torch
 from typing import Any
 from pydantic import BaseModel
-from transformers import AutoProcessor, AutoModelForCausalLM
-import whisper
+from transformers import AutoProcessor
 from omniparse.utils import print_omniparse_text_art
 from omniparse.web.web_crawler import WebCrawler
+from omniparse.image.process import load_vision_model
+from omniparse.media.model_cache import WhisperModelCache
 from marker.models import load_all_models
 # from omniparse.documents.models import load_all_models
 
@@ -32,14 +33,22 @@ class SharedState(BaseModel):
     model_list: Any = None
     vision_model: Any = None
     vision_processor: Any = None
+    vision_backend: str = "torch"
     whisper_model: Any = None
+    whisper_model_name: str = "small"
+    whisper_models: Any = None
     crawler: Any = None
 
 
 shared_state = SharedState()
 
 
-def load_omnimodel(load_documents: bool, load_media: bool, load_web: bool):
+def load_omnimodel(
+    load_documents: bool,
+    load_media: bool,
+    load_web: bool,
+    vision_backend: str = "torch",
+):
     global shared_state
     print_omniparse_text_art()
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -48,16 +57,21 @@ def load_omnimodel(load_documents: bool, load_media: bool, load_web: bool):
         shared_state.model_list = load_all_models()
         print("[LOG] ✅ Loading Vision Model")
         # if device == "cuda":
-        shared_state.vision_model = AutoModelForCausalLM.from_pretrained(
-            "microsoft/Florence-2-base", trust_remote_code=True
-        ).to(device)
+        shared_state.vision_backend = vision_backend
+        shared_state.vision_model = load_vision_model(
+            "microsoft/Florence-2-base", backend=vision_backend, device=device
+        )
         shared_state.vision_processor = AutoProcessor.from_pretrained(
             "microsoft/Florence-2-base", trust_remote_code=True
         )
 
     if load_media:
         print("[LOG] ✅ Loading Audio Model")
-        shared_state.whisper_model = whisper.load_model("small")
+        # The default model stays loaded; other sizes are loaded per request and evicted LRU
+        shared_state.whisper_models = WhisperModelCache()
+        shared_state.whisper_model = shared_state.whisper_models.pin(
+            shared_state.whisper_model_name
+        )
 
     if load_web:
         print("[LOG] ✅ Loading Web Crawler")
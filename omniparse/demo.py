@@ -413,7 +413,7 @@ def parse_website(url, request: gr.Request):
         host_url = request.headers.get("host")
 
         # Make a POST request to the external URL
-        post_url = f"http://{host_url}/parse_website/parse?url={url}"
+        post_url = f"http://{host_url}/parse_website/parse?url={url}&screenshot=true"
         post_response = requests.post(post_url, headers={"accept": "application/json"})
 
         # Validate response
@@ -22,7 +22,7 @@ import tempfile
 import subprocess
 
 # from omniparse.documents.parse import parse_single_pdf
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form
 from fastapi.responses import JSONResponse
 from omniparse import get_shared_state
 
@@ -31,6 +31,7 @@ from omniparse import get_shared_state
 from marker.convert import convert_single_pdf
 from omniparse.utils import encode_images
 from omniparse.models import responseDocument
+from omniparse.image.process import generate_captions
 
 document_router = APIRouter()
 model_state = get_shared_state()
@@ -38,7 +39,9 @@ model_state = get_shared_state()
 
 # Document parsing endpoints
 @document_router.post("/pdf")
-async def parse_pdf_endpoint(file: UploadFile = File(...)):
+async def parse_pdf_endpoint(
+    file: UploadFile = File(...), caption_images: bool = Form(False)
+):
     try:
         file_bytes = await file.read()
         full_text, images, out_meta = convert_single_pdf(
@@ -47,6 +50,10 @@ async def parse_pdf_endpoint(file: UploadFile = File(...)):
 
         result = responseDocument(text=full_text, metadata=out_meta)
         encode_images(images, result)
+        if caption_images:
+            result.image_processor(
+                lambda images: generate_captions(images, model_state)
+            )
         # result : responseDocument = convert_single_pdf(file_bytes , model_state.model_list)
 
         return JSONResponse(content=result.model_dump())
@@ -57,7 +64,9 @@ async def parse_pdf_endpoint(file: UploadFile = File(...)):
 
 # Document parsing endpoints
 @document_router.post("/ppt")
-async def parse_ppt_endpoint(file: UploadFile = File(...)):
+async def parse_ppt_endpoint(
+    file: UploadFile = File(...), caption_images: bool = Form(False)
+):
     with tempfile.NamedTemporaryFile(delete=False, suffix=".ppt") as tmp_ppt:
         tmp_ppt.write(await file.read())
         tmp_ppt.flush()
@@ -90,12 +99,16 @@ async def parse_ppt_endpoint(file: UploadFile = File(...)):
 
     result = responseDocument(text=full_text, metadata=out_meta)
     encode_images(images, result)
+    if caption_images:
+        result.image_processor(lambda images: generate_captions(images, model_state))
 
     return JSONResponse(content=result.model_dump())
 
 
 @document_router.post("/docs")
-async def parse_doc_endpoint(file: UploadFile = File(...)):
+async def parse_doc_endpoint(
+    file: UploadFile = File(...), caption_images: bool = Form(False)
+):
     with tempfile.NamedTemporaryFile(delete=False, suffix=".ppt") as tmp_ppt:
         tmp_ppt.write(await file.read())
         tmp_ppt.flush()
@@ -124,12 +137,16 @@ async def parse_doc_endpoint(file: UploadFile = File(...)):
 
     result = responseDocument(text=full_text, metadata=out_meta)
     encode_images(images, result)
+    if caption_images:
+        result.image_processor(lambda images: generate_captions(images, model_state))
 
     return JSONResponse(content=result.model_dump())
 
 
 @document_router.post("")
-async def parse_any_endpoint(file: UploadFile = File(...)):
+async def parse_any_endpoint(
+    file: UploadFile = File(...), caption_images: bool = Form(False)
+):
     allowed_extensions = {".pdf", ".ppt", ".pptx", ".doc", ".docx"}
     file_ext = os.path.splitext(file.filename)[1]
 
@@ -170,6 +187,8 @@ async def parse_any_endpoint(file: UploadFile = File(...)):
 
     result = responseDocument(text=full_text, metadata=out_meta)
     encode_images(images, result)
+    if caption_images:
+        result.image_processor(lambda images: generate_captions(images, model_state))
 
     return JSONResponse(content=result.model_dump())
 
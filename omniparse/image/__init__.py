@@ -33,15 +33,15 @@ URL: https://huggingface.co/spaces/gokaygokay/Florence-2
 
 
 # Media parsing endpoints
-import io
 import os
 import tempfile
 import img2pdf
-from PIL import Image
 
 # from omniparse.document.parse import parse_single_image
 from marker.convert import convert_single_pdf
-from omniparse.image.process import process_image_task
+from omniparse.image.process import process_image_task, DEFAULT_DECODING_PROFILE
+from omniparse.image.decode import decode_image, max_side_for_task
+from omniparse.image.dedup import image_hash, hash_to_hex
 from omniparse.utils import encode_images
 from omniparse.models import responseDocument
 
@@ -50,14 +50,7 @@ def parse_image(input_data, model_state) -> dict:
     temp_files = []
 
     try:
-        if isinstance(input_data, bytes):
-            image = Image.open(io.BytesIO(input_data))
-        elif isinstance(input_data, str) and os.path.isfile(input_data):
-            image = Image.open(input_data)
-        else:
-            raise ValueError(
-                "Invalid input data format. Expected image bytes or image file path."
-            )
+        image = decode_image(input_data, max_side=max_side_for_task("ocr"))
 
         accepted_formats = {"PNG", "JPEG", "JPG", "TIFF", "WEBP"}
         if image.format not in accepted_formats:
@@ -93,6 +86,7 @@ def parse_image(input_data, model_state) -> dict:
         )
 
         parse_image_result = responseDocument(text=full_text, metadata=out_meta)
+        parse_image_result.metadata["phash"] = hash_to_hex(image_hash(image))
         encode_images(images, parse_image_result)
 
         return parse_image_result
@@ -104,38 +98,18 @@ def parse_image(input_data, model_state) -> dict:
                 os.remove(file_path)
 
 
-def process_image(input_data, task, model_state) -> responseDocument:
-    try:
-        temp_files = []
-
-        if isinstance(input_data, bytes):
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                temp_file.write(input_data)
-                temp_file.flush()
-                temp_file_path = temp_file.name
-                temp_files.append(temp_file_path)
-
-        elif isinstance(input_data, str) and os.path.isfile(input_data):
-            temp_file_path = input_data
-            temp_files.append(temp_file_path)
-
-        else:
-            raise ValueError(
-                "Invalid input data format. Expected image bytes or image file path."
-            )
-
-        # Open the saved image using PIL
-        image_data = Image.open(temp_file_path).convert("RGB")
-
-        # Process the image using your function (e.g., process_image)
-        image_process_results: responseDocument = process_image_task(
-            image_data, task, model_state
-        )
+def process_image(
+    input_data, task, model_state, profile=DEFAULT_DECODING_PROFILE
+) -> responseDocument:
+    # Decode at reduced scale; Florence-2 resizes to 768x768 anyway
+    image_data = decode_image(input_data, max_side=max_side_for_task(task)).convert(
+        "RGB"
+    )
 
-        return image_process_results
+    # Process the image using your function (e.g., process_image)
+    image_process_results: responseDocument = process_image_task(
+        image_data, task, model_state, profile
+    )
+    image_process_results.metadata["phash"] = hash_to_hex(image_hash(image_data))
 
-    finally:
-        # Clean up the temporary files
-        for file_path in temp_files:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+    return image_process_results
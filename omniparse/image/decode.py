@@ -0,0 +1,106 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Size-aware image decoding shared by the image parsing and vision endpoints.
+Large uploads are decoded at reduced scale (PIL `draft()` for JPEGs), EXIF
+orientation is applied and the result is downscaled to a per-task max side
+before being handed to the OCR or vision models, which resize anyway.
+"""
+
+import io
+import os
+from typing import Union
+from PIL import Image, ImageOps
+
+# Max side (in pixels) kept for each kind of downstream model.
+# OCR needs noticeably more resolution than Florence-2, which works at 768x768.
+IMAGE_DECODE_SETTINGS = {
+    "max_side": {
+        "ocr": 4096,
+        "vision_ocr": 2048,
+        "vision": 1024,
+    },
+    # Refuse to decode anything above this many pixels (decompression bombs)
+    "max_pixels": 200_000_000,
+}
+
+# Florence-2 tasks that read text and therefore keep more pixels
+VISION_OCR_TASKS = {"OCR", "OCR with Region"}
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+def max_side_for_task(task: str) -> int:
+    """Return the configured max side for a `process_image` task or a profile name."""
+    max_sides = IMAGE_DECODE_SETTINGS["max_side"]
+    if task in max_sides:
+        return max_sides[task]
+    if task in VISION_OCR_TASKS:
+        return max_sides["vision_ocr"]
+    return max_sides["vision"]
+
+
+def decode_image(
+    input_data: Union[bytes, str, Image.Image],
+    max_side: int = None,
+    max_pixels: int = None,
+) -> Image.Image:
+    """
+    Decode an image with EXIF orientation applied and its longest side capped.
+
+    Parameters:
+    input_data (bytes | str | PIL.Image): Raw image bytes, a file path or an already opened image.
+    max_side (int): Longest side of the returned image. None keeps the full resolution.
+    max_pixels (int): Pixel count above which the image is rejected without being decoded.
+
+    Returns:
+    PIL.Image: The decoded image. `image.format` is preserved from the source file.
+    """
+    if max_pixels is None:
+        max_pixels = IMAGE_DECODE_SETTINGS["max_pixels"]
+
+    try:
+        if isinstance(input_data, bytes):
+            image = Image.open(io.BytesIO(input_data))
+        elif isinstance(input_data, str) and os.path.isfile(input_data):
+            image = Image.open(input_data)
+        elif isinstance(input_data, Image.Image):
+            image = input_data
+        else:
+            raise ValueError(
+                "Invalid input data format. Expected image bytes or image file path."
+            )
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+
+    # Image.open only reads the header, so the size check happens before any pixel is decoded
+    width, height = image.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image of {width}x{height} pixels exceeds the limit of {max_pixels} pixels"
+        )
+
+    source_format = image.format
+
+    if max_side and max(width, height) > max_side and source_format == "JPEG":
+        # Let libjpeg decode at the smallest of 1/2, 1/4 or 1/8 scale that still covers
+        # max_side, the thumbnail below resamples the much smaller draft down to it
+        longest = max(width, height)
+        denominator = 1
+        while denominator < 8 and longest / (denominator * 2) >= max_side:
+            denominator *= 2
+        if denominator > 1:
+            # Rounded down, PIL picks the largest scale whose size is at least this
+            image.draft("RGB", (width // denominator, height // denominator))
+
+    ImageOps.exif_transpose(image, in_place=True)
+
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BICUBIC)
+
+    image.format = source_format
+    return image
@@ -0,0 +1,106 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Perceptual hashing of extracted and uploaded images. Documents repeat the same
+logo, watermark or footer graphic on every page; near-duplicates are collapsed
+to one canonical image so captioning and OCR run once per cluster.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+from PIL import Image
+
+IMAGE_DEDUP_SETTINGS = {
+    "hash": "dhash",  # "dhash" or "ahash"
+    "hash_size": 8,  # hash_size * hash_size bits
+    "hamming_threshold": 4,  # max differing bits for two images to be duplicates
+    "max_aspect_ratio_diff": 0.1,  # relative aspect ratio difference allowed within a cluster
+}
+
+
+def ahash(image: Image.Image, hash_size: int = 8) -> int:
+    """Average hash: one bit per pixel of a hash_size x hash_size thumbnail, set when brighter than the mean."""
+    pixels = np.asarray(
+        image.convert("L").resize((hash_size, hash_size), Image.BILINEAR),
+        dtype=np.float32,
+    )
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair, set when brightness increases."""
+    pixels = np.asarray(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR),
+        dtype=np.int16,
+    )
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), "big")
+
+
+HASH_FUNCTIONS = {"ahash": ahash, "dhash": dhash}
+
+
+def image_hash(image: Image.Image, method: str = None, hash_size: int = None) -> int:
+    method = method or IMAGE_DEDUP_SETTINGS["hash"]
+    hash_size = hash_size or IMAGE_DEDUP_SETTINGS["hash_size"]
+    if method not in HASH_FUNCTIONS:
+        raise ValueError(
+            f"Unsupported hash '{method}'. Choose from: {', '.join(HASH_FUNCTIONS)}"
+        )
+    return HASH_FUNCTIONS[method](image, hash_size)
+
+
+def hash_to_hex(value: int, hash_size: int = None) -> str:
+    hash_size = hash_size or IMAGE_DEDUP_SETTINGS["hash_size"]
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def cluster_images(
+    images: Dict[str, Image.Image], hamming_threshold: int = None
+) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Group near-duplicate images.
+
+    Parameters:
+    images (dict): Mapping of image name to PIL image, in document order.
+    hamming_threshold (int): Max differing hash bits for two images to be considered duplicates.
+
+    Returns:
+    tuple: A tuple containing two dicts:
+        - Mapping of every image name to the name of its cluster's canonical (first seen) image.
+        - Mapping of every image name to its perceptual hash.
+    """
+    if hamming_threshold is None:
+        hamming_threshold = IMAGE_DEDUP_SETTINGS["hamming_threshold"]
+    max_ratio_diff = IMAGE_DEDUP_SETTINGS["max_aspect_ratio_diff"]
+
+    canonical_of = {}
+    hashes = {}
+    canonicals: List[Tuple[str, int, float]] = []
+
+    for name, image in images.items():
+        value = image_hash(image)
+        ratio = image.width / max(image.height, 1)
+        hashes[name] = value
+
+        for canonical_name, canonical_value, canonical_ratio in canonicals:
+            # Flat images (blank, solid colour) hash alike whatever their shape
+            if abs(ratio - canonical_ratio) > max_ratio_diff * canonical_ratio:
+                continue
+            if hamming_distance(value, canonical_value) <= hamming_threshold:
+                canonical_of[name] = canonical_name
+                break
+        else:
+            canonical_of[name] = name
+            canonicals.append((name, value, ratio))
+
+    return canonical_of, hashes
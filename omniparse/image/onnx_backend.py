@@ -0,0 +1,659 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+ONNX Runtime backend for Florence-2 on CPU.
+
+The PyTorch model is exported once into five graphs, cached under
+~/.omniparse/models/<model name>-onnx:
+
+    vision_encoder.onnx       pixel_values -> image_features
+    embed_tokens.onnx         input_ids -> inputs_embeds
+    encoder_model.onnx        inputs_embeds, attention_mask -> encoder_hidden_states
+    decoder_model.onnx        first decoding step, returns the self/cross attention KV cache
+    decoder_with_past.onnx    later steps, consumes and extends the self attention KV cache
+
+`Florence2OnnxModel.generate` mirrors the subset of `model.generate` used by
+`run_example`, so it can stand in for `shared_state.vision_model`: greedy decoding
+or beam search with `num_beams`, `early_stopping` and `length_penalty` as in
+transformers, stopped by `max_new_tokens` or `max_time`. Other arguments raise.
+
+After an export, every graph is run on inputs of other shapes than the ones it was
+traced with and compared to PyTorch. An export that does not match is not used.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+from typing import List
+import numpy as np
+from omniparse.utils import get_home_folder
+
+FLORENCE_MODEL_ID = "microsoft/Florence-2-base"
+ONNX_OPSET = 17
+# Largest difference to PyTorch, relative to the largest PyTorch value, of an export
+PARITY_TOLERANCE = 1e-3
+ONNX_GRAPHS = [
+    "vision_encoder",
+    "embed_tokens",
+    "encoder_model",
+    "decoder_model",
+    "decoder_with_past",
+]
+
+
+def get_onnx_model_dir(model_id: str = FLORENCE_MODEL_ID) -> str:
+    return os.path.join(get_home_folder(), "models", f"{model_id.split('/')[-1]}-onnx")
+
+
+def _past_names(
+    prefix: str, num_layers: int, include_encoder: bool = True
+) -> List[str]:
+    names = []
+    for i in range(num_layers):
+        names += [f"{prefix}.{i}.decoder.key", f"{prefix}.{i}.decoder.value"]
+        if include_encoder:
+            names += [f"{prefix}.{i}.encoder.key", f"{prefix}.{i}.encoder.value"]
+    return names
+
+
+def _past_axes(names: List[str]) -> dict:
+    # Self attention caches grow with the decoded sequence, cross attention caches
+    # have the encoder sequence length
+    return {
+        name: {
+            0: "batch",
+            2: "encoder_sequence" if ".encoder." in name else "past_sequence",
+        }
+        for name in names
+    }
+
+
+def export_florence2_onnx(
+    model_id: str = FLORENCE_MODEL_ID, output_dir: str = None, force: bool = False
+) -> str:
+    """Export Florence-2 to ONNX, reusing the cached export unless `force` is set."""
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    output_dir = output_dir or get_onnx_model_dir(model_id)
+    config_path = os.path.join(output_dir, "config.json")
+    if os.path.exists(config_path) and not force:
+        return output_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"[LOG] ✅ Exporting {model_id} to ONNX in {output_dir}")
+    model = AutoModelForCausalLM.from_pretrained(model_id, trust_remote_code=True)
+    model = model.to("cpu", torch.float32).eval()
+    language_model = model.language_model
+    text_config = language_model.config
+    num_layers = text_config.decoder_layers
+
+    class VisionEncoder(torch.nn.Module):
+        def forward(self, pixel_values):
+            return model._encode_image(pixel_values)
+
+    class EmbedTokens(torch.nn.Module):
+        def forward(self, input_ids):
+            return model.get_input_embeddings()(input_ids)
+
+    class Encoder(torch.nn.Module):
+        def forward(self, inputs_embeds, attention_mask):
+            return language_model.get_encoder()(
+                inputs_embeds=inputs_embeds, attention_mask=attention_mask
+            ).last_hidden_state
+
+    class Decoder(torch.nn.Module):
+        def forward(
+            self,
+            input_ids,
+            encoder_hidden_states,
+            encoder_attention_mask,
+            *past_key_values,
+        ):
+            past = None
+            if past_key_values:
+                # Cross attention keys/values never change, only the self attention cache grows
+                past = tuple(
+                    tuple(past_key_values[4 * i : 4 * i + 4]) for i in range(num_layers)
+                )
+            outputs = language_model(
+                attention_mask=encoder_attention_mask,
+                encoder_outputs=(encoder_hidden_states,),
+                decoder_input_ids=input_ids,
+                past_key_values=past,
+                use_cache=True,
+                return_dict=True,
+            )
+            present = []
+            for layer in outputs.past_key_values:
+                present += list(layer if past is None else layer[:2])
+            return (outputs.logits, *present)
+
+    batch, image_tokens, text_tokens = 1, 577, 8
+    hidden_size = text_config.d_model
+    # Florence-2 processor output size
+    pixel_values = torch.zeros((batch, 3, 768, 768), dtype=torch.float32)
+    input_ids = torch.ones((batch, text_tokens), dtype=torch.long)
+    inputs_embeds = torch.zeros((batch, image_tokens + text_tokens, hidden_size))
+    attention_mask = torch.ones((batch, image_tokens + text_tokens), dtype=torch.long)
+    decoder_input_ids = torch.full(
+        (batch, 1), text_config.decoder_start_token_id, dtype=torch.long
+    )
+
+    with torch.no_grad():
+        torch.onnx.export(
+            VisionEncoder(),
+            (pixel_values,),
+            os.path.join(output_dir, "vision_encoder.onnx"),
+            input_names=["pixel_values"],
+            output_names=["image_features"],
+            dynamic_axes={
+                "pixel_values": {0: "batch"},
+                "image_features": {0: "batch", 1: "image_tokens"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+        torch.onnx.export(
+            EmbedTokens(),
+            (input_ids,),
+            os.path.join(output_dir, "embed_tokens.onnx"),
+            input_names=["input_ids"],
+            output_names=["inputs_embeds"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "inputs_embeds": {0: "batch", 1: "sequence"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+        torch.onnx.export(
+            Encoder(),
+            (inputs_embeds, attention_mask),
+            os.path.join(output_dir, "encoder_model.onnx"),
+            input_names=["inputs_embeds", "attention_mask"],
+            output_names=["encoder_hidden_states"],
+            dynamic_axes={
+                "inputs_embeds": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "encoder_hidden_states": {0: "batch", 1: "sequence"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+
+        encoder_hidden_states = Encoder()(inputs_embeds, attention_mask)
+        decoder_inputs = (decoder_input_ids, encoder_hidden_states, attention_mask)
+        encoder_axes = {
+            "input_ids": {0: "batch", 1: "decoder_sequence"},
+            "encoder_hidden_states": {0: "batch", 1: "encoder_sequence"},
+            "encoder_attention_mask": {0: "batch", 1: "encoder_sequence"},
+            "logits": {0: "batch", 1: "decoder_sequence"},
+        }
+        present_names = _past_names("present", num_layers)
+        torch.onnx.export(
+            Decoder(),
+            decoder_inputs,
+            os.path.join(output_dir, "decoder_model.onnx"),
+            input_names=[
+                "input_ids",
+                "encoder_hidden_states",
+                "encoder_attention_mask",
+            ],
+            output_names=["logits", *present_names],
+            dynamic_axes={**encoder_axes, **_past_axes(present_names)},
+            opset_version=ONNX_OPSET,
+        )
+
+        first_step = Decoder()(*decoder_inputs)
+        past_inputs = first_step[1:]
+        past_names = _past_names("past_key_values", num_layers)
+        self_present_names = _past_names("present", num_layers, include_encoder=False)
+        torch.onnx.export(
+            Decoder(),
+            (*decoder_inputs, *past_inputs),
+            os.path.join(output_dir, "decoder_with_past.onnx"),
+            input_names=[
+                "input_ids",
+                "encoder_hidden_states",
+                "encoder_attention_mask",
+                *past_names,
+            ],
+            output_names=["logits", *self_present_names],
+            dynamic_axes={
+                **encoder_axes,
+                **_past_axes(past_names),
+                **_past_axes(self_present_names),
+            },
+            opset_version=ONNX_OPSET,
+        )
+
+        # Other batch and sequence sizes than the traced ones, so dynamic axes are checked
+        generator = torch.Generator().manual_seed(0)
+        batch, text_tokens = 2, 5
+        pixel_values = torch.randn((batch, 3, 768, 768), generator=generator)
+        input_ids = torch.randint(
+            0, text_config.vocab_size, (batch, text_tokens), generator=generator
+        )
+        image_features = VisionEncoder()(pixel_values)
+        text_embeds = EmbedTokens()(input_ids)
+        inputs_embeds = torch.cat([image_features, text_embeds], dim=1)
+        attention_mask = torch.ones(inputs_embeds.shape[:2], dtype=torch.long)
+        encoder_hidden_states = Encoder()(inputs_embeds, attention_mask)
+        decoder_input_ids = torch.randint(
+            0, text_config.vocab_size, (batch, 3), generator=generator
+        )
+        decoder_inputs = (decoder_input_ids, encoder_hidden_states, attention_mask)
+        first_step = Decoder()(*decoder_inputs)
+        next_ids = torch.randint(
+            0, text_config.vocab_size, (batch, 1), generator=generator
+        )
+        next_step = Decoder()(next_ids, *decoder_inputs[1:], *first_step[1:])
+        _check_parity(
+            output_dir,
+            {
+                "vision_encoder": ({"pixel_values": pixel_values}, image_features),
+                "embed_tokens": ({"input_ids": input_ids}, text_embeds),
+                "encoder_model": (
+                    {"inputs_embeds": inputs_embeds, "attention_mask": attention_mask},
+                    encoder_hidden_states,
+                ),
+                "decoder_model": (
+                    {
+                        "input_ids": decoder_input_ids,
+                        "encoder_hidden_states": encoder_hidden_states,
+                        "encoder_attention_mask": attention_mask,
+                    },
+                    first_step[0],
+                ),
+                "decoder_with_past": (
+                    {
+                        "input_ids": next_ids,
+                        "encoder_hidden_states": encoder_hidden_states,
+                        "encoder_attention_mask": attention_mask,
+                        **dict(zip(past_names, first_step[1:])),
+                    },
+                    next_step[0],
+                ),
+            },
+        )
+
+    # Written last: its presence marks a complete export
+    with open(config_path, "w") as f:
+        json.dump(
+            {
+                "model_id": model_id,
+                "num_layers": num_layers,
+                "decoder_start_token_id": text_config.decoder_start_token_id,
+                "eos_token_id": text_config.eos_token_id,
+                "pad_token_id": text_config.pad_token_id,
+                "forced_bos_token_id": getattr(
+                    text_config, "forced_bos_token_id", None
+                ),
+                "forced_eos_token_id": getattr(
+                    text_config, "forced_eos_token_id", None
+                ),
+                "no_repeat_ngram_size": getattr(text_config, "no_repeat_ngram_size", 0),
+                "length_penalty": getattr(text_config, "length_penalty", 1.0),
+            },
+            f,
+            indent=2,
+        )
+    return output_dir
+
+
+def _check_parity(output_dir: str, cases: dict):
+    """
+    Run each graph on `cases` ({graph: (inputs, expected first output)}) and remove the
+    export if an output differs from PyTorch by more than PARITY_TOLERANCE.
+    """
+    import onnxruntime as ort
+
+    failures = []
+    for name, (inputs, expected) in cases.items():
+        session = ort.InferenceSession(
+            os.path.join(output_dir, f"{name}.onnx"),
+            providers=["CPUExecutionProvider"],
+        )
+        accepted = {i.name for i in session.get_inputs()}
+        output = session.run(
+            None, {k: _to_numpy(v) for k, v in inputs.items() if k in accepted}
+        )[0]
+        expected = _to_numpy(expected)
+        if output.shape != expected.shape:
+            failures.append(f"{name}: shape {output.shape} != {expected.shape}")
+            continue
+        error = np.abs(output - expected).max() / max(np.abs(expected).max(), 1e-6)
+        if error > PARITY_TOLERANCE:
+            failures.append(f"{name}: relative error {error:.2e}")
+    if failures:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise RuntimeError(f"ONNX export does not match PyTorch: {'; '.join(failures)}")
+
+
+def _to_numpy(value):
+    if hasattr(value, "detach"):
+        return value.detach().cpu().numpy()
+    return np.asarray(value)
+
+
+def _log_softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    return logits - np.log(np.exp(logits).sum(axis=-1, keepdims=True))
+
+
+class BeamHypotheses:
+    """The `num_beams` best finished sequences of one input, as in transformers."""
+
+    def __init__(self, num_beams: int, length_penalty: float, early_stopping: bool):
+        self.num_beams = num_beams
+        self.length_penalty = length_penalty
+        self.early_stopping = early_stopping
+        self.beams = []
+        self.worst_score = 1e9
+
+    def add(self, tokens: np.ndarray, sum_logprobs: float, generated_len: int):
+        score = sum_logprobs / generated_len**self.length_penalty
+        if len(self.beams) < self.num_beams or score > self.worst_score:
+            self.beams.append((score, tokens))
+            if len(self.beams) > self.num_beams:
+                ranked = sorted((s, i) for i, (s, _) in enumerate(self.beams))
+                del self.beams[ranked[0][1]]
+                self.worst_score = ranked[1][0]
+            else:
+                self.worst_score = min(score, self.worst_score)
+
+    def is_done(self, best_sum_logprobs: float, generated_len: int) -> bool:
+        if len(self.beams) < self.num_beams:
+            return False
+        if self.early_stopping:
+            return True
+        # No running beam can still beat the worst finished one
+        return (
+            self.worst_score >= best_sum_logprobs / generated_len**self.length_penalty
+        )
+
+    def best(self) -> np.ndarray:
+        return max(self.beams, key=lambda beam: beam[0])[1]
+
+
+class Florence2OnnxModel:
+    """Florence-2 generation through ONNX Runtime with KV cache reuse."""
+
+    def __init__(self, model_dir: str, providers: List[str] = None):
+        import onnxruntime as ort
+
+        with open(os.path.join(model_dir, "config.json")) as f:
+            self.config = json.load(f)
+
+        providers = providers or ["CPUExecutionProvider"]
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sessions = {
+            name: ort.InferenceSession(
+                os.path.join(model_dir, f"{name}.onnx"),
+                sess_options=options,
+                providers=providers,
+            )
+            for name in ONNX_GRAPHS
+        }
+        self.num_layers = self.config["num_layers"]
+        self.past_names = _past_names("past_key_values", self.num_layers)
+        self.device = "cpu"
+
+    def _run(self, name, **inputs):
+        session = self.sessions[name]
+        # Unused inputs may be pruned from a graph during export
+        accepted = {i.name for i in session.get_inputs()}
+        return session.run(None, {k: v for k, v in inputs.items() if k in accepted})
+
+    def _ban_repeated_ngrams(self, logits, sequences):
+        n = self.config["no_repeat_ngram_size"]
+        if not n or sequences.shape[1] < n:
+            return logits
+        for row, tokens in enumerate(sequences.tolist()):
+            prefix = tuple(tokens[len(tokens) - n + 1 :])
+            for i in range(len(tokens) - n + 1):
+                if tuple(tokens[i : i + n - 1]) == prefix:
+                    logits[row, tokens[i + n - 1]] = -np.inf
+        return logits
+
+    def _encode(self, input_ids, pixel_values):
+        """(encoder hidden states, attention mask) of the image and prompt."""
+        (image_features,) = self._run("vision_encoder", pixel_values=pixel_values)
+        (text_embeds,) = self._run("embed_tokens", input_ids=input_ids)
+        inputs_embeds = np.concatenate([image_features, text_embeds], axis=1)
+        attention_mask = np.ones(inputs_embeds.shape[:2], dtype=np.int64)
+        (encoder_hidden_states,) = self._run(
+            "encoder_model", inputs_embeds=inputs_embeds, attention_mask=attention_mask
+        )
+        return encoder_hidden_states, attention_mask
+
+    def _decode_step(self, sequences, encoder_hidden_states, attention_mask, cache):
+        """
+        Logits of the next token of every sequence and the updated KV cache.
+        `cache` is None on the first step, then (self attention, cross attention) lists.
+        """
+        if cache is None:
+            logits, *present = self._run(
+                "decoder_model",
+                input_ids=sequences,
+                encoder_hidden_states=encoder_hidden_states,
+                encoder_attention_mask=attention_mask,
+            )
+            self_past = [
+                present[4 * i + j] for i in range(self.num_layers) for j in (0, 1)
+            ]
+            cross_past = [
+                present[4 * i + j] for i in range(self.num_layers) for j in (2, 3)
+            ]
+        else:
+            self_past, cross_past = cache
+            past = {}
+            for i in range(self.num_layers):
+                past[self.past_names[4 * i]] = self_past[2 * i]
+                past[self.past_names[4 * i + 1]] = self_past[2 * i + 1]
+                past[self.past_names[4 * i + 2]] = cross_past[2 * i]
+                past[self.past_names[4 * i + 3]] = cross_past[2 * i + 1]
+            logits, *self_past = self._run(
+                "decoder_with_past",
+                input_ids=sequences[:, -1:],
+                encoder_hidden_states=encoder_hidden_states,
+                encoder_attention_mask=attention_mask,
+                **past,
+            )
+        return logits[:, -1, :].astype(np.float32), (self_past, cross_past)
+
+    def _process_scores(self, scores, sequences, step: int, max_new_tokens: int):
+        """No-repeat n-grams, then the forced first and last tokens."""
+        scores = self._ban_repeated_ngrams(scores, sequences)
+        forced = None
+        if step == 0:
+            forced = self.config["forced_bos_token_id"]
+        # Applied after the forced BOS, as in transformers
+        if (
+            step == max_new_tokens - 1
+            and self.config["forced_eos_token_id"] is not None
+        ):
+            forced = self.config["forced_eos_token_id"]
+        if forced is not None:
+            scores = np.full_like(scores, -np.inf)
+            scores[:, forced] = 0
+        return scores
+
+    def generate(
+        self,
+        input_ids,
+        pixel_values,
+        max_new_tokens: int = 1024,
+        num_beams: int = 1,
+        early_stopping: bool = False,
+        max_time: float = None,
+        do_sample: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        if do_sample or kwargs:
+            raise ValueError(
+                "The ONNX backend supports greedy decoding and beam search only, "
+                f"got do_sample={do_sample} and {', '.join(kwargs) or 'no other'} "
+                "arguments"
+            )
+        input_ids = _to_numpy(input_ids).astype(np.int64)
+        pixel_values = _to_numpy(pixel_values).astype(np.float32)
+        deadline = time.monotonic() + max_time if max_time else None
+        encoder_hidden_states, attention_mask = self._encode(input_ids, pixel_values)
+        if num_beams > 1:
+            return self._beam_search(
+                encoder_hidden_states,
+                attention_mask,
+                max_new_tokens,
+                num_beams,
+                early_stopping,
+                deadline,
+            )
+
+        batch = input_ids.shape[0]
+        eos = self.config["eos_token_id"]
+        pad = self.config["pad_token_id"]
+        sequences = np.full((batch, 1), self.config["decoder_start_token_id"], np.int64)
+        finished = np.zeros(batch, dtype=bool)
+        cache = None
+
+        for step in range(max_new_tokens):
+            logits, cache = self._decode_step(
+                sequences, encoder_hidden_states, attention_mask, cache
+            )
+            next_tokens = self._process_scores(
+                logits, sequences, step, max_new_tokens
+            ).argmax(axis=-1)
+            next_tokens = np.where(finished, pad, next_tokens).astype(np.int64)
+            sequences = np.concatenate([sequences, next_tokens[:, None]], axis=1)
+            finished |= next_tokens == eos
+            if finished.all() or (deadline and time.monotonic() > deadline):
+                break
+
+        return sequences
+
+    def _beam_search(
+        self,
+        encoder_hidden_states,
+        attention_mask,
+        max_new_tokens: int,
+        num_beams: int,
+        early_stopping: bool,
+        deadline: float = None,
+    ) -> np.ndarray:
+        """Beam search with the scoring and stopping rules of transformers."""
+        batch = encoder_hidden_states.shape[0]
+        eos = self.config["eos_token_id"]
+        pad = self.config["pad_token_id"]
+        length_penalty = self.config.get("length_penalty", 1.0)
+        # Rows are batch-major: the beams of input b are rows b * num_beams onwards
+        encoder_hidden_states = np.repeat(encoder_hidden_states, num_beams, axis=0)
+        attention_mask = np.repeat(attention_mask, num_beams, axis=0)
+        sequences = np.full(
+            (batch * num_beams, 1), self.config["decoder_start_token_id"], np.int64
+        )
+        # Only the first beam is live at the start, the others are copies of it
+        beam_scores = np.zeros((batch, num_beams), dtype=np.float32)
+        beam_scores[:, 1:] = -1e9
+        hypotheses = [
+            BeamHypotheses(num_beams, length_penalty, early_stopping)
+            for _ in range(batch)
+        ]
+        done = np.zeros(batch, dtype=bool)
+        cache = None
+
+        for step in range(max_new_tokens):
+            logits, cache = self._decode_step(
+                sequences, encoder_hidden_states, attention_mask, cache
+            )
+            scores = self._process_scores(
+                _log_softmax(logits), sequences, step, max_new_tokens
+            )
+            scores = (scores + beam_scores.reshape(-1, 1)).reshape(batch, -1)
+            vocab_size = logits.shape[-1]
+            # Two candidates per beam, so num_beams remain if every beam picks EOS
+            keep = 2 * num_beams
+            candidates = np.argpartition(-scores, keep, axis=1)[:, :keep]
+            order = np.argsort(
+                -np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable"
+            )
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+            next_scores = np.zeros((batch, num_beams), dtype=np.float32)
+            next_tokens = np.full((batch, num_beams), pad, dtype=np.int64)
+            next_rows = np.repeat(np.arange(batch) * num_beams, num_beams).reshape(
+                batch, num_beams
+            )
+            # Sequence length once this step's token is appended, minus the start token
+            generated_len = sequences.shape[1]
+            for b in range(batch):
+                if done[b]:
+                    continue
+                beam = 0
+                for rank, (candidate, score) in enumerate(
+                    zip(candidates[b], candidate_scores[b])
+                ):
+                    row = b * num_beams + candidate // vocab_size
+                    token = candidate % vocab_size
+                    if token == eos:
+                        if rank < num_beams:
+                            hypotheses[b].add(
+                                sequences[row].copy(), float(score), generated_len
+                            )
+                    else:
+                        next_scores[b, beam] = score
+                        next_tokens[b, beam] = token
+                        next_rows[b, beam] = row
+                        beam += 1
+                    if beam == num_beams:
+                        break
+                done[b] = hypotheses[b].is_done(
+                    float(candidate_scores[b].max()), generated_len
+                )
+
+            beam_scores = next_scores
+            rows = next_rows.reshape(-1)
+            sequences = np.concatenate(
+                [sequences[rows], next_tokens.reshape(-1, 1)], axis=1
+            )
+            # Beams only move within their input, whose cross attention cache is shared
+            self_past, cross_past = cache
+            cache = ([past[rows] for past in self_past], cross_past)
+            if done.all() or (deadline and time.monotonic() > deadline):
+                break
+
+        for b in range(batch):
+            if done[b]:
+                continue
+            for beam in range(num_beams):
+                row = b * num_beams + beam
+                hypotheses[b].add(
+                    sequences[row], float(beam_scores[b, beam]), sequences.shape[1] - 1
+                )
+
+        best = [hypothesis.best() for hypothesis in hypotheses]
+        length = min(max(len(tokens) for tokens in best) + 1, max_new_tokens + 1)
+        output = np.full((batch, length), pad, dtype=np.int64)
+        for b, tokens in enumerate(best):
+            output[b, : len(tokens)] = tokens
+            # Finished hypotheses were stored without their EOS
+            if len(tokens) < length:
+                output[b, len(tokens)] = eos
+        return output
+
+
+def load_florence2_onnx(model_id: str = FLORENCE_MODEL_ID) -> Florence2OnnxModel:
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            "The ONNX vision backend needs onnxruntime, install the onnx extra: "
+            "pip install omniparse[onnx]"
+        ) from e
+    model_dir = export_florence2_onnx(model_id)
+    logging.debug(f"[LOG] Loading ONNX Florence-2 from {model_dir}")
+    return Florence2OnnxModel(model_dir)
@@ -12,7 +12,7 @@ Original Date: 2024-06-30
 URL: https://huggingface.co/spaces/gokaygokay/Florence-2
 """
 
-from typing import Dict, Any, Union
+from typing import Dict, Any, List, Union
 from PIL import Image as PILImage
 import base64
 from io import BytesIO
@@ -20,9 +20,88 @@ import copy
 from omniparse.image.utils import plot_bbox, fig_to_pil, draw_polygons, draw_ocr_bboxes
 from omniparse.models import responseDocument
 
+VISION_BACKENDS = ["torch", "onnx"]
+
+# Florence-2 decoding profiles. Token caps are per task ("default" covers the rest);
+# generation stops at EOS, at the token cap or after max_time seconds.
+# "accurate" matches the settings every task used before profiles existed.
+DECODING_PROFILES = {
+    "fast": {
+        "num_beams": 1,
+        "early_stopping": False,
+        "max_time": 10.0,
+        "max_new_tokens": {
+            "<CAPTION>": 32,
+            "<DETAILED_CAPTION>": 96,
+            "<MORE_DETAILED_CAPTION>": 192,
+            "<REGION_TO_CATEGORY>": 16,
+            "<REGION_TO_DESCRIPTION>": 48,
+            "default": 512,
+        },
+    },
+    "balanced": {
+        "num_beams": 3,
+        "early_stopping": True,
+        "max_time": 30.0,
+        "max_new_tokens": {
+            "<CAPTION>": 64,
+            "<DETAILED_CAPTION>": 128,
+            "<MORE_DETAILED_CAPTION>": 256,
+            "<REGION_TO_CATEGORY>": 16,
+            "<REGION_TO_DESCRIPTION>": 64,
+            "default": 1024,
+        },
+    },
+    "accurate": {
+        "num_beams": 3,
+        "early_stopping": False,
+        "max_time": None,
+        "max_new_tokens": {"default": 1024},
+    },
+}
+DEFAULT_DECODING_PROFILE = "accurate"
+
+
+def get_decoding_settings(task_prompt: str, profile: str = DEFAULT_DECODING_PROFILE):
+    """Return the `generate` keyword arguments of a decoding profile for a Florence-2 task prompt."""
+    if profile not in DECODING_PROFILES:
+        raise ValueError(
+            f"Invalid decoding profile '{profile}'. Choose from: {', '.join(DECODING_PROFILES)}"
+        )
+    settings = dict(DECODING_PROFILES[profile])
+    max_new_tokens = settings.pop("max_new_tokens")
+    settings["max_new_tokens"] = max_new_tokens.get(
+        task_prompt, max_new_tokens["default"]
+    )
+    if settings["max_time"] is None:
+        del settings["max_time"]
+    return settings
+
+
+def load_vision_model(model_id: str, backend: str = "torch", device="cpu"):
+    """Load Florence-2 for the selected runtime backend."""
+    if backend == "torch":
+        from transformers import AutoModelForCausalLM
+
+        return AutoModelForCausalLM.from_pretrained(
+            model_id, trust_remote_code=True
+        ).to(device)
+    elif backend == "onnx":
+        # CPU only; exported on first use and cached under ~/.omniparse/models
+        from omniparse.image.onnx_backend import load_florence2_onnx
+
+        return load_florence2_onnx(model_id)
+    else:
+        raise ValueError(
+            f"Invalid vision backend '{backend}'. Choose from: {', '.join(VISION_BACKENDS)}"
+        )
+
 
 def process_image_task(
-    image_data: Union[str, bytes, PILImage.Image], task_prompt: str, model_state
+    image_data: Union[str, bytes, PILImage.Image],
+    task_prompt: str,
+    model_state,
+    profile: str = DEFAULT_DECODING_PROFILE,
 ) -> Dict[str, Any]:
     # Convert image_data if it's in bytes
     if isinstance(image_data, bytes):
@@ -83,6 +162,7 @@ def process_image_task(
         task_prompt_model,
         model_state.vision_model,
         model_state.vision_processor,
+        profile,
     )
     # Update responseDocument fields based on the results
     process_image_result = responseDocument(text=str(results))
@@ -94,69 +174,105 @@ def process_image_task(
 
 
 # Your pre_process_image function with some adjustments
-def pre_process_image(image, task_prompt, vision_model, vision_processor):
+def pre_process_image(
+    image, task_prompt, vision_model, vision_processor, profile=DEFAULT_DECODING_PROFILE
+):
     if task_prompt == "<CAPTION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         return results, None
     elif task_prompt == "<DETAILED_CAPTION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         return results, None
     elif task_prompt == "<MORE_DETAILED_CAPTION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         return results, None
     elif task_prompt == "<CAPTION_TO_PHRASE_GROUNDING>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<DETAILED_CAPTION + GROUNDING>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<MORE_DETAILED_CAPTION + GROUNDING>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<OD>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<DENSE_REGION_CAPTION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<REGION_PROPOSAL>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<CAPTION_TO_PHRASE_GROUNDING>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<REFERRING_EXPRESSION_SEGMENTATION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         output_image = copy.deepcopy(image)
         output_image = draw_polygons(output_image, results[task_prompt], fill_mask=True)
         return results, output_image
     elif task_prompt == "<REGION_TO_SEGMENTATION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         output_image = copy.deepcopy(image)
         output_image = draw_polygons(output_image, results[task_prompt], fill_mask=True)
         return results, output_image
     elif task_prompt == "<OPEN_VOCABULARY_DETECTION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         fig = plot_bbox(image, results[task_prompt])
         return results, fig_to_pil(fig)
     elif task_prompt == "<REGION_TO_CATEGORY>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         return results, None
     elif task_prompt == "<REGION_TO_DESCRIPTION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         return results, None
     elif task_prompt == "<OCR>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         return results, None
     elif task_prompt == "<OCR_WITH_REGION>":
-        results = run_example(task_prompt, image, vision_model, vision_processor)
+        results = run_example(
+            task_prompt, image, vision_model, vision_processor, profile
+        )
         output_image = copy.deepcopy(image)
         output_image = draw_ocr_bboxes(output_image, results[task_prompt])
         return results, output_image
@@ -164,19 +280,21 @@ def pre_process_image(image, task_prompt, vision_model, vision_processor):
         raise ValueError("Invalid task prompt")
 
 
-def run_example(task_prompt, image, vision_model, vision_processor):
+def run_example(
+    task_prompt, image, vision_model, vision_processor, profile=DEFAULT_DECODING_PROFILE
+):
     # if text_input is None:
     prompt = task_prompt
     # else:
     #     prompt = task_prompt + text_input
-    inputs = vision_processor(text=prompt, images=image, return_tensors="pt").to("cuda")
+    inputs = vision_processor(text=prompt, images=image, return_tensors="pt").to(
+        vision_model.device
+    )
     generated_ids = vision_model.generate(
         input_ids=inputs["input_ids"],
         pixel_values=inputs["pixel_values"],
-        max_new_tokens=1024,
-        early_stopping=False,
         do_sample=False,
-        num_beams=3,
+        **get_decoding_settings(task_prompt, profile),
     )
     generated_text = vision_processor.batch_decode(
         generated_ids, skip_special_tokens=False
@@ -185,3 +303,72 @@ def run_example(task_prompt, image, vision_model, vision_processor):
         generated_text, task=task_prompt, image_size=(image.width, image.height)
     )
     return parsed_answer
+
+
+# Tasks usable for captioning extracted images
+CAPTION_TASK_PROMPTS = {
+    "Caption": "<CAPTION>",
+    "Detailed Caption": "<DETAILED_CAPTION>",
+    "More Detailed Caption": "<MORE_DETAILED_CAPTION>",
+}
+CAPTION_BATCH_SIZE = 8
+
+
+def run_batch(
+    task_prompt,
+    images,
+    vision_model,
+    vision_processor,
+    profile=DEFAULT_DECODING_PROFILE,
+):
+    # Same prompt for every image, so the input_ids need no padding
+    inputs = vision_processor(
+        text=[task_prompt] * len(images), images=images, return_tensors="pt"
+    ).to(vision_model.device)
+    generated_ids = vision_model.generate(
+        input_ids=inputs["input_ids"],
+        pixel_values=inputs["pixel_values"],
+        do_sample=False,
+        **get_decoding_settings(task_prompt, profile),
+    )
+    generated_texts = vision_processor.batch_decode(
+        generated_ids, skip_special_tokens=False
+    )
+    return [
+        vision_processor.post_process_generation(
+            generated_text, task=task_prompt, image_size=(image.width, image.height)
+        )
+        for generated_text, image in zip(generated_texts, images)
+    ]
+
+
+def generate_captions(
+    images: List[PILImage.Image],
+    model_state,
+    task: str = "Caption",
+    batch_size: int = CAPTION_BATCH_SIZE,
+    profile: str = DEFAULT_DECODING_PROFILE,
+) -> List[str]:
+    """Caption images with Florence-2, `batch_size` images per generate call."""
+    if model_state.vision_model is None:
+        raise ValueError(
+            "Vision model is not loaded, start the server with --documents"
+        )
+    if task not in CAPTION_TASK_PROMPTS:
+        raise ValueError(
+            f"Invalid caption task. Choose from: {', '.join(CAPTION_TASK_PROMPTS)}"
+        )
+    task_prompt = CAPTION_TASK_PROMPTS[task]
+
+    captions = []
+    for start in range(0, len(images), batch_size):
+        batch = [image.convert("RGB") for image in images[start : start + batch_size]]
+        results = run_batch(
+            task_prompt,
+            batch,
+            model_state.vision_model,
+            model_state.vision_processor,
+            profile,
+        )
+        captions.extend(result[task_prompt].strip() for result in results)
+    return captions
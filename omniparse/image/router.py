@@ -2,6 +2,7 @@ from fastapi import UploadFile, File, HTTPException, APIRouter, Form
 from fastapi.responses import JSONResponse
 from omniparse import get_shared_state
 from omniparse.image import parse_image, process_image
+from omniparse.image.process import DEFAULT_DECODING_PROFILE
 from omniparse.models import responseDocument
 
 image_router = APIRouter()
@@ -20,10 +21,14 @@ async def parse_image_endpoint(file: UploadFile = File(...)):
 
 
 @image_router.post("/process_image")
-async def process_image_route(image: UploadFile = File(...), task: str = Form(...)):
+async def process_image_route(
+    image: UploadFile = File(...),
+    task: str = Form(...),
+    profile: str = Form(DEFAULT_DECODING_PROFILE),
+):
     try:
         file_bytes = await image.read()
-        result: responseDocument = process_image(file_bytes, task, model_state)
+        result: responseDocument = process_image(file_bytes, task, model_state, profile)
         return JSONResponse(content=result.model_dump())
 
     except Exception as e:
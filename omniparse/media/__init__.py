@@ -18,80 +18,431 @@ All credits for the original implementation go to OpenAI.
 """
 
 import os
+import json
+import time
+import asyncio
 import tempfile
+from contextlib import contextmanager
+from typing import List
 from fastapi import UploadFile
 from fastapi.responses import JSONResponse
-from moviepy.editor import VideoFileClip
 from omniparse.models import responseDocument
+from omniparse.image.process import generate_captions
+from omniparse.media.keyframes import extract_keyframes
 from omniparse.media.utils import WHISPER_DEFAULT_SETTINGS
 from omniparse.media.utils import transcribe  # Assuming transcribe function is imported
+from omniparse.media.utils import transcribe_parallel, load_audio, clamp_workers
+from omniparse.media.model_cache import check_model_size
+from omniparse.media.checkpoint import (
+    CHECKPOINT_SETTINGS,
+    open_checkpoint,
+    transcribe_resumable,
+)
+from omniparse.media.remote import iter_transcribe_url
+from omniparse.media.fingerprint import get_fingerprint_cache
+from omniparse.media.batching import (
+    model_lock,
+    submit_clip,
+    is_short_clip,
+    stitch_windows,
+)
+from omniparse.media.utils import SAMPLE_RATE, trim_silence, offset_segments
+from omniparse.media.utils import (
+    iter_transcribe,
+    compact_segment,
+    segments_to_srt,
+    segments_to_vtt,
+    format_timestamp,
+)
 
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
-def parse_audio(input_data, model_state) -> responseDocument:
-    try:
-        if isinstance(input_data, bytes):
-            with tempfile.NamedTemporaryFile(
-                delete=False, suffix=".wav"
-            ) as temp_audio_file:
-                temp_audio_file.write(input_data)
-                temp_audio_path = temp_audio_file.name
-        elif isinstance(input_data, str) and os.path.isfile(input_data):
-            temp_audio_path = input_data
-        else:
+
+def get_whisper_model(model_state, model_size: str = None):
+    """Resolve the Whisper model for a request, loading `model_size` into the model cache if needed."""
+    model_size = model_size or model_state.whisper_model_name
+    if model_state.whisper_models is None:
+        if model_size != model_state.whisper_model_name:
             raise ValueError(
-                "Invalid input data format. Expected audio bytes or audio file path."
+                "Media models are not loaded. Start the server with --media"
             )
+        return model_state.whisper_model
+    return model_state.whisper_models.get(model_size)
+
+
+def _transcribe_speech(
+    audio, model_state, workers: int = 1, model_size: str = None
+) -> dict:
+    model_size = model_size or model_state.whisper_model_name
+    # Very long recordings checkpoint every finished chunk so a re-submitted job resumes
+    resumable = len(audio) >= CHECKPOINT_SETTINGS["min_seconds"] * SAMPLE_RATE
 
-        # Transcribe the audio file
-        transcript = transcribe(
-            audio_path=temp_audio_path,
-            whisper_model=model_state.whisper_model,
+    # Long recordings are split at silences and transcribed across worker processes
+    workers = clamp_workers(workers)
+    if workers > 1:
+        check_model_size(model_size)
+        return transcribe_parallel(
+            audio,
+            model_size,
+            workers,
+            checkpoint=(
+                open_checkpoint(audio, model_size, **WHISPER_DEFAULT_SETTINGS)
+                if resumable
+                else None
+            ),
+            **WHISPER_DEFAULT_SETTINGS,
+        )
+    whisper_model = get_whisper_model(model_state, model_size)
+    if resumable:
+        return transcribe_resumable(
+            audio,
+            whisper_model,
+            model_size,
+            lock=model_lock(whisper_model),
+            **WHISPER_DEFAULT_SETTINGS,
+        )
+    with model_lock(whisper_model):
+        return transcribe(
+            audio_path=audio,
+            whisper_model=whisper_model,
             **WHISPER_DEFAULT_SETTINGS,
         )
 
-        return responseDocument(text=transcript["text"])
 
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
+def no_speech_transcript(audio) -> dict:
+    return {
+        "text": "",
+        "segments": [],
+        "language": None,
+        "no_speech": True,
+        "skipped_seconds": round(len(audio) / SAMPLE_RATE, 3),
+    }
 
 
-def parse_video(input_data, model_state) -> responseDocument:
-    try:
-        if isinstance(input_data, bytes):
-            with tempfile.NamedTemporaryFile(
-                delete=False, suffix=".mp4"
-            ) as temp_video_file:
-                temp_video_file.write(input_data)
-                video_path = temp_video_file.name
-        elif isinstance(input_data, str) and os.path.isfile(input_data):
-            video_path = input_data
-        else:
-            raise ValueError(
-                "Invalid input data format. Expected video bytes or video file path."
+def _restore_trimmed(transcript: dict, audio, start: int, end: int) -> dict:
+    """Shift a transcript of `audio[start:end]` back onto the timeline of `audio`."""
+    transcript["segments"] = offset_segments(
+        transcript["segments"], start / SAMPLE_RATE
+    )
+    transcript["no_speech"] = False
+    transcript["skipped_seconds"] = round((len(audio) - (end - start)) / SAMPLE_RATE, 3)
+    return transcript
+
+
+def _fingerprint_settings(batched: bool) -> dict:
+    # Batched windows are cut at silences and decoded on their own, cached apart
+    return {"whisper": WHISPER_DEFAULT_SETTINGS, "batched": batched}
+
+
+def _transcribe_trimmed(
+    audio, start: int, end: int, model_state, workers: int, model_size: str
+) -> dict:
+    """`transcribe_audio` of `audio` whose speech was trimmed to `audio[start:end]`."""
+    speech = audio[start:end]
+
+    # Re-encoded copies of an already transcribed recording skip model loading and Whisper
+    cache = get_fingerprint_cache()
+    settings = _fingerprint_settings(batched=False)
+    transcript = cache.get(speech, model_size, settings)
+    if transcript is None:
+        started = time.perf_counter()
+        transcript = _transcribe_speech(speech, model_state, workers, model_size)
+        cache.put(
+            speech, model_size, settings, transcript, time.perf_counter() - started
+        )
+    return _restore_trimmed(transcript, audio, start, end)
+
+
+def transcribe_audio(
+    audio, model_state, workers: int = 1, model_size: str = None
+) -> dict:
+    # Leading and trailing silence is trimmed; silent files never reach Whisper
+    start, end = trim_silence(audio)
+    if start == end:
+        return no_speech_transcript(audio)
+    model_size = model_size or model_state.whisper_model_name
+    return _transcribe_trimmed(audio, start, end, model_state, workers, model_size)
+
+
+def _submit_batched(audio, model_state, workers: int, model_size: str, batch: bool):
+    """
+    Blocking half of `transcribe_audio_async`: trims `audio`, checks the fingerprint
+    cache and queues the windows of a short clip. Returns (start, end, cached
+    transcript, chunks, futures), chunks None when the clip is not batched.
+    """
+    start, end = trim_silence(audio)
+    if start == end or not batch or workers > 1 or not is_short_clip(audio[start:end]):
+        return start, end, None, None, None
+    speech = audio[start:end]
+    transcript = get_fingerprint_cache().get(
+        speech, model_size, _fingerprint_settings(batched=True)
+    )
+    if transcript is not None:
+        return start, end, transcript, None, None
+    chunks, futures = submit_clip(get_whisper_model(model_state, model_size), speech)
+    return start, end, None, chunks, futures
+
+
+async def transcribe_audio_async(
+    audio,
+    model_state,
+    workers: int = 1,
+    model_size: str = None,
+    batch: bool = False,
+) -> dict:
+    """
+    `transcribe_audio` in a worker thread. With `batch`, short clips are queued on the
+    shared batch scheduler instead, so clips from concurrent requests are decoded
+    together in one batch.
+    """
+    model_size = model_size or model_state.whisper_model_name
+    started = time.perf_counter()
+    start, end, transcript, chunks, futures = await asyncio.to_thread(
+        _submit_batched, audio, model_state, workers, model_size, batch
+    )
+    if start == end:
+        return no_speech_transcript(audio)
+    if transcript is None:
+        # Unbatched clips, and clips too quiet for the voice activity detection, are
+        # decoded whole
+        if not chunks:
+            return await asyncio.to_thread(
+                _transcribe_trimmed,
+                audio,
+                start,
+                end,
+                model_state,
+                workers,
+                model_size,
             )
+        results = [await asyncio.wrap_future(future) for future in futures]
+        transcript = stitch_windows(chunks, results)
+        await asyncio.to_thread(
+            get_fingerprint_cache().put,
+            audio[start:end],
+            model_size,
+            _fingerprint_settings(batched=True),
+            transcript,
+            time.perf_counter() - started,
+        )
+    return _restore_trimmed(transcript, audio, start, end)
 
-        # Extract audio from the video
-        audio_path = f"{tempfile.gettempdir()}/{os.path.splitext(os.path.basename(video_path))[0]}.mp3"
-        video_clip = VideoFileClip(video_path)
-        audio_clip = video_clip.audio
-        audio_clip.write_audiofile(audio_path)
-        audio_clip.close()
-        video_clip.close()
-
-        # Transcribe the audio file
-        transcript = transcribe(
-            audio_path=audio_path,
-            whisper_model=model_state.whisper_model,
-            **WHISPER_DEFAULT_SETTINGS,
+
+def transcript_to_document(transcript: dict) -> responseDocument:
+    return responseDocument(
+        text=transcript["text"],
+        metadata={
+            "language": transcript.get("language"),
+            "segments": [compact_segment(s) for s in transcript["segments"]],
+            "no_speech": transcript.get("no_speech", False),
+            "skipped_seconds": transcript.get("skipped_seconds", 0.0),
+            "restored_seconds": transcript.get("restored_seconds", 0.0),
+        },
+    )
+
+
+def keyframes_to_document(
+    transcript: dict, keyframes: List[dict], captions: List[str]
+) -> responseDocument:
+    """Merge keyframe captions and transcript segments into one time-ordered markdown document."""
+    document = transcript_to_document(transcript)
+    events = [
+        (keyframe["time"], 0, f"![{caption}](keyframe_{i}.jpg)")
+        for i, (keyframe, caption) in enumerate(zip(keyframes, captions))
+    ]
+    events += [
+        (segment["start"], 1, segment["text"].strip())
+        for segment in transcript["segments"]
+        if segment["text"].strip()
+    ]
+    # At equal timestamps the frame comes before the speech over it
+    document.text = "\n\n".join(
+        f"**[{format_timestamp(time)}]** {text}" for time, _, text in sorted(events)
+    )
+
+    for i, (keyframe, caption) in enumerate(zip(keyframes, captions)):
+        document.add_image(
+            f"keyframe_{i}.jpg",
+            keyframe["image"],
+            {"time": keyframe["time"], "score": keyframe["score"], "caption": caption},
         )
+    document.metadata["keyframes"] = [
+        {"time": keyframe["time"], "caption": caption}
+        for keyframe, caption in zip(keyframes, captions)
+    ]
+    return document
+
+
+def parse_keyframes(video_path: str, model_state, caption_task: str = "Caption"):
+    """Extract scene-change keyframes of a video and caption them in batches."""
+    keyframes = extract_keyframes(video_path)
+    captions = generate_captions(
+        [keyframe["image"] for keyframe in keyframes], model_state, caption_task
+    )
+    return keyframes, captions
 
-        return responseDocument(text=transcript["text"])
 
+@contextmanager
+def media_file(input_data, suffix: str = ""):
+    """Path to uploaded media bytes (written to a temporary file) or to a media file."""
+    if isinstance(input_data, str) and os.path.isfile(input_data):
+        yield input_data
+        return
+    if not isinstance(input_data, bytes):
+        raise ValueError(
+            "Invalid input data format. Expected media bytes or media file path."
+        )
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_media_file:
+        temp_media_file.write(input_data)
+        media_path = temp_media_file.name
+    try:
+        yield media_path
     finally:
-        # Clean up the temporary files
-        if os.path.exists(video_path):
-            os.remove(video_path)
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+        os.remove(media_path)
+
+
+def decode_media(input_data, suffix: str = ""):
+    """Decode uploaded media bytes or a media file path to 16 kHz mono PCM."""
+    with media_file(input_data, suffix) as media_path:
+        return load_audio(media_path)
+
+
+def decode_video(input_data, model_state, keyframes: bool = False):
+    """
+    Decode the audio track of a video to 16 kHz mono PCM and, with `keyframes`, extract
+    and caption its scene-change keyframes from the same file. Returns (audio,
+    keyframes, captions), the last two None without `keyframes`.
+    """
+    with media_file(input_data, suffix=".mp4") as video_path:
+        audio = load_audio(video_path)
+        if not keyframes:
+            return audio, None, None
+        return (audio, *parse_keyframes(video_path, model_state))
+
+
+def parse_audio(
+    input_data, model_state, workers: int = 1, model_size: str = None
+) -> responseDocument:
+    """Transcribe audio bytes or an audio file path to a document."""
+    transcript = transcribe_audio(
+        decode_media(input_data, suffix=".wav"), model_state, workers, model_size
+    )
+    return transcript_to_document(transcript)
+
+
+def parse_video(
+    input_data,
+    model_state,
+    workers: int = 1,
+    model_size: str = None,
+    keyframes: bool = False,
+) -> responseDocument:
+    """Transcribe video bytes or a video file path, with captioned keyframes if asked."""
+    audio, frames, captions = decode_video(input_data, model_state, keyframes)
+    transcript = transcribe_audio(audio, model_state, workers, model_size)
+    if keyframes:
+        return keyframes_to_document(transcript, frames, captions)
+    return transcript_to_document(transcript)
+
+
+def _stream_event(event: str, data: dict, output_format: str) -> str:
+    if output_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"type": event, **data}) + "\n"
+
+
+def _stream_results(results, output_format: str, offset: float = 0.0, **done_fields):
+    """Emit the segments of chunk results as they arrive, then the "done" event."""
+    segments, texts, language = [], [], None
+    for result in results:
+        language = language or result["language"]
+        if result["text"].strip():
+            texts.append(result["text"].strip())
+        for segment in result["segments"]:
+            # Back onto the untrimmed timeline
+            segment = compact_segment(segment)
+            segment["start"] = round(segment["start"] + offset, 3)
+            segment["end"] = round(segment["end"] + offset, 3)
+            segments.append(segment)
+            yield _stream_event("segment", segment, output_format)
+
+    yield _stream_event(
+        "done",
+        {
+            "text": " ".join(texts),
+            "language": language,
+            **done_fields,
+            "srt": segments_to_srt(segments),
+            "vtt": segments_to_vtt(segments),
+        },
+        output_format,
+    )
+
+
+def _check_stream_format(output_format: str):
+    if output_format not in STREAM_MEDIA_TYPES:
+        raise ValueError(
+            f"Invalid stream format. Choose from: {', '.join(STREAM_MEDIA_TYPES)}"
+        )
+
+
+def stream_transcript(
+    audio, model_state, output_format: str = "ndjson", model_size: str = None
+):
+    """
+    Transcribe PCM audio chunk by chunk, yielding every decoded segment as soon as it is ready.
+
+    Emits NDJSON lines (`{"type": "segment", ...}`) or SSE events (`event: segment`), followed by
+    a final "done" event carrying the full text and its SRT and VTT renderings.
+    """
+    _check_stream_format(output_format)
+
+    start, end = trim_silence(audio)
+    results = []
+    if start != end:
+        whisper_model = get_whisper_model(model_state, model_size)
+        results = iter_transcribe(
+            audio[start:end],
+            whisper_model,
+            lock=model_lock(whisper_model),
+            **WHISPER_DEFAULT_SETTINGS,
+        )
+
+    yield from _stream_results(
+        results,
+        output_format,
+        offset=start / SAMPLE_RATE,
+        no_speech=start == end,
+        skipped_seconds=round((len(audio) - (end - start)) / SAMPLE_RATE, 3),
+    )
+
+
+def _transcribe_url(url: str, model_state, model_size: str = None):
+    whisper_model = get_whisper_model(model_state, model_size)
+    return iter_transcribe_url(
+        url,
+        whisper_model,
+        lock=model_lock(whisper_model),
+        **WHISPER_DEFAULT_SETTINGS,
+    )
+
+
+def stream_url_transcript(
+    url: str, model_state, output_format: str = "ndjson", model_size: str = None
+):
+    """Like `stream_transcript`, for remote media transcribed while it downloads."""
+    _check_stream_format(output_format)
+    yield from _stream_results(
+        _transcribe_url(url, model_state, model_size), output_format
+    )
+
+
+def parse_media_url(url: str, model_state, model_size: str = None) -> responseDocument:
+    results = list(_transcribe_url(url, model_state, model_size))
+    return transcript_to_document(
+        {
+            "text": " ".join(r["text"].strip() for r in results if r["text"].strip()),
+            "segments": [segment for r in results for segment in r["segments"]],
+            "language": results[0]["language"] if results else None,
+        }
+    )
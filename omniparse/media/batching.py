@@ -0,0 +1,251 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Cross-request batching of short clips (voicemails, voice notes) through Whisper.
+
+Every clip is cut into windows of at most 30 s (Whisper's context). Windows queued by
+concurrent requests are padded to 30 s log-mel spectrograms, stacked, and encoded and
+decoded in a single `whisper.decode` call, so the per-call overhead is paid once per batch.
+Batches decode with timestamps at the first temperature; a window that fails
+`transcribe`'s compression ratio or log probability checks is decoded again on its own
+by `transcribe`, with its temperature fallback.
+"""
+
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from typing import List, Tuple
+
+import numpy as np
+
+from omniparse.media.utils import (
+    SAMPLE_RATE,
+    WHISPER_DEFAULT_SETTINGS,
+    split_on_silence,
+    stitch_transcripts,
+    transcribe,
+)
+
+WHISPER_BATCH_SETTINGS = {
+    "max_batch_size": 8,
+    "max_wait_ms": 50,  # how long the first queued window waits for others to join it
+    "max_clip_seconds": 120.0,  # longer recordings use the sequential transcribe path
+}
+
+# Whisper installs KV-cache hooks on the model for every decode call, so two decodes must
+# never run on the same model at once
+_model_locks = weakref.WeakKeyDictionary()
+_model_locks_guard = threading.Lock()
+
+
+def model_lock(whisper_model) -> threading.Lock:
+    with _model_locks_guard:
+        if whisper_model not in _model_locks:
+            _model_locks[whisper_model] = threading.Lock()
+        return _model_locks[whisper_model]
+
+
+def timestamp_segments(result, tokenizer, clip_seconds: float) -> List[dict]:
+    """
+    Segments of a decoded window from its timestamp tokens, as `whisper.transcribe`
+    builds them. Text after the last timestamp pair ends at the end of the clip.
+    """
+    timestamp_begin = tokenizer.timestamp_begin
+    tokens = list(result.tokens)
+
+    def seconds(token):
+        return round(min((token - timestamp_begin) * 0.02, clip_seconds), 3)
+
+    def segment(start, end, text_tokens):
+        return {
+            "id": 0,
+            "start": start,
+            "end": end,
+            "text": tokenizer.decode(text_tokens),
+            "tokens": text_tokens,
+            "temperature": result.temperature,
+            "avg_logprob": result.avg_logprob,
+            "compression_ratio": result.compression_ratio,
+            "no_speech_prob": result.no_speech_prob,
+        }
+
+    is_timestamp = [token >= timestamp_begin for token in tokens]
+    # A segment ends where two timestamps follow each other
+    boundaries = [
+        i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]
+    ]
+    segments = []
+    last = 0
+    for boundary in boundaries:
+        piece = tokens[last:boundary]
+        segments.append(
+            segment(
+                seconds(piece[0]),
+                seconds(piece[-1]),
+                [token for token in piece if token < timestamp_begin],
+            )
+        )
+        last = boundary
+    rest = tokens[last:]
+    text_tokens = [token for token in rest if token < timestamp_begin]
+    if text_tokens:
+        start = seconds(rest[0]) if is_timestamp[last] else 0.0
+        end = seconds(rest[-1]) if is_timestamp[-1] else round(clip_seconds, 3)
+        segments.append(segment(start, max(start, end), text_tokens))
+
+    for i, item in enumerate(segments):
+        item["id"] = i
+    return [item for item in segments if item["text"].strip()]
+
+
+def decode_batch(whisper_model, clips: List[np.ndarray], **whisper_args) -> List[dict]:
+    """Transcribe clips of at most 30 s with one batched encoder and decoder pass."""
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    settings = {**WHISPER_DEFAULT_SETTINGS, **whisper_args}
+    mel = torch.stack(
+        [
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(clip), whisper_model.dims.n_mels
+            )
+            for clip in clips
+        ]
+    ).to(whisper_model.device)
+    options = whisper.DecodingOptions(
+        task=settings["task"],
+        temperature=settings["temperature"],
+        fp16=whisper_model.device.type == "cuda",
+    )
+    with model_lock(whisper_model):
+        decoded = whisper.decode(whisper_model, mel, options)
+
+    results = []
+    for clip, result in zip(clips, decoded):
+        # Same rules as whisper.transcribe: silence is dropped, a window that looks
+        # like a failed decode goes through the temperature fallback
+        no_speech = (
+            result.no_speech_prob > settings["no_speech_threshold"]
+            and result.avg_logprob < settings["logprob_threshold"]
+        )
+        needs_fallback = (
+            result.compression_ratio > settings["compression_ratio_threshold"]
+            or result.avg_logprob < settings["logprob_threshold"]
+        ) and result.no_speech_prob <= settings["no_speech_threshold"]
+        if needs_fallback:
+            with model_lock(whisper_model):
+                results.append(transcribe(clip, whisper_model, **settings))
+            continue
+        if no_speech:
+            results.append({"text": "", "segments": [], "language": result.language})
+            continue
+        tokenizer = get_tokenizer(
+            whisper_model.is_multilingual,
+            num_languages=whisper_model.num_languages,
+            language=result.language,
+            task=settings["task"],
+        )
+        segments = timestamp_segments(result, tokenizer, len(clip) / SAMPLE_RATE)
+        results.append(
+            {
+                "text": "".join(segment["text"] for segment in segments).strip(),
+                "segments": segments,
+                "language": result.language,
+            }
+        )
+    return results
+
+
+class WhisperBatchScheduler:
+    """
+    Background thread that groups queued 30 s windows by model into batches.
+
+    A batch is dispatched once `max_batch_size` windows for the same model are queued or
+    the oldest window has waited `max_wait_ms`.
+    """
+
+    def __init__(self, max_batch_size: int = None, max_wait_ms: float = None):
+        self.max_batch_size = max_batch_size or WHISPER_BATCH_SETTINGS["max_batch_size"]
+        self.max_wait = (max_wait_ms or WHISPER_BATCH_SETTINGS["max_wait_ms"]) / 1000
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, whisper_model, clip: np.ndarray) -> Future:
+        """Queue a window of at most 30 s; the future resolves to its transcript."""
+        future = Future()
+        with self._condition:
+            self._queue.append((whisper_model, clip, future))
+            self._condition.notify()
+        return future
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            whisper_model = self._queue[0][0]
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                batch = [item for item in self._queue if item[0] is whisper_model]
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.max_batch_size or remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = batch[: self.max_batch_size]
+            for item in batch:
+                self._queue.remove(item)
+        return whisper_model, batch
+
+    def _run(self):
+        while True:
+            whisper_model, batch = self._next_batch()
+            try:
+                results = decode_batch(whisper_model, [clip for _, clip, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+_scheduler = None
+_scheduler_guard = threading.Lock()
+
+
+def get_batch_scheduler() -> WhisperBatchScheduler:
+    global _scheduler
+    with _scheduler_guard:
+        if _scheduler is None:
+            _scheduler = WhisperBatchScheduler()
+        return _scheduler
+
+
+def submit_clip(
+    whisper_model, audio: np.ndarray
+) -> Tuple[List[Tuple[int, int]], List[Future]]:
+    """
+    Cut a short clip into windows at silences and queue them on the shared scheduler.
+    No windows are queued if voice activity detection finds no speech.
+    """
+    scheduler = get_batch_scheduler()
+    chunks = split_on_silence(audio, max_chunk_seconds=30.0)
+    return chunks, [
+        scheduler.submit(whisper_model, audio[start:end]) for start, end in chunks
+    ]
+
+
+def is_short_clip(audio: np.ndarray) -> bool:
+    return len(audio) <= WHISPER_BATCH_SETTINGS["max_clip_seconds"] * SAMPLE_RATE
+
+
+def stitch_windows(chunks: List[Tuple[int, int]], results: List[dict]) -> dict:
+    if not results:
+        return {"text": "", "segments": [], "language": None}
+    return stitch_transcripts(results, [start / SAMPLE_RATE for start, _ in chunks])
@@ -0,0 +1,147 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Checkpointed transcription of long recordings.
+
+Long audio is split at silences into chunks and every finished chunk is appended to a
+JSONL checkpoint under ~/.omniparse/cache/transcripts, keyed by a hash of the decoded
+PCM, the model and the transcription settings. If the job dies, re-submitting the same
+file restores the finished chunks and only transcribes the rest. The checkpoint is
+removed once the transcript is complete.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from contextlib import nullcontext
+from typing import Dict, Tuple
+
+import numpy as np
+
+from omniparse.utils import get_home_folder
+from omniparse.media.utils import (
+    SAMPLE_RATE,
+    WHISPER_VAD_SETTINGS,
+    split_on_silence,
+    stitch_transcripts,
+    restored_seconds,
+    transcribe,
+)
+
+CHECKPOINT_SETTINGS = {
+    "min_seconds": 600.0,  # shorter recordings are transcribed without a checkpoint
+}
+
+
+def pcm_fingerprint(audio: np.ndarray) -> str:
+    return hashlib.blake2b(audio.tobytes(), digest_size=16).hexdigest()
+
+
+class TranscriptCheckpoint:
+    """Append-only record of the finished chunks of one transcription job."""
+
+    def __init__(self, audio: np.ndarray, model_name: str, settings: dict):
+        key = json.dumps(
+            {
+                "audio": pcm_fingerprint(audio),
+                "model": model_name,
+                "settings": settings,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        folder = os.path.join(get_home_folder(), "cache", "transcripts")
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(
+            folder, f"{hashlib.sha1(key.encode()).hexdigest()}.jsonl"
+        )
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[Tuple[int, int], dict]:
+        """Finished chunk results keyed by their (start, end) sample range."""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut short by a crash mid-write
+                    break
+                done[(entry["start"], entry["end"])] = entry["result"]
+        return done
+
+    def record(self, start: int, end: int, result: dict):
+        entry = {
+            "start": start,
+            "end": end,
+            "result": {
+                "text": result["text"],
+                "segments": result["segments"],
+                "language": result["language"],
+            },
+        }
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def open_checkpoint(
+    audio: np.ndarray, model_name: str, vad_settings: dict = None, **whisper_args
+) -> TranscriptCheckpoint:
+    """The checkpoint of a job, shared by the sequential and the parallel path."""
+    vad_settings = {**WHISPER_VAD_SETTINGS, **(vad_settings or {})}
+    return TranscriptCheckpoint(
+        audio, model_name, {"whisper": whisper_args, "vad": vad_settings}
+    )
+
+
+def transcribe_resumable(
+    audio: np.ndarray,
+    whisper_model,
+    model_name: str,
+    lock=None,
+    vad_settings: dict = None,
+    **whisper_args,
+) -> dict:
+    """
+    Transcribe `audio` chunk by chunk, resuming from the job's checkpoint if there is one.
+
+    The returned transcript carries `restored_seconds`, the audio restored from the checkpoint.
+    """
+    vad_settings = {**WHISPER_VAD_SETTINGS, **(vad_settings or {})}
+    chunks = split_on_silence(audio, **vad_settings)
+    if not chunks:
+        return {"text": "", "segments": [], "language": None, "restored_seconds": 0.0}
+
+    checkpoint = open_checkpoint(audio, model_name, vad_settings, **whisper_args)
+    done = checkpoint.load()
+    results, previous_text = [], ""
+    for start, end in chunks:
+        if (start, end) in done:
+            result = done[(start, end)]
+        else:
+            args = dict(whisper_args)
+            if whisper_args.get("condition_on_previous_text") and previous_text:
+                args["initial_prompt"] = previous_text[-200:]
+            with lock or nullcontext():
+                result = transcribe(audio[start:end], whisper_model, **args)
+            checkpoint.record(start, end, result)
+        previous_text = result["text"].strip() or previous_text
+        results.append(result)
+
+    transcript = stitch_transcripts(
+        results, [start / SAMPLE_RATE for start, _ in chunks]
+    )
+    transcript["restored_seconds"] = restored_seconds(done, chunks)
+    checkpoint.remove()
+    return transcript
@@ -0,0 +1,379 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Transcript cache keyed by an audio fingerprint.
+
+The same recording re-encoded as MP3, M4A or WAV has different bytes but the same
+sound. A lookup needs two independent fingerprints to agree:
+
+1. the loudness envelope of the first `envelope_frames` 100 ms frames, one bit per
+   frame set when it is louder than the next one (a difference hash, like
+   `omniparse.image.dedup.dhash`). It survives lossy re-encoding and gain changes, and
+   finds candidates through band tables instead of a scan;
+2. the spectrum of the whole recording: 16 bits per frame, the signs of the energy
+   differences of neighbouring bands over time (Haitsma and Kalker's audio hash), read
+   from the entry's file to confirm a candidate. Every block of it must match, not
+   just the average.
+
+The durations must also agree within `max_duration_diff` seconds. Encoders add up to
+a frame of delay, so queries are tried shifted by up to a frame either way, and the
+spectrum is compared at the shift the envelope matched best. Transcripts live on disk
+under ~/.omniparse/cache/fingerprints with least recently used eviction. The index is
+written when an entry is added, not on every lookup.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Optional
+
+import numpy as np
+
+from omniparse.utils import get_home_folder
+from omniparse.media.utils import SAMPLE_RATE
+
+FINGERPRINT_SETTINGS = {
+    "frame_ms": 100,
+    "envelope_frames": 256,  # envelope bits, shorter clips are not cached
+    "band_bits": 16,  # envelope bits per lookup band
+    "block_frames": 128,  # spectral frames per compared block
+    "max_bit_error": 0.15,  # envelope bits that may differ between copies of a recording
+    "max_spectral_error": 0.3,  # spectral bits that may differ, unrelated audio ~0.5
+    "max_duration_diff": 0.5,  # seconds
+    "max_entries": 10000,
+    "max_disk_mb": 512,
+}
+
+# Entries of other formats are dropped when the index is loaded
+FINGERPRINT_FORMAT = 2
+
+# Edges of the 17 log-spaced bands (Hz) of the spectral fingerprint
+SPECTRAL_BANDS = np.geomspace(300, 3000, 17)
+
+
+def envelope_fingerprint(
+    audio: np.ndarray, frame_ms: int = 100, num_frames: int = 256
+) -> np.ndarray:
+    """
+    Bits of the loudness envelope of the start of `audio`: frame i louder than frame
+    i + 1. Empty if `audio` is shorter than `num_frames + 1` frames.
+    """
+    frame_length = SAMPLE_RATE * frame_ms // 1000
+    if len(audio) < (num_frames + 1) * frame_length:
+        return np.zeros(0, dtype=bool)
+    frames = audio[: (num_frames + 1) * frame_length].reshape(num_frames + 1, -1)
+    envelope = np.log10(np.mean(np.square(frames, dtype=np.float32), axis=1) + 1e-10)
+    return envelope[:-1] > envelope[1:]
+
+
+def spectral_fingerprint(audio: np.ndarray, frame_ms: int = 100) -> np.ndarray:
+    """
+    16 bits per frame of the whole of `audio`, the signs of the band energy differences
+    between neighbouring bands and frames. Frames are twice `frame_ms` long and overlap
+    by half, so a few ms of delay changes few bits.
+    """
+    hop = SAMPLE_RATE * frame_ms // 1000
+    num_frames = len(audio) // hop - 1
+    if num_frames < 2:
+        return np.zeros(0, dtype=bool)
+    window = np.hanning(2 * hop).astype(np.float32)
+    bins = np.fft.rfftfreq(2 * hop, 1 / SAMPLE_RATE)
+    # bins x bands, sums the power of the bins of each band
+    bands = (
+        np.searchsorted(SPECTRAL_BANDS, bins)[:, None] - 1
+        == np.arange(len(SPECTRAL_BANDS) - 1)[None, :]
+    ).astype(np.float32)
+    energy = np.empty((num_frames, bands.shape[1]), dtype=np.float32)
+    # In blocks, an hour of audio would take gigabytes of spectra at once
+    for start in range(0, num_frames, 4096):
+        count = min(4096, num_frames - start)
+        frames = np.lib.stride_tricks.as_strided(
+            audio[start * hop :],
+            shape=(count, 2 * hop),
+            strides=(hop * audio.strides[0], audio.strides[0]),
+        )
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        energy[start : start + count] = spectrum @ bands
+    energy = np.log10(energy + 1e-10)
+    difference = energy[:, :-1] - energy[:, 1:]
+    return (difference[1:] - difference[:-1] > 0).ravel()
+
+
+def shift_audio(audio: np.ndarray, shift: int) -> np.ndarray:
+    """`audio` started `shift` samples later, or earlier with silence if negative."""
+    if shift >= 0:
+        return audio[shift:]
+    return np.concatenate([np.zeros(-shift, dtype=audio.dtype), audio])
+
+
+def shifts(frame_ms: int = 100, steps: int = 16) -> range:
+    """Shifts in samples of up to a frame either way, in 1/`steps` frame steps."""
+    frame_length = SAMPLE_RATE * frame_ms // 1000
+    return range(-frame_length, frame_length + 1, frame_length // steps)
+
+
+def bit_error(a: np.ndarray, b: np.ndarray) -> float:
+    return np.count_nonzero(a != b) / len(a) if len(a) == len(b) and len(a) else 1.0
+
+
+def block_error(a: np.ndarray, b: np.ndarray, block_bits: int) -> float:
+    """
+    Largest bit error of the blocks of `a` and `b`, so a recording that only shares its
+    intro and outro with another does not match on the average.
+    """
+    # Durations agree, so copies differ by a few frames at the end at most
+    length = min(len(a), len(b))
+    blocks = max(1, length // block_bits)
+    return max(
+        (
+            bit_error(x, y)
+            for x, y in zip(
+                np.array_split(a[:length], blocks), np.array_split(b[:length], blocks)
+            )
+        ),
+        default=1.0,
+    )
+
+
+def _pack(bits: np.ndarray) -> str:
+    return np.packbits(bits).tobytes().hex()
+
+
+def _unpack(data: str, length: int) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(bytes.fromhex(data), np.uint8))[:length].astype(
+        bool
+    )
+
+
+def settings_key(model_name: str, settings: dict) -> str:
+    key = json.dumps({"model": model_name, "settings": settings}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class FingerprintCache:
+    """Disk-backed LRU of transcripts, looked up by fingerprint, model and settings."""
+
+    def __init__(self, folder: str = None, **fingerprint_settings):
+        self.settings = {**FINGERPRINT_SETTINGS, **fingerprint_settings}
+        self.folder = folder or os.path.join(get_home_folder(), "cache", "fingerprints")
+        os.makedirs(self.folder, exist_ok=True)
+        self.index_path = os.path.join(self.folder, "index.json")
+        self._lock = threading.Lock()
+        self._index = {}
+        # (settings key, band number, band bits) -> entry ids
+        self._bands = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                index = json.load(f)
+            for entry_id, entry in index.items():
+                if entry.get("format") == FINGERPRINT_FORMAT:
+                    self._add(entry_id, entry)
+                else:
+                    self._remove_file(entry_id)
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "seconds_avoided": 0.0,
+            "audio_seconds_avoided": 0.0,
+        }
+
+    def _band_keys(self, key: str, bits: np.ndarray):
+        width = self.settings["band_bits"]
+        for band, start in enumerate(range(0, len(bits) - width + 1, width)):
+            yield key, band, bits[start : start + width].tobytes()
+
+    def _add(self, entry_id: str, entry: dict):
+        self._index[entry_id] = entry
+        bits = _unpack(entry["envelope"], entry["envelope_bits"])
+        for band_key in self._band_keys(entry["key"], bits):
+            self._bands.setdefault(band_key, set()).add(entry_id)
+
+    def _remove(self, entry_id: str) -> dict:
+        entry = self._index.pop(entry_id)
+        bits = _unpack(entry["envelope"], entry["envelope_bits"])
+        for band_key in self._band_keys(entry["key"], bits):
+            entries = self._bands.get(band_key)
+            if entries is not None:
+                entries.discard(entry_id)
+                if not entries:
+                    del self._bands[band_key]
+        self._remove_file(entry_id)
+        return entry
+
+    def _remove_file(self, entry_id: str):
+        path = os.path.join(self.folder, f"{entry_id}.json")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _envelopes(self, audio: np.ndarray) -> dict:
+        """Envelope fingerprints of `audio` by shift."""
+        frame_ms, num_frames = (
+            self.settings["frame_ms"],
+            self.settings["envelope_frames"],
+        )
+        # The envelope only reads the start, shift just that
+        head = audio[: (num_frames + 2) * SAMPLE_RATE * frame_ms // 1000]
+        envelopes = {}
+        for shift in shifts(frame_ms):
+            envelope = envelope_fingerprint(
+                shift_audio(head, shift), frame_ms, num_frames
+            )
+            if len(envelope):
+                envelopes[shift] = envelope
+        return envelopes
+
+    def _candidates(self, key: str, duration: float, envelopes: dict):
+        """(entry id, shift) pairs whose durations and envelopes match, best first."""
+        settings = self.settings
+        matches = {}
+        with self._lock:
+            for shift, envelope in envelopes.items():
+                for band_key in self._band_keys(key, envelope):
+                    for entry_id in self._bands.get(band_key, ()):
+                        entry = self._index[entry_id]
+                        if (
+                            abs(entry["duration"] - duration)
+                            > settings["max_duration_diff"]
+                        ):
+                            continue
+                        error = bit_error(
+                            envelope,
+                            _unpack(entry["envelope"], entry["envelope_bits"]),
+                        )
+                        if (
+                            error <= settings["max_bit_error"]
+                            and error < matches.get(entry_id, (1.0, None))[0]
+                        ):
+                            matches[entry_id] = (error, shift)
+        return sorted(
+            ((entry_id, shift) for entry_id, (_, shift) in matches.items()),
+            key=lambda match: matches[match[0]][0],
+        )
+
+    def get(self, audio: np.ndarray, model_name: str, settings: dict) -> Optional[dict]:
+        """Cached transcript of `audio` (or a re-encoding of it), if any."""
+        key = settings_key(model_name, settings)
+        duration = len(audio) / SAMPLE_RATE
+        spectra = {}
+        for entry_id, shift in self._candidates(key, duration, self._envelopes(audio)):
+            # Confirmed by the spectral fingerprint stored with the transcript
+            try:
+                with open(os.path.join(self.folder, f"{entry_id}.json")) as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                continue
+            if shift not in spectra:
+                spectra[shift] = spectral_fingerprint(
+                    shift_audio(audio, shift), self.settings["frame_ms"]
+                )
+            stored = _unpack(data["spectral"], data["spectral_bits"])
+            error = block_error(
+                spectra[shift], stored, 16 * self.settings["block_frames"]
+            )
+            if error > self.settings["max_spectral_error"]:
+                continue
+            with self._lock:
+                entry = self._index.get(entry_id)
+                if entry is None:
+                    continue
+                entry["last_access"] = time.time()
+                self._stats["hits"] += 1
+                self._stats["seconds_avoided"] += entry["transcribe_seconds"]
+                self._stats["audio_seconds_avoided"] += duration
+            return data["transcript"]
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(
+        self,
+        audio: np.ndarray,
+        model_name: str,
+        settings: dict,
+        transcript: dict,
+        transcribe_seconds: float,
+    ):
+        frame_ms = self.settings["frame_ms"]
+        envelope = envelope_fingerprint(
+            audio, frame_ms, self.settings["envelope_frames"]
+        )
+        if not len(envelope):
+            return
+        spectral = spectral_fingerprint(audio, frame_ms)
+        entry_id = uuid.uuid4().hex
+        data = json.dumps(
+            {
+                "spectral": _pack(spectral),
+                "spectral_bits": len(spectral),
+                "transcript": {
+                    "text": transcript["text"],
+                    "segments": transcript["segments"],
+                    "language": transcript["language"],
+                },
+            }
+        )
+        with self._lock:
+            with open(os.path.join(self.folder, f"{entry_id}.json"), "w") as f:
+                f.write(data)
+            self._add(
+                entry_id,
+                {
+                    "format": FINGERPRINT_FORMAT,
+                    "key": settings_key(model_name, settings),
+                    "envelope": _pack(envelope),
+                    "envelope_bits": len(envelope),
+                    "duration": round(len(audio) / SAMPLE_RATE, 3),
+                    "size": len(data),
+                    "transcribe_seconds": round(transcribe_seconds, 3),
+                    "last_access": time.time(),
+                },
+            )
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        max_bytes = self.settings["max_disk_mb"] * 1024 * 1024
+        entries = sorted(self._index, key=lambda e: self._index[e]["last_access"])
+        total = sum(entry["size"] for entry in self._index.values())
+        for entry_id in entries:
+            if len(self._index) <= self.settings["max_entries"] and total <= max_bytes:
+                break
+            total -= self._remove(entry_id)["size"]
+
+    def _save_index(self):
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "seconds_avoided": round(self._stats["seconds_avoided"], 3),
+                "audio_seconds_avoided": round(self._stats["audio_seconds_avoided"], 3),
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._index),
+                "disk_mb": round(
+                    sum(entry["size"] for entry in self._index.values()) / 1024 / 1024,
+                    3,
+                ),
+            }
+
+
+_fingerprint_cache = None
+_fingerprint_cache_guard = threading.Lock()
+
+
+def get_fingerprint_cache() -> FingerprintCache:
+    global _fingerprint_cache
+    with _fingerprint_cache_guard:
+        if _fingerprint_cache is None:
+            _fingerprint_cache = FingerprintCache()
+        return _fingerprint_cache
@@ -0,0 +1,172 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Scene-change keyframe extraction for video.
+
+ffmpeg decodes, samples and downscales the video itself and writes tiny RGB frames to a
+pipe, so Python never sees full resolution frames. Colour histograms of all sampled
+frames are compared in one vectorized pass, and only the selected scene changes are
+decoded again at captioning resolution.
+"""
+
+import io
+import math
+import subprocess
+from typing import List
+
+import numpy as np
+from PIL import Image
+
+VIDEO_KEYFRAME_SETTINGS = {
+    "sample_fps": 1.0,  # frames per second compared for scene changes
+    "analysis_size": (160, 90),  # frames are scaled to this for the histograms
+    "histogram_bins": 8,  # per channel, 8 -> 512 joint RGB bins
+    "scene_threshold": 0.35,  # histogram distance in [0, 1] that counts as a cut
+    "max_frames_per_minute": 4,  # caption budget scales with the video length
+    "max_frames": 40,  # and is capped per video
+    "caption_width": 768,  # width keyframes are extracted at for captioning
+}
+
+
+def _run_ffmpeg(command: List[str]) -> bytes:
+    try:
+        return subprocess.run(command, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode video: {e.stderr.decode()}") from e
+
+
+def iter_frame_blocks(
+    video_path: str, sample_fps: float, analysis_size, block_size: int = 256
+):
+    """
+    Yield uint8 RGB frames of `analysis_size`, sampled at `sample_fps`, in blocks of
+    `block_size` frames as ffmpeg decodes them.
+    """
+    width, height = analysis_size
+    frame_bytes = width * height * 3
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-threads",
+            "0",
+            "-i",
+            video_path,
+            "-an",
+            "-vf",
+            f"fps={sample_fps},scale={width}:{height}",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgb24",
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            data = process.stdout.read(frame_bytes * block_size)
+            num_frames = len(data) // frame_bytes
+            if num_frames == 0:
+                break
+            yield np.frombuffer(data[: num_frames * frame_bytes], np.uint8).reshape(
+                num_frames, height, width, 3
+            )
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"Failed to decode video frames of {video_path}")
+
+
+def color_histograms(frames: np.ndarray, bins: int = 8) -> np.ndarray:
+    """Normalised joint RGB histograms of all frames, computed with a single bincount."""
+    num_frames = len(frames)
+    quantized = (frames // (256 // bins)).astype(np.int64)
+    index = (quantized[..., 0] * bins + quantized[..., 1]) * bins + quantized[..., 2]
+    index = index.reshape(num_frames, -1)
+    # Offset every frame into its own block of bins**3 counters
+    index += np.arange(num_frames)[:, None] * bins**3
+    counts = np.bincount(index.ravel(), minlength=num_frames * bins**3)
+    return counts.reshape(num_frames, bins**3) / index.shape[1]
+
+
+def histogram_distances(histograms: np.ndarray) -> np.ndarray:
+    """Total variation distance in [0, 1] of every frame to the previous one (1.0 for the first)."""
+    distances = 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1)
+    return np.concatenate([[1.0], distances])
+
+
+def detect_scene_changes(
+    distances: np.ndarray, threshold: float, budget: int
+) -> List[int]:
+    """Indices of the first frame and of the strongest cuts, at most `budget` in total."""
+    if len(distances) == 0 or budget <= 0:
+        return []
+    cuts = np.flatnonzero(distances[1:] > threshold) + 1
+    if len(cuts) > budget - 1:
+        strongest = np.argsort(distances[cuts])[::-1][: budget - 1]
+        cuts = np.sort(cuts[strongest])
+    return [0] + cuts.tolist()
+
+
+def extract_frame(video_path: str, timestamp: float, width: int) -> Image.Image:
+    output = _run_ffmpeg(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-ss",
+            f"{timestamp:.3f}",
+            "-i",
+            video_path,
+            "-frames:v",
+            "1",
+            "-vf",
+            f"scale={width}:-2",
+            "-c:v",
+            "bmp",
+            "-f",
+            "image2pipe",
+            "-",
+        ]
+    )
+    return Image.open(io.BytesIO(output)).convert("RGB")
+
+
+def extract_keyframes(video_path: str, **keyframe_settings) -> List[dict]:
+    """
+    Select up to `max_frames_per_minute` (at most `max_frames`) scene-change frames.
+
+    Returns dicts with the frame `time` in seconds, its scene-change `score` and the
+    frame `image` at `caption_width`.
+    """
+    settings = {**VIDEO_KEYFRAME_SETTINGS, **keyframe_settings}
+    sample_fps = settings["sample_fps"]
+    histograms = [
+        color_histograms(block, settings["histogram_bins"])
+        for block in iter_frame_blocks(
+            video_path, sample_fps, settings["analysis_size"]
+        )
+    ]
+    if not histograms:
+        return []
+    distances = histogram_distances(np.concatenate(histograms))
+
+    minutes = len(distances) / sample_fps / 60
+    budget = min(
+        settings["max_frames"],
+        max(1, math.ceil(minutes * settings["max_frames_per_minute"])),
+    )
+    selected = detect_scene_changes(distances, settings["scene_threshold"], budget)
+    return [
+        {
+            "time": round(index / sample_fps, 3),
+            "score": round(float(distances[index]), 4),
+            "image": extract_frame(
+                video_path, index / sample_fps, settings["caption_width"]
+            ),
+        }
+        for index in selected
+    ]
@@ -0,0 +1,127 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Bounded cache of Whisper models so different requests can use different model sizes
+(`tiny` for bulk triage, `medium` for recordings that need accuracy) on one server.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import whisper
+
+WHISPER_MODEL_CACHE_SETTINGS = {
+    "max_models": 2,  # loaded models kept at most, pinned models included
+    "max_memory_mb": None,  # optional cap on the summed parameter memory
+}
+
+
+def model_memory_mb(model) -> float:
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / 1024 / 1024
+
+
+def check_model_size(model_size: str):
+    if model_size not in whisper.available_models():
+        raise ValueError(
+            f"Invalid Whisper model size '{model_size}'. Choose from: {', '.join(whisper.available_models())}"
+        )
+
+
+class WhisperModelCache:
+    """Thread-safe LRU cache of Whisper models keyed by model size."""
+
+    def __init__(
+        self, max_models: int = None, max_memory_mb: float = None, device=None
+    ):
+        self.max_models = max_models or WHISPER_MODEL_CACHE_SETTINGS["max_models"]
+        self.max_memory_mb = (
+            max_memory_mb or WHISPER_MODEL_CACHE_SETTINGS["max_memory_mb"]
+        )
+        self.device = device
+        self.pinned = set()
+        self._models = OrderedDict()
+        self._memory_mb = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "load_seconds": {}}
+
+    def get(self, model_size: str):
+        check_model_size(model_size)
+
+        with self._lock:
+            if model_size in self._models:
+                self._models.move_to_end(model_size)
+                self._stats["hits"] += 1
+                return self._models[model_size]
+            load_lock = self._load_locks.setdefault(model_size, threading.Lock())
+
+        # Concurrent requests for the same size wait for a single load
+        with load_lock:
+            with self._lock:
+                if model_size in self._models:
+                    self._models.move_to_end(model_size)
+                    self._stats["hits"] += 1
+                    return self._models[model_size]
+                self._stats["misses"] += 1
+
+            start = time.perf_counter()
+            model = whisper.load_model(model_size, device=self.device)
+            load_seconds = round(time.perf_counter() - start, 3)
+            print(f"[LOG] ✅ Loaded Whisper {model_size} in {load_seconds} s")
+
+            with self._lock:
+                self._models[model_size] = model
+                self._memory_mb[model_size] = model_memory_mb(model)
+                self._stats["load_seconds"].setdefault(model_size, []).append(
+                    load_seconds
+                )
+                self._evict(keep=model_size)
+            return model
+
+    def pin(self, model_size: str):
+        """Load a model and never evict it (the server's default model)."""
+        model = self.get(model_size)
+        self.pinned.add(model_size)
+        return model
+
+    def _evict(self, keep: str):
+        # Least recently used first; pinned models and the model just loaded stay
+        def over_limit():
+            if len(self._models) > self.max_models:
+                return True
+            if self.max_memory_mb is not None:
+                return sum(self._memory_mb.values()) > self.max_memory_mb
+            return False
+
+        for model_size in list(self._models):
+            if not over_limit():
+                break
+            if model_size == keep or model_size in self.pinned:
+                continue
+            del self._models[model_size]
+            del self._memory_mb[model_size]
+            self._stats["evictions"] += 1
+            print(f"[LOG] Evicted Whisper {model_size} from the model cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "load_seconds": {
+                    size: list(times)
+                    for size, times in self._stats["load_seconds"].items()
+                },
+                "loaded": [
+                    {
+                        "model_size": size,
+                        "memory_mb": round(self._memory_mb[size], 1),
+                        "pinned": size in self.pinned,
+                    }
+                    for size in self._models
+                ],
+                "max_models": self.max_models,
+                "max_memory_mb": self.max_memory_mb,
+            }
@@ -0,0 +1,227 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Transcription of remote media while it downloads.
+
+ffmpeg reads the URL itself over HTTP(S). Its HTTP client seeks with range requests and,
+with the reconnect options below, resumes an interrupted download with a range request
+from the last byte it received. A reader thread drains the decoded PCM from ffmpeg's
+stdout as it arrives, so downloading and decoding keep going while Whisper transcribes
+the first minutes. YouTube links are resolved to their audio stream with pytube.
+
+ffmpeg may only open http(s) connections, so a playlist cannot point it at local files
+or other protocols. Files larger than `max_download_mb` are refused when the server
+reports their size, and decoding stops with an error past `max_duration_seconds`.
+"""
+
+import queue
+import subprocess
+import threading
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+import httpx
+import numpy as np
+
+from omniparse.media.utils import (
+    SAMPLE_RATE,
+    offset_segments,
+    quietest_cut,
+    transcribe,
+)
+
+REMOTE_MEDIA_SETTINGS = {
+    "chunk_seconds": 60.0,  # audio transcribed per Whisper call
+    "search_seconds": 5.0,  # chunks are cut at the quietest frame in this final window
+    "block_seconds": 5.0,  # PCM read from ffmpeg per block
+    "reconnect_delay_max": 30,  # seconds ffmpeg keeps retrying a dropped connection
+    "timeout_seconds": 30,  # socket read/write timeout
+    "max_buffered_blocks": 120,  # decoded blocks held while Whisper catches up
+    "max_duration_seconds": 4 * 3600,  # longer media is refused
+    "max_download_mb": 2048,  # larger files are refused if the size is known upfront
+}
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "youtu.be"}
+
+
+def check_media_url(url: str):
+    if urlparse(url).scheme not in ("http", "https"):
+        raise ValueError("Invalid media URL. Expected an http(s) URL.")
+
+
+def check_media_size(url: str, max_download_mb: float):
+    """Refuse `url` if its server reports a size over `max_download_mb`."""
+    try:
+        response = httpx.head(
+            url,
+            follow_redirects=True,
+            timeout=REMOTE_MEDIA_SETTINGS["timeout_seconds"],
+        )
+    except httpx.HTTPError:
+        # ffmpeg reports unreachable URLs, the duration limit still applies
+        return
+    size = response.headers.get("content-length")
+    if response.is_success and size and int(size) > max_download_mb * 1024 * 1024:
+        raise ValueError(
+            f"Remote media is {int(size) / 1024 / 1024:.0f} MB, "
+            f"over the {max_download_mb} MB limit."
+        )
+
+
+def resolve_media_url(url: str) -> str:
+    """Direct media URL for `url`; YouTube pages resolve to their best audio-only stream."""
+    check_media_url(url)
+    if urlparse(url).netloc.lower() in YOUTUBE_HOSTS:
+        from pytube import YouTube
+
+        stream = (
+            YouTube(url).streams.filter(only_audio=True).order_by("abr").desc().first()
+        )
+        if stream is None:
+            raise ValueError(f"No audio stream found for {url}")
+        url = stream.url
+    check_media_size(url, REMOTE_MEDIA_SETTINGS["max_download_mb"])
+    return url
+
+
+def iter_remote_pcm(url: str, **remote_settings):
+    """Yield blocks of 16 kHz mono float32 PCM of `url` as ffmpeg decodes them."""
+    settings = {**REMOTE_MEDIA_SETTINGS, **remote_settings}
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-loglevel",
+            "error",
+            "-reconnect",
+            "1",
+            "-reconnect_streamed",
+            "1",
+            "-reconnect_on_network_error",
+            "1",
+            "-reconnect_delay_max",
+            str(settings["reconnect_delay_max"]),
+            "-rw_timeout",
+            str(int(settings["timeout_seconds"] * 1_000_000)),
+            "-protocol_whitelist",
+            "http,https,tcp,tls",
+            "-i",
+            url,
+            "-vn",
+            "-f",
+            "f32le",
+            "-ac",
+            "1",
+            "-ar",
+            str(SAMPLE_RATE),
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    block_bytes = int(settings["block_seconds"] * SAMPLE_RATE) * 4
+    max_samples = int(settings["max_duration_seconds"] * SAMPLE_RATE)
+    blocks = queue.Queue(maxsize=settings["max_buffered_blocks"])
+    stderr = []
+
+    def read_blocks():
+        # Keeps the pipe drained while the consumer is busy transcribing
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            blocks.put(data)
+        blocks.put(None)
+
+    def read_stderr():
+        stderr.append(process.stderr.read())
+
+    threads = [
+        threading.Thread(target=read_blocks, daemon=True),
+        threading.Thread(target=read_stderr, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    finished = False
+    try:
+        remainder, samples = b"", 0
+        while True:
+            data = blocks.get()
+            if data is None:
+                finished = True
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 4
+            remainder = data[usable:]
+            samples += usable // 4
+            if samples > max_samples:
+                raise ValueError(
+                    f"Remote media is longer than the "
+                    f"{settings['max_duration_seconds']} s limit."
+                )
+            yield np.frombuffer(data[:usable], np.float32)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        # Unblock the reader if the consumer stopped early with the queue full
+        while not finished:
+            finished = blocks.get() is None
+        for thread in threads:
+            thread.join()
+        if process.wait() not in (0, -9):
+            raise RuntimeError(
+                f"Failed to decode remote media: {stderr[0].decode(errors='replace')[-2000:]}"
+            )
+
+
+def iter_chunks(blocks, chunk_seconds: float, search_seconds: float):
+    """
+    Regroup PCM blocks into (offset_seconds, chunk) pairs of about `chunk_seconds`, cut at
+    the quietest 30 ms frame of the last `search_seconds` so words are not split.
+    """
+    chunk_length = int(chunk_seconds * SAMPLE_RATE)
+    search_length = int(search_seconds * SAMPLE_RATE)
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0
+
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= chunk_length:
+            cut = quietest_cut(buffer, chunk_length - search_length, chunk_length)
+            yield offset / SAMPLE_RATE, buffer[:cut]
+            buffer = buffer[cut:]
+            offset += cut
+
+    if len(buffer):
+        yield offset / SAMPLE_RATE, buffer
+
+
+def iter_transcribe_url(url: str, whisper_model, lock=None, **whisper_args):
+    """
+    Transcribe remote media chunk by chunk while it is still downloading.
+
+    Yields each chunk's whisper result with segment timestamps on the full timeline and
+    the audio position reached so far as `transcribed_seconds`.
+    """
+    settings = REMOTE_MEDIA_SETTINGS
+    blocks = iter_remote_pcm(resolve_media_url(url))
+    previous_text, next_id = "", 0
+    try:
+        for offset, chunk in iter_chunks(
+            blocks, settings["chunk_seconds"], settings["search_seconds"]
+        ):
+            args = dict(whisper_args)
+            if whisper_args.get("condition_on_previous_text") and previous_text:
+                args["initial_prompt"] = previous_text[-200:]
+            with lock or nullcontext():
+                result = transcribe(chunk, whisper_model, **args)
+            result["segments"] = offset_segments(result["segments"], offset, next_id)
+            result["transcribed_seconds"] = round(offset + len(chunk) / SAMPLE_RATE, 3)
+            next_id += len(result["segments"])
+            previous_text = result["text"].strip() or previous_text
+            yield result
+    finally:
+        blocks.close()
@@ -18,9 +18,16 @@ All credits for the original implementation go to OpenAI.
 """
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, APIRouter, status, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from omniparse.models import responseDocument
-from omniparse.media import parse_audio, parse_video
+from omniparse.media import decode_media, stream_transcript, STREAM_MEDIA_TYPES
+from omniparse.media import transcribe_audio_async, transcript_to_document
+from omniparse.media import decode_video, keyframes_to_document
+from omniparse.media import parse_media_url, stream_url_transcript
+from omniparse.media.model_cache import check_model_size
+from omniparse.media.remote import check_media_url
+from omniparse.media.fingerprint import get_fingerprint_cache
 from omniparse import get_shared_state
 
 media_router = APIRouter()
@@ -28,10 +35,20 @@ model_state = get_shared_state()
 
 
 @media_router.post("/audio")
-async def parse_audio_endpoint(file: UploadFile = File(...)):
+async def parse_audio_endpoint(
+    file: UploadFile = File(...),
+    workers: int = Form(1),
+    model_size: str = Form(None),
+    batch: bool = Form(False),
+):
     try:
         file_bytes = await file.read()
-        result: responseDocument = parse_audio(file_bytes, model_state)
+        audio = await run_in_threadpool(decode_media, file_bytes, suffix=".wav")
+        # With `batch`, short clips are batched with those of concurrent requests
+        transcript = await transcribe_audio_async(
+            audio, model_state, workers, model_size, batch
+        )
+        result: responseDocument = transcript_to_document(transcript)
         return JSONResponse(content=result.model_dump())
 
     except Exception as e:
@@ -39,11 +56,118 @@ async def parse_audio_endpoint(file: UploadFile = File(...)):
 
 
 @media_router.post("/video")
-async def parse_video_endpoint(file: UploadFile = File(...)):
+async def parse_video_endpoint(
+    file: UploadFile = File(...),
+    workers: int = Form(1),
+    model_size: str = Form(None),
+    keyframes: bool = Form(False),
+    batch: bool = Form(False),
+):
     try:
         file_bytes = await file.read()
-        result: responseDocument = parse_video(file_bytes, model_state)
+        # Captioned scene-change keyframes are merged with the transcript by time
+        audio, frames, captions = await run_in_threadpool(
+            decode_video, file_bytes, model_state, keyframes
+        )
+        # With `batch`, short clips are batched with those of concurrent requests
+        transcript = await transcribe_audio_async(
+            audio, model_state, workers, model_size, batch
+        )
+        if keyframes:
+            result = keyframes_to_document(transcript, frames, captions)
+        else:
+            result = transcript_to_document(transcript)
         return JSONResponse(content=result.model_dump())
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@media_router.post("/audio/stream")
+async def stream_audio_endpoint(
+    file: UploadFile = File(...),
+    format: str = Form("ndjson"),
+    model_size: str = Form(None),
+):
+    try:
+        if format not in STREAM_MEDIA_TYPES:
+            raise ValueError(
+                f"Invalid stream format. Choose from: {', '.join(STREAM_MEDIA_TYPES)}"
+            )
+        if model_size:
+            check_model_size(model_size)
+        file_bytes = await file.read()
+        audio = await run_in_threadpool(decode_media, file_bytes, suffix=".wav")
+        return StreamingResponse(
+            stream_transcript(audio, model_state, format, model_size),
+            media_type=STREAM_MEDIA_TYPES[format],
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@media_router.post("/video/stream")
+async def stream_video_endpoint(
+    file: UploadFile = File(...),
+    format: str = Form("ndjson"),
+    model_size: str = Form(None),
+):
+    try:
+        if format not in STREAM_MEDIA_TYPES:
+            raise ValueError(
+                f"Invalid stream format. Choose from: {', '.join(STREAM_MEDIA_TYPES)}"
+            )
+        if model_size:
+            check_model_size(model_size)
+        file_bytes = await file.read()
+        audio = await run_in_threadpool(decode_media, file_bytes, suffix=".mp4")
+        return StreamingResponse(
+            stream_transcript(audio, model_state, format, model_size),
+            media_type=STREAM_MEDIA_TYPES[format],
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@media_router.post("/url")
+async def parse_media_url_endpoint(
+    url: str = Form(...),
+    format: str = Form("json"),
+    model_size: str = Form(None),
+):
+    try:
+        if format not in ["json", *STREAM_MEDIA_TYPES]:
+            raise ValueError(
+                f"Invalid format. Choose from: json, {', '.join(STREAM_MEDIA_TYPES)}"
+            )
+        if model_size:
+            check_model_size(model_size)
+        check_media_url(url)
+        # Segments stream out while the remote file is still downloading
+        if format in STREAM_MEDIA_TYPES:
+            return StreamingResponse(
+                stream_url_transcript(url, model_state, format, model_size),
+                media_type=STREAM_MEDIA_TYPES[format],
+            )
+        # Downloads and transcribes the whole file, off the event loop
+        result: responseDocument = await run_in_threadpool(
+            parse_media_url, url, model_state, model_size
+        )
+        return JSONResponse(content=result.model_dump())
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@media_router.get("/models")
+async def whisper_models_endpoint():
+    if model_state.whisper_models is None:
+        raise HTTPException(status_code=503, detail="Media models are not loaded")
+    return JSONResponse(content=model_state.whisper_models.stats())
+
+
+@media_router.get("/cache")
+async def fingerprint_cache_endpoint():
+    return JSONResponse(content=get_fingerprint_cache().stats())
@@ -17,11 +17,52 @@ This section of the code was adapted from the CLIP repository to integrate audio
 All credits for the original implementation go to OpenAI.
 """
 
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from typing import List, Tuple, Union
 import numpy as np
 
+# Whisper works on 16 kHz mono float32 PCM
+SAMPLE_RATE = 16000
 
-def transcribe(audio_path: str, whisper_model, **whisper_args):
-    """Transcribe the audio file using whisper"""
+
+def load_audio(file: str, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode the audio stream of any ffmpeg-readable file to mono float32 PCM.
+
+    ffmpeg writes raw f32le samples to a pipe that is read straight into a NumPy buffer,
+    so no intermediate audio file is encoded or written.
+    """
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads",
+        "0",
+        "-i",
+        file,
+        "-vn",
+        "-f",
+        "f32le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sr),
+        "-",
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode()}") from e
+    return np.frombuffer(output, np.float32)
+
+
+def transcribe(audio_path: Union[str, np.ndarray], whisper_model, **whisper_args):
+    """Transcribe the audio file (or 16 kHz PCM array) using whisper"""
 
     # Get whisper model
     # NOTE: If mulitple models are selected, this may keep all of them in memory depending on the cache size
@@ -59,3 +100,411 @@ WHISPER_DEFAULT_SETTINGS = {
     "verbose": False,
     "task": "transcribe",
 }
+
+# Frames quieter than this (dBFS) are silence, for trimming and for voice activity alike,
+# so audio kept by the trim is never dropped by the segmentation. Quiet recordings lower
+# it to RELATIVE_THRESHOLD_DB below their loudest frame, down to MIN_THRESHOLD_DB; the
+# loudest frame survives the trim, so both still agree.
+SPEECH_ENERGY_THRESHOLD_DB = -45.0
+RELATIVE_THRESHOLD_DB = 30.0
+MIN_THRESHOLD_DB = -70.0
+
+# Leading/trailing silence trimmed before transcription; files with no frame above the
+# threshold skip Whisper entirely
+WHISPER_SILENCE_SETTINGS = {
+    "frame_ms": 30,
+    "energy_threshold_db": SPEECH_ENERGY_THRESHOLD_DB,
+    "relative_threshold_db": RELATIVE_THRESHOLD_DB,
+    "min_threshold_db": MIN_THRESHOLD_DB,
+    "min_speech_ms": 100,  # fewer voiced frames than this means no speech at all
+    "padding_ms": 300,  # kept before the first and after the last voiced frame
+}
+
+# Energy based voice activity segmentation used to split long audio at silences
+WHISPER_VAD_SETTINGS = {
+    "frame_ms": 30,
+    "energy_threshold_db": SPEECH_ENERGY_THRESHOLD_DB,
+    "relative_threshold_db": RELATIVE_THRESHOLD_DB,
+    "min_threshold_db": MIN_THRESHOLD_DB,
+    "min_silence_ms": 500,  # shorter pauses do not split speech
+    "min_speech_ms": 250,  # shorter bursts are dropped as noise
+    "padding_ms": 200,  # kept around each speech region
+    "max_chunk_seconds": 120.0,  # regions are grouped into chunks up to this long
+    "search_seconds": 5.0,  # longer regions are cut at the quietest frame in this window
+}
+
+
+def frame_energy_db(audio: np.ndarray, frame_ms: int = 30) -> np.ndarray:
+    """RMS energy in dBFS of consecutive non-overlapping frames."""
+    frame_length = int(SAMPLE_RATE * frame_ms / 1000)
+    num_frames = len(audio) // frame_length
+    if num_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: num_frames * frame_length].reshape(num_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def voiced_frames(
+    energy: np.ndarray,
+    energy_threshold_db: float = SPEECH_ENERGY_THRESHOLD_DB,
+    relative_threshold_db: float = RELATIVE_THRESHOLD_DB,
+    min_threshold_db: float = MIN_THRESHOLD_DB,
+) -> np.ndarray:
+    """Mask of the frames of `energy` (dBFS) above the speech threshold of the file."""
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    threshold = min(energy_threshold_db, float(energy.max()) - relative_threshold_db)
+    return energy > max(threshold, min_threshold_db)
+
+
+def quietest_cut(
+    audio: np.ndarray, window_start: int, window_end: int, frame_ms: int = 30
+) -> int:
+    """Sample offset at the end of the quietest frame of `audio[window_start:window_end]`."""
+    frame_length = SAMPLE_RATE * frame_ms // 1000
+    energy = frame_energy_db(audio[window_start:window_end], frame_ms)
+    if len(energy) == 0:
+        return window_end
+    return window_start + int(np.argmin(energy)) * frame_length + frame_length
+
+
+def trim_silence(audio: np.ndarray, **silence_settings) -> Tuple[int, int]:
+    """
+    Sample range of `audio` between its first and last voiced frame, padded.
+
+    Returns `(0, 0)` when there is no speech energy in the file at all.
+    """
+    settings = {**WHISPER_SILENCE_SETTINGS, **silence_settings}
+    frame_ms = settings["frame_ms"]
+    voiced = np.flatnonzero(
+        voiced_frames(
+            frame_energy_db(audio, frame_ms),
+            settings["energy_threshold_db"],
+            settings["relative_threshold_db"],
+            settings["min_threshold_db"],
+        )
+    )
+    if len(voiced) * frame_ms < settings["min_speech_ms"]:
+        return 0, 0
+
+    frame_length = SAMPLE_RATE * frame_ms // 1000
+    padding = SAMPLE_RATE * settings["padding_ms"] // 1000
+    return (
+        max(0, int(voiced[0]) * frame_length - padding),
+        min(len(audio), (int(voiced[-1]) + 1) * frame_length + padding),
+    )
+
+
+def detect_speech_segments(
+    audio: np.ndarray,
+    frame_ms: int = 30,
+    energy_threshold_db: float = SPEECH_ENERGY_THRESHOLD_DB,
+    relative_threshold_db: float = RELATIVE_THRESHOLD_DB,
+    min_threshold_db: float = MIN_THRESHOLD_DB,
+    min_silence_ms: int = 500,
+    min_speech_ms: int = 250,
+    padding_ms: int = 200,
+    **kwargs,
+) -> List[Tuple[int, int]]:
+    """Return (start, end) sample offsets of the regions of `audio` that contain speech energy."""
+    voiced = voiced_frames(
+        frame_energy_db(audio, frame_ms),
+        energy_threshold_db,
+        relative_threshold_db,
+        min_threshold_db,
+    )
+    if not voiced.any():
+        return []
+
+    # Rising and falling edges of the voiced mask give the region boundaries
+    edges = np.diff(np.concatenate([[0], voiced.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Bridge pauses shorter than min_silence_ms
+    min_silence_frames = max(1, min_silence_ms // frame_ms)
+    keep = np.concatenate([[True], starts[1:] - ends[:-1] >= min_silence_frames])
+    starts = starts[keep]
+    ends = np.concatenate([ends[np.flatnonzero(keep)[1:] - 1], ends[-1:]])
+
+    min_speech_frames = max(1, min_speech_ms // frame_ms)
+    long_enough = ends - starts >= min_speech_frames
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    frame_length = SAMPLE_RATE * frame_ms // 1000
+    padding = SAMPLE_RATE * padding_ms // 1000
+    return [
+        (
+            max(0, start * frame_length - padding),
+            min(len(audio), end * frame_length + padding),
+        )
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ]
+
+
+def split_on_silence(audio: np.ndarray, **vad_settings) -> List[Tuple[int, int]]:
+    """
+    Group speech regions into chunks of at most `max_chunk_seconds` that start and end in silence.
+
+    Regions longer than the limit are cut at the quietest frame of the last
+    `search_seconds` before it, so words are not split. Silence between regions in the
+    same chunk is kept so Whisper sees natural pauses.
+    """
+    settings = {**WHISPER_VAD_SETTINGS, **vad_settings}
+    max_chunk = int(settings["max_chunk_seconds"] * SAMPLE_RATE)
+    search = min(int(settings["search_seconds"] * SAMPLE_RATE), max_chunk)
+
+    chunks = []
+    for start, end in detect_speech_segments(audio, **settings):
+        if chunks and end - chunks[-1][0] <= max_chunk:
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        while end - start > max_chunk:
+            limit = start + max_chunk
+            cut = quietest_cut(audio, limit - search, limit, settings["frame_ms"])
+            chunks.append((start, cut))
+            start = cut
+        chunks.append((start, end))
+    return chunks
+
+
+def offset_segments(
+    segments: List[dict], offset: float, first_id: int = 0
+) -> List[dict]:
+    """Shift whisper segments of a chunk onto the full audio timeline."""
+    shifted = []
+    for i, segment in enumerate(segments):
+        segment = dict(segment)
+        segment["id"] = first_id + i
+        segment["start"] = round(segment["start"] + offset, 3)
+        segment["end"] = round(segment["end"] + offset, 3)
+        shifted.append(segment)
+    return shifted
+
+
+def stitch_transcripts(results: List[dict], offsets: List[float]) -> dict:
+    """Merge per-chunk whisper results, shifting segment timestamps to the full audio timeline."""
+    segments = []
+    for result, offset in zip(results, offsets):
+        segments += offset_segments(result["segments"], offset, len(segments))
+
+    return {
+        "text": " ".join(
+            result["text"].strip() for result in results if result["text"].strip()
+        ),
+        "segments": segments,
+        "language": results[0]["language"] if results else None,
+    }
+
+
+def restored_seconds(done: dict, chunks: List[Tuple[int, int]]) -> float:
+    """Seconds of audio in `chunks` whose results were restored from a checkpoint."""
+    return round(
+        sum(end - start for start, end in chunks if (start, end) in done) / SAMPLE_RATE,
+        3,
+    )
+
+
+def compact_segment(segment: dict) -> dict:
+    """The parts of a whisper segment returned to clients."""
+    return {
+        "id": segment["id"],
+        "start": segment["start"],
+        "end": segment["end"],
+        "text": segment["text"].strip(),
+        "avg_logprob": round(segment["avg_logprob"], 4),
+    }
+
+
+def iter_transcribe(
+    audio: np.ndarray,
+    whisper_model,
+    chunk_seconds: float = 30.0,
+    lock=None,
+    **whisper_args,
+):
+    """
+    Transcribe `audio` chunk by chunk, yielding each chunk's result as soon as it is decoded.
+
+    Chunks are cut at silences (see `split_on_silence`) and segment timestamps are already
+    shifted onto the full audio timeline. The tail of the previous chunk's text is passed as
+    the prompt of the next one so context carries across chunk boundaries. `lock` is held
+    while a chunk is decoded, never across a yield.
+    """
+    previous_text = ""
+    next_id = 0
+    for start, end in split_on_silence(audio, max_chunk_seconds=chunk_seconds):
+        args = dict(whisper_args)
+        if whisper_args.get("condition_on_previous_text") and previous_text:
+            args["initial_prompt"] = previous_text[-200:]
+        with lock or nullcontext():
+            result = transcribe(audio[start:end], whisper_model, **args)
+        result["segments"] = offset_segments(
+            result["segments"], start / SAMPLE_RATE, next_id
+        )
+        next_id += len(result["segments"])
+        previous_text = result["text"].strip() or previous_text
+        yield result
+
+
+def format_timestamp(seconds: float, decimal_marker: str = ".") -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
+
+
+def segments_to_srt(segments: List[dict]) -> str:
+    return "\n".join(
+        f"{i}\n{format_timestamp(segment['start'], ',')} --> "
+        f"{format_timestamp(segment['end'], ',')}\n{segment['text'].strip()}\n"
+        for i, segment in enumerate(segments, start=1)
+    )
+
+
+def segments_to_vtt(segments: List[dict]) -> str:
+    return "WEBVTT\n\n" + "\n".join(
+        f"{format_timestamp(segment['start'])} --> "
+        f"{format_timestamp(segment['end'])}\n{segment['text'].strip()}\n"
+        for segment in segments
+    )
+
+
+# Worker processes each hold their own copy of the model
+_worker_model = None
+
+
+def _init_transcription_worker(model_name: str, threads: int):
+    global _worker_model
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_name, device="cpu")
+
+
+def _transcribe_chunk(audio: np.ndarray, whisper_args: dict) -> dict:
+    return transcribe(audio, _worker_model, **whisper_args)
+
+
+# Every worker process loads its own copy of the model
+WHISPER_PARALLEL_SETTINGS = {
+    "max_workers": os.cpu_count() or 1,  # requested worker counts are clamped to this
+    "max_pools": 2,  # models with a live pool, the least recently used is shut down
+}
+
+
+class _TranscriptionPool:
+    """A worker pool and the number of requests submitting to it."""
+
+    def __init__(self, workers: int, pool: ProcessPoolExecutor):
+        self.workers = workers
+        self.pool = pool
+        self.users = 0
+        self.retired = False
+
+
+# model name -> _TranscriptionPool, least recently used first
+_transcription_pools = OrderedDict()
+_transcription_pools_guard = threading.Lock()
+
+
+def clamp_workers(workers: int) -> int:
+    return max(1, min(int(workers), WHISPER_PARALLEL_SETTINGS["max_workers"]))
+
+
+def _retire_pool(entry: _TranscriptionPool):
+    # Called under the guard. A pool still in use is shut down by its last user
+    entry.retired = True
+    if not entry.users:
+        entry.pool.shutdown(wait=False)
+
+
+@contextmanager
+def transcription_pool(model_name: str, workers: int):
+    """
+    Process pools are kept alive between requests so workers load the model only once.
+
+    There is one pool per model. It is replaced by a bigger one when a request asks for
+    more workers, and requests asking for fewer share it. Replaced and evicted pools are
+    shut down once the last request using them leaves this context, so a request can
+    keep submitting to the pool it got while others replace it.
+    """
+    workers = clamp_workers(workers)
+    with _transcription_pools_guard:
+        entry = _transcription_pools.get(model_name)
+        if entry is None or entry.workers < workers:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_transcription_worker,
+                initargs=(model_name, threads),
+            )
+            if entry is not None:
+                _retire_pool(entry)
+            entry = _transcription_pools[model_name] = _TranscriptionPool(workers, pool)
+        _transcription_pools.move_to_end(model_name)
+        while len(_transcription_pools) > WHISPER_PARALLEL_SETTINGS["max_pools"]:
+            _, evicted = _transcription_pools.popitem(last=False)
+            _retire_pool(evicted)
+        entry.users += 1
+    try:
+        yield entry.pool
+    finally:
+        with _transcription_pools_guard:
+            entry.users -= 1
+            if entry.retired and not entry.users:
+                entry.pool.shutdown(wait=False)
+
+
+def shutdown_transcription_pool(model_name: str):
+    """Shut down the pool of `model_name`, once the requests using it are done."""
+    with _transcription_pools_guard:
+        entry = _transcription_pools.pop(model_name, None)
+        if entry is not None:
+            _retire_pool(entry)
+
+
+def transcribe_parallel(
+    audio: np.ndarray,
+    model_name: str,
+    workers: int,
+    vad_settings: dict = None,
+    checkpoint=None,
+    **whisper_args,
+) -> dict:
+    """
+    Split `audio` at silences and transcribe the chunks across a pool of `workers` processes.
+
+    With a `TranscriptCheckpoint`, chunks it already holds are restored instead of
+    transcribed and every finished chunk is recorded as soon as it completes.
+    """
+    chunks = split_on_silence(audio, **(vad_settings or {}))
+    if not chunks:
+        return {"text": "", "segments": [], "language": None}
+
+    done = checkpoint.load() if checkpoint is not None else {}
+    results = dict(done)
+    with transcription_pool(model_name, workers) as pool:
+        futures = {
+            pool.submit(_transcribe_chunk, audio[start:end], whisper_args): (start, end)
+            for start, end in chunks
+            if (start, end) not in done
+        }
+        for future in as_completed(futures):
+            start, end = futures[future]
+            results[(start, end)] = future.result()
+            if checkpoint is not None:
+                checkpoint.record(start, end, results[(start, end)])
+
+    transcript = stitch_transcripts(
+        [results[chunk] for chunk in chunks],
+        [start / SAMPLE_RATE for start, _ in chunks],
+    )
+    if checkpoint is not None:
+        transcript["restored_seconds"] = restored_seconds(done, chunks)
+        checkpoint.remove()
+    return transcript
@@ -1,3 +1,4 @@
+import re
 import base64
 from io import BytesIO
 from PIL import Image as PILImage
@@ -55,10 +56,49 @@ class responseDocument(BaseModel):
         img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
         return img_base64
 
-    def image_processor(self, image_processor: Callable[[str], str]):
-        for img in self.image:
-            if not img.image_info.get("caption"):  # Only generate caption if it's empty
-                img.image_info["caption"] = image_processor(img.image_name)
+    def image_processor(
+        self, image_processor: Callable[[List[PILImage.Image]], List[str]]
+    ):
+        # Caption every canonical image without a caption in a single call so the
+        # processor can batch them; duplicates reuse their canonical image's caption
+        pending = [
+            img
+            for img in self.images
+            if img.image
+            and not img.image_info.get("caption")
+            and not img.image_info.get("duplicate_of")
+        ]
+        if pending:
+            pil_images = [
+                PILImage.open(BytesIO(base64.b64decode(img.image))) for img in pending
+            ]
+            for img, caption in zip(pending, image_processor(pil_images)):
+                img.image_info["caption"] = caption
+
+        captions = {
+            img.image_name: img.image_info["caption"]
+            for img in self.images
+            if img.image_info.get("caption")
+        }
+        for img in self.images:
+            canonical = img.image_info.get("duplicate_of")
+            if canonical in captions and not img.image_info.get("caption"):
+                img.image_info["caption"] = captions[canonical]
+
+        self.inline_image_captions()
+
+    def inline_image_captions(self):
+        # Use captions as alt text of the markdown image references
+        for img in self.images:
+            caption = img.image_info.get("caption")
+            if not caption:
+                continue
+            alt_text = " ".join(caption.replace("[", "(").replace("]", ")").split())
+            self.text = re.sub(
+                r"!\[[^\]]*\]\(" + re.escape(img.image_name) + r"\)",
+                lambda _: f"![{alt_text}]({img.image_name})",
+                self.text,
+            )
 
     def chunk_text(self, chunker: Callable[[str], List[str]]):
         self.chunks = chunker(self.text)
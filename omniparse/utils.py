@@ -1,11 +1,47 @@
 import base64
 import os
-from art import text2art
-from omniparse.models import responseDocument
+from pathlib import Path
+from omniparse.models import responseDocument, responseImage
 
 
-def encode_images(images, inputDocument: responseDocument):
+def get_home_folder():
+    home_folder = os.path.join(Path.home(), ".omniparse")
+    os.makedirs(home_folder, exist_ok=True)
+    os.makedirs(f"{home_folder}/cache", exist_ok=True)
+    os.makedirs(f"{home_folder}/models", exist_ok=True)
+    return home_folder
+
+
+def encode_images(images, inputDocument: responseDocument, dedup: bool = True):
+    # Near-duplicate images (logos, watermarks, footers) are encoded once; the other
+    # copies are kept as empty entries pointing at their canonical image
+    from omniparse.image.dedup import cluster_images, hash_to_hex, IMAGE_DEDUP_SETTINGS
+
+    if dedup and images:
+        canonical_of, hashes = cluster_images(images)
+    else:
+        canonical_of, hashes = {filename: filename for filename in images}, {}
+
+    duplicates = {}
+    for filename, canonical in canonical_of.items():
+        if filename != canonical:
+            duplicates.setdefault(canonical, []).append(filename)
+
     for i, (filename, image) in enumerate(images.items()):
+        image_info = {}
+        if filename in hashes:
+            image_info["phash"] = hash_to_hex(hashes[filename])
+
+        canonical = canonical_of[filename]
+        if canonical != filename:
+            image_info["duplicate_of"] = canonical
+            inputDocument.images.append(
+                responseImage(image="", image_name=filename, image_info=image_info)
+            )
+            continue
+        if filename in duplicates:
+            image_info["duplicates"] = duplicates[filename]
+
         # print(f"Processing image {filename}")
         # Save image as PNG
         image.save(filename, "PNG")
@@ -15,13 +51,27 @@ def encode_images(images, inputDocument: responseDocument):
         # Convert image to base64
         image_base64 = base64.b64encode(image_bytes).decode("utf-8")
 
-        inputDocument.add_image(image_name=filename, image_data=image_base64)
+        inputDocument.add_image(
+            image_name=filename, image_data=image_base64, image_info=image_info
+        )
 
         # Remove the temporary image file
         os.remove(filename)
 
+    if dedup and images:
+        unique_images = len(set(canonical_of.values()))
+        inputDocument.metadata["image_dedup"] = {
+            "images": len(images),
+            "unique_images": unique_images,
+            "duplicates_removed": len(images) - unique_images,
+            "hamming_threshold": IMAGE_DEDUP_SETTINGS["hamming_threshold"],
+        }
+
 
 def print_omniparse_text_art(suffix=None):
+    # Imported here: cache and model modules import this module for get_home_folder
+    from art import text2art
+
     font = "nancyj"
     ascii_text = "  OmniParse"
     if suffix:
@@ -12,43 +12,80 @@ License: Apache 2.0 License
 URL: https://github.com/unclecode/crawl4ai/blob/main/LICENSE
 """
 
-import asyncio
+import json
 import logging
-from concurrent.futures import ThreadPoolExecutor
 from omniparse.models import responseDocument
+from omniparse.web.site_crawler import SiteCrawler, normalize_url
 
 
-async def parse_url(url: str, model_state) -> responseDocument:
+async def parse_url(
+    url: str,
+    model_state,
+    bypass_cache: bool = False,
+    cache_ttl: float = None,
+    screenshot: bool = False,
+    strip_boilerplate: bool = False,
+) -> responseDocument:
     try:
         logging.debug("[LOG] Loading extraction and chunking strategies...")
         # Hardcoded parameters (adjust as needed)
         include_raw_html = False
-        bypass_cache = True
         word_count_threshold = 5
         css_selector = None
-        screenshot = True
         user_agent = None
         verbose = True
 
-        # Use ThreadPoolExecutor to run the synchronous WebCrawler in async manner
         logging.debug("[LOG] Running the WebCrawler...")
-        with ThreadPoolExecutor() as executor:
-            loop = asyncio.get_event_loop()
-            future = loop.run_in_executor(
-                executor,
-                model_state.crawler.run,
-                str(url),
-                word_count_threshold,
-                bypass_cache,
-                css_selector,
-                screenshot,
-                user_agent,
-                verbose,
-            )
-            result = await future
+        result = await model_state.crawler.arun(
+            str(url),
+            word_count_threshold,
+            bypass_cache,
+            css_selector,
+            screenshot,
+            user_agent,
+            verbose,
+            cache_ttl=cache_ttl,
+            strip_boilerplate=strip_boilerplate,
+        )
 
         return result
 
     except Exception as e:
         logging.error(f"[ERROR] Error parsing webpage: {str(e)}")
         return {"message": "Error in parsing webpage", "error": str(e)}
+
+
+def check_crawl_url(url: str) -> str:
+    start_url = normalize_url(url)
+    if start_url is None:
+        raise ValueError("Invalid URL. Provide an absolute http(s) URL")
+    return start_url
+
+
+async def crawl_site(
+    url: str,
+    model_state,
+    max_depth: int = None,
+    max_pages: int = None,
+    skip_duplicates: bool = False,
+    strip_boilerplate: bool = False,
+):
+    """
+    Crawl the site of `url` and stream NDJSON: one `{"type": "page", ...}` line per page as
+    soon as it is parsed (or `{"type": "error", ...}` if it failed), then a "done" summary.
+    """
+    site_crawler = SiteCrawler(
+        model_state.crawler,
+        skip_duplicates=skip_duplicates,
+        strip_boilerplate=strip_boilerplate,
+    )
+    async for result in site_crawler.crawl(
+        check_crawl_url(url), max_depth=max_depth, max_pages=max_pages
+    ):
+        if "error" in result:
+            logging.error(f"[ERROR] Error crawling {result['url']}: {result['error']}")
+            yield json.dumps({"type": "error", **result}) + "\n"
+        else:
+            document = result.pop("document")
+            yield json.dumps({"type": "page", **result, **document.model_dump()}) + "\n"
+    yield json.dumps({"type": "done", **site_crawler.stats}) + "\n"
@@ -0,0 +1,253 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Asyncio-native crawler strategies.
+
+AsyncCrawlerStrategy mirrors CrawlerStrategy with coroutines. AsyncHttpCrawlerStrategy
+fetches pages with one shared httpx.AsyncClient, so a page in flight is a coroutine
+waiting on a socket rather than a blocked thread. Only pages that need a browser go to
+the Selenium pool, whose blocking calls run on a thread pool no larger than the pool.
+SyncStrategyAdapter runs any existing CrawlerStrategy the same way.
+"""
+
+import time
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from omniparse.web.crawler_strategy import (
+    ACCEPT_ENCODING,
+    HTTP_FETCH_SETTINGS,
+    CrawlerStrategy,
+    LocalSeleniumCrawlerStrategy,
+    browser_fallback_reason,
+    decode_html,
+)
+from omniparse.web.http_cache import cache_headers
+
+
+class AsyncCrawlerStrategy(ABC):
+    # Page loads the strategy can run in parallel, None if unbounded
+    max_concurrency = None
+
+    @abstractmethod
+    async def crawl(self, url: str, **kwargs) -> str:
+        pass
+
+    @abstractmethod
+    async def take_screenshot(self, *args) -> str:
+        pass
+
+    async def crawl_page(
+        self,
+        url: str,
+        screenshot: bool = False,
+        user_agent: str = None,
+        headers: dict = None,
+    ) -> dict:
+        """
+        HTML of `url` and, if requested, a base64 screenshot of the same page. `headers`
+        are extra request headers for strategies that fetch over HTTP.
+        """
+        html = await self.crawl(url)
+        return {
+            "html": html,
+            "screenshot": await self.take_screenshot() if screenshot else None,
+        }
+
+    async def close(self):
+        pass
+
+
+class SyncStrategyAdapter(AsyncCrawlerStrategy):
+    """
+    Runs a blocking CrawlerStrategy on a thread pool sized to its concurrency. With
+    `owns_strategy`, `close` also quits the strategy; a shared one is quit by its owner.
+    """
+
+    def __init__(
+        self,
+        strategy: CrawlerStrategy,
+        max_workers: int = None,
+        owns_strategy: bool = False,
+    ):
+        self.strategy = strategy
+        self.owns_strategy = owns_strategy
+        self.max_concurrency = max_workers or strategy.max_concurrency or 4
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="crawler"
+        )
+
+    async def _run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs)
+        )
+
+    async def crawl(self, url: str, **kwargs) -> str:
+        return await self._run(self.strategy.crawl, url, **kwargs)
+
+    async def crawl_page(
+        self,
+        url: str,
+        screenshot: bool = False,
+        user_agent: str = None,
+        headers: dict = None,
+    ) -> dict:
+        return await self._run(
+            self.strategy.crawl_page,
+            url,
+            screenshot=screenshot,
+            user_agent=user_agent,
+            headers=headers,
+        )
+
+    async def take_screenshot(self, *args) -> str:
+        return await self._run(self.strategy.take_screenshot, *args)
+
+    async def close(self):
+        quit = getattr(self.strategy, "quit", None)
+        if self.owns_strategy and quit is not None:
+            await self._run(quit)
+        self._executor.shutdown(wait=False)
+
+
+def _read_response(content: bytes, content_type: str, status: int, settings: dict):
+    """(html, reason the page needs the browser or None) of an HTTP response."""
+    html = decode_html(content, content_type)
+    # A 304 answers the conditional headers, the caller has the page
+    if status == 304:
+        return html, None
+    return html, browser_fallback_reason(status, html, **settings)
+
+
+class AsyncHttpCrawlerStrategy(AsyncCrawlerStrategy):
+    """
+    Async counterpart of HttpCrawlerStrategy: pages are fetched with a keep-alive
+    httpx.AsyncClient and rendered by the browser only when they need it. `crawl_page`
+    reports the path taken in its `fetch` entry.
+    """
+
+    def __init__(self, browser_factory=None, js_code=None, **kwargs):
+        super().__init__()
+        self.settings = {**HTTP_FETCH_SETTINGS, **kwargs.get("http_settings", {})}
+        self.verbose = kwargs.get("verbose", False)
+        self.js_code = js_code
+        self.user_agent = kwargs.get("user_agent") or self.settings["user_agent"]
+
+        # The browser starts on the first page that needs it
+        self.browser_factory = browser_factory or (
+            lambda: SyncStrategyAdapter(
+                LocalSeleniumCrawlerStrategy(js_code=js_code, verbose=self.verbose),
+                owns_strategy=True,
+            )
+        )
+        self._browser = None
+        self._client = None
+        # httpcore re-scans every queued request whenever a connection frees up, so
+        # requests beyond the connection limit wait here instead
+        self._slots = asyncio.Semaphore(self.settings["max_connections"])
+
+    @property
+    def browser(self) -> AsyncCrawlerStrategy:
+        if self._browser is None:
+            self._browser = self.browser_factory()
+        return self._browser
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so that it belongs to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                headers={
+                    "User-Agent": self.user_agent,
+                    "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+                    "Accept-Encoding": ACCEPT_ENCODING,
+                },
+                limits=httpx.Limits(
+                    max_connections=self.settings["max_connections"],
+                    max_keepalive_connections=self.settings["pool_maxsize"],
+                ),
+                timeout=self.settings["timeout"],
+            )
+        return self._client
+
+    async def crawl_page(
+        self,
+        url: str,
+        screenshot: bool = False,
+        user_agent: str = None,
+        headers: dict = None,
+    ) -> dict:
+        response_headers = {}
+        if screenshot:
+            reason, status = "screenshot", None
+        elif self.js_code:
+            reason, status = "js_code", None
+        else:
+            start = time.time()
+            headers = {
+                **(headers or {}),
+                **({"User-Agent": user_agent} if user_agent else {}),
+            }
+            try:
+                async with self._slots:
+                    response = await self.client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                raise Exception(f"Failed to crawl {url}: {str(e)}")
+            status = response.status_code
+            response_headers = cache_headers(response.headers)
+            # Decoding and the fallback check parse the whole page, off the event loop
+            html, reason = await asyncio.to_thread(
+                _read_response,
+                response.content,
+                response.headers.get("Content-Type", ""),
+                status,
+                self.settings,
+            )
+            if reason is None:
+                if self.verbose:
+                    print(f"[LOG] ✅ Fetched {url} over HTTP")
+                return {
+                    "html": None if status == 304 else html,
+                    "screenshot": None,
+                    "fetch": {
+                        "path": "http",
+                        "status": status,
+                        "seconds": round(time.time() - start, 3),
+                        "headers": response_headers,
+                    },
+                }
+
+        if self.verbose:
+            print(f"[LOG] Rendering {url} in the browser ({reason})")
+        page = await self.browser.crawl_page(
+            url, screenshot=screenshot, user_agent=user_agent
+        )
+        page["fetch"] = {
+            **page.get("fetch", {}),
+            "reason": reason,
+            "status": status,
+            "headers": response_headers,
+        }
+        return page
+
+    async def crawl(self, url: str, **kwargs) -> str:
+        return (await self.crawl_page(url))["html"]
+
+    async def take_screenshot(self, *args) -> str:
+        # Screenshots need a browser, crawl_page(url, screenshot=True) loads the page once
+        return await self.browser.take_screenshot(*args)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._browser is not None:
+            await self._browser.close()
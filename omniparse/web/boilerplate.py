@@ -0,0 +1,184 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Per-site boilerplate templates learned across pages.
+
+Headers, navigation, cookie banners and footers have enough words to survive cleaning
+and end up in the markdown of every page of a site. The cleaner hashes every block
+element of a page's cleaned tree (tags and text, see `_PageCleaner.block_hashes`). A
+site's template counts on how many of its pages each hash was seen; blocks seen on
+more than `min_share` of the pages are boilerplate and are dropped from the pages
+cleaned afterwards by a set lookup.
+
+Templates are stored as JSON under ~/.omniparse/cache/boilerplate, one file per site.
+`revision` goes up every time the set of boilerplate blocks changes, and documents
+record the revision they were cleaned with. Files of an older `TEMPLATE_FORMAT` are
+discarded.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+from omniparse.utils import get_home_folder
+from omniparse.web.site_crawler import site_of
+
+BOILERPLATE_SETTINGS = {
+    "min_pages": 5,  # pages of a site learned before blocks are stripped
+    "min_share": 0.5,  # blocks on more than this share of the pages are boilerplate
+    "update_every": 10,  # newly learned pages between template updates and saves
+    "max_blocks_per_site": 20000,  # block counts kept, the rarest are dropped first
+    "max_urls_per_site": 20000,  # learned URLs remembered, so none is counted twice
+    "max_sites": 100,  # templates kept in memory
+}
+
+# Bump when block hashing changes, stored templates no longer match
+TEMPLATE_FORMAT = 1
+
+
+class SiteTemplate:
+    """
+    Block counts of one site and the boilerplate learned from them. `strip` picks the
+    boilerplate blocks of a page, `learn` counts a page's blocks once per URL.
+    """
+
+    def __init__(self, site: str, path: str, **settings):
+        self.site = site
+        self.path = path
+        self.settings = {**BOILERPLATE_SETTINGS, **settings}
+        self.pages = 0
+        self.counts = Counter()
+        # Hashes of the learned URLs, oldest first
+        self.urls = OrderedDict()
+        # (revision, boilerplate hashes), replaced as a whole
+        self.template = (0, frozenset())
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def revision(self) -> int:
+        return self.template[0]
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("format") != TEMPLATE_FORMAT or data.get("site") != self.site:
+            return
+        self.pages = data["pages"]
+        self.counts = Counter(data["counts"])
+        self.urls = OrderedDict.fromkeys(data["urls"])
+        self.template = (data["revision"], frozenset(data["boilerplate"]))
+
+    def _save(self):
+        revision, boilerplate = self.template
+        data = {
+            "format": TEMPLATE_FORMAT,
+            "site": self.site,
+            "revision": revision,
+            "updated_at": time.time(),
+            "pages": self.pages,
+            "boilerplate": sorted(boilerplate),
+            "counts": self.counts,
+            "urls": list(self.urls),
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def strip(self, blocks: dict):
+        """(revision, elements) of the blocks of a page that are boilerplate."""
+        revision, boilerplate = self.template
+        return revision, {el for el, digest in blocks.items() if digest in boilerplate}
+
+    def learn(self, url: str, digests):
+        """Count the distinct block hashes of a page, unless its URL was learned before."""
+        settings = self.settings
+        key = hashlib.sha1(url.encode()).hexdigest()[:16]
+        with self._lock:
+            if key in self.urls:
+                return
+            self.urls[key] = None
+            if len(self.urls) > settings["max_urls_per_site"]:
+                self.urls.popitem(last=False)
+            self.pages += 1
+            self.counts.update(set(digests))
+            if len(self.counts) > settings["max_blocks_per_site"]:
+                self.counts = Counter(
+                    dict(self.counts.most_common(settings["max_blocks_per_site"] // 2))
+                )
+            self._pending += 1
+            if (
+                self._pending >= settings["update_every"]
+                or self.pages == settings["min_pages"]
+            ):
+                self._update()
+
+    def flush(self):
+        """Update and save the template if pages were learned since the last save."""
+        with self._lock:
+            if self._pending:
+                self._update()
+
+    def _update(self):
+        settings = self.settings
+        boilerplate = frozenset()
+        if self.pages >= settings["min_pages"]:
+            min_count = settings["min_share"] * self.pages
+            boilerplate = frozenset(
+                digest for digest, count in self.counts.items() if count > min_count
+            )
+        revision, current = self.template
+        if boilerplate != current:
+            self.template = (revision + 1, boilerplate)
+        self._pending = 0
+        self._save()
+
+
+class BoilerplateStore:
+    """Site templates, loaded from disk on first use and kept in an LRU."""
+
+    def __init__(self, folder: str = None, **settings):
+        self.settings = {**BOILERPLATE_SETTINGS, **settings}
+        self.folder = folder or os.path.join(get_home_folder(), "cache", "boilerplate")
+        os.makedirs(self.folder, exist_ok=True)
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def template(self, url: str) -> SiteTemplate:
+        """Template of the site of `url`."""
+        site = site_of(url)
+        with self._lock:
+            template = self._templates.get(site)
+            if template is None:
+                filename = re.sub(r"[^\w.-]", "_", site) + ".json"
+                template = self._templates[site] = SiteTemplate(
+                    site, os.path.join(self.folder, filename), **self.settings
+                )
+                if len(self._templates) > self.settings["max_sites"]:
+                    _, evicted = self._templates.popitem(last=False)
+                    evicted.flush()
+            self._templates.move_to_end(site)
+            return template
+
+
+_boilerplate_store = None
+_boilerplate_store_guard = threading.Lock()
+
+
+def get_boilerplate_store() -> BoilerplateStore:
+    global _boilerplate_store
+    with _boilerplate_store_guard:
+        if _boilerplate_store is None:
+            _boilerplate_store = BoilerplateStore()
+        return _boilerplate_store
@@ -39,3 +39,45 @@ CHUNK_TOKEN_THRESHOLD = 1000
 
 # Threshold for the minimum number of word in a HTML tag to be considered
 MIN_WORD_THRESHOLD = 5
+
+# File extensions of the resource types the browser can skip
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"],
+    "media": ["mp4", "webm", "ogg", "mp3", "wav", "m4a", "mov", "m3u8"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "stylesheet": ["css"],
+}
+
+# Resource types blocked while a page is rendered for its text; a screenshot loads everything
+BLOCKED_RESOURCE_TYPES = ["image", "media", "font", "stylesheet"]
+
+# Analytics, ad and tracking hosts (subdomains included) blocked on every text-only page load
+BLOCKED_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "analytics.twitter.com",
+    "static.ads-twitter.com",
+    "snap.licdn.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "taboola.com",
+    "outbrain.com",
+    "criteo.com",
+    "adnxs.com",
+    "amazon-adsystem.com",
+]
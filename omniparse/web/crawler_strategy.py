@@ -12,7 +12,18 @@ License: Apache 2.0 License
 URL: https://github.com/unclecode/crawl4ai/blob/main/LICENSE
 """
 
+import re
+import time
+import queue
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import lxml.html
+import psutil
+import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -28,6 +39,12 @@ from io import BytesIO
 from typing import List
 from pathlib import Path
 from omniparse.web.utils import wrap_text
+from omniparse.web.http_cache import cache_headers
+from omniparse.web.config import (
+    BLOCKED_HOSTS,
+    BLOCKED_RESOURCE_TYPES,
+    RESOURCE_TYPE_EXTENSIONS,
+)
 
 logger = logging.getLogger("selenium.webdriver.remote.remote_connection")
 logger.setLevel(logging.WARNING)
@@ -47,11 +64,241 @@ driver_finder_logger = logging.getLogger("selenium.webdriver.common.driver_finde
 driver_finder_logger.setLevel(logging.WARNING)
 
 
+BROWSER_POOL_SETTINGS = {
+    "size": 2,  # Chrome instances loading pages in parallel
+    "max_pages": 100,  # pages a driver loads before it is replaced
+    "max_memory_mb": 1536,  # RSS of a driver's Chrome processes that triggers a restart
+    "page_timeout": 30,  # seconds allowed for a page load or a script
+    "checkout_timeout": 120,  # seconds a request waits for a free driver
+}
+
+SCREENSHOT_SETTINGS = {
+    "format": "webp",  # "webp", "jpeg" or "png", encoded by Chrome
+    "quality": 80,  # 0-100, for webp and jpeg
+    "max_width": 1920,  # CSS pixels, the page beyond is cut off
+    "max_height": 8000,  # CSS pixels, a very long page is captured from the top
+    "scale": 1.0,  # device pixels per CSS pixel of the captured image
+}
+SCREENSHOT_FORMATS = ("webp", "jpeg", "png")
+
+# Bytes the page and its subresources came in as, per the Resource Timing API. Blocked
+# requests never start; cross-origin resources without Timing-Allow-Origin count as 0.
+TRANSFERRED_BYTES_JS = """
+return performance.getEntriesByType("navigation")
+    .concat(performance.getEntriesByType("resource"))
+    .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+
+def blocked_url_patterns(resource_types=None, hosts=None) -> List[str]:
+    """DevTools URL patterns (`*` wildcards) for Network.setBlockedURLs."""
+    resource_types = (
+        BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types
+    )
+    hosts = BLOCKED_HOSTS if hosts is None else hosts
+    patterns = []
+    for resource_type in resource_types:
+        for extension in RESOURCE_TYPE_EXTENSIONS[resource_type]:
+            # Anchored on the end of the path, so hosts like www.movies.com still load
+            patterns += [f"*.{extension}", f"*.{extension}?*"]
+    for host in hosts:
+        patterns += [f"*://{host}/*", f"*://*.{host}/*"]
+    return patterns
+
+
+class BrowserPool:
+    """
+    Fixed-size pool of webdrivers with checkout/checkin semantics.
+
+    Drivers are started lazily and used by one page load at a time. On checkin the
+    cookies, storage, user agent and window size of the page are reset; a driver is
+    quit and replaced after `max_pages` pages, above `max_memory_mb`, or after a failed
+    page load.
+    """
+
+    def __init__(
+        self,
+        create_driver,
+        size: int = 2,
+        max_pages: int = 100,
+        max_memory_mb: float = 1536,
+        page_timeout: float = 30,
+        checkout_timeout: float = 120,
+    ):
+        self.create_driver = create_driver
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.page_timeout = page_timeout
+        self.checkout_timeout = checkout_timeout
+
+        # Most recently used first, so idle drivers beyond the load stay cold
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._drivers = {}
+        self._generation = 0
+        self._closed = False
+        self._stats = {"started": 0, "recycled": 0, "failed": 0, "pages": 0}
+
+    def _start(self):
+        driver = self.create_driver()
+        driver.set_page_load_timeout(self.page_timeout)
+        driver.set_script_timeout(self.page_timeout)
+        with self._lock:
+            self._drivers[driver] = {
+                "pages": 0,
+                "generation": self._generation,
+                "user_agent": driver.execute_script("return navigator.userAgent"),
+                "window_size": driver.get_window_size(),
+            }
+            self._stats["started"] += 1
+        return driver
+
+    def start(self, count: int = 1):
+        """Start up to `count` idle drivers ahead of the first request."""
+        for _ in range(min(count, self.size) - self._idle.qsize()):
+            self._idle.put(self._start())
+
+    @contextmanager
+    def driver(self):
+        """Check out a driver for one page load; it is checked in when the block exits."""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(
+                f"No browser became free within {self.checkout_timeout} seconds"
+            )
+        driver, succeeded = None, False
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._start()
+            yield driver
+            succeeded = True
+        finally:
+            if driver is not None:
+                self._checkin(driver, succeeded)
+            self._slots.release()
+
+    def _memory_mb(self, driver) -> float:
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            rss = sum(
+                child.memory_info().rss for child in process.children(recursive=True)
+            )
+        except (AttributeError, psutil.Error):
+            return 0.0
+        return rss / 1024 / 1024
+
+    def _reset(self, driver, state: dict):
+        origin = urlparse(driver.current_url)
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        if origin.scheme in ("http", "https"):
+            driver.execute_cdp_cmd(
+                "Storage.clearDataForOrigin",
+                {
+                    "origin": f"{origin.scheme}://{origin.netloc}",
+                    "storageTypes": "local_storage,session_storage,indexeddb,"
+                    "websql,cache_storage,service_workers",
+                },
+            )
+        driver.execute_cdp_cmd(
+            "Network.setUserAgentOverride", {"userAgent": state["user_agent"]}
+        )
+        driver.set_window_size(
+            state["window_size"]["width"], state["window_size"]["height"]
+        )
+
+    def _checkin(self, driver, succeeded: bool):
+        with self._lock:
+            state = self._drivers[driver]
+            state["pages"] += 1
+            self._stats["pages"] += 1
+            if not succeeded:
+                self._stats["failed"] += 1
+            retire = (
+                self._closed
+                or not succeeded
+                or state["generation"] != self._generation
+                or state["pages"] >= self.max_pages
+            )
+        if not retire and self._memory_mb(driver) > self.max_memory_mb:
+            retire = True
+        if not retire:
+            try:
+                self._reset(driver, state)
+            except Exception:
+                retire = True
+        if retire:
+            self._retire(driver)
+        else:
+            self._idle.put(driver)
+
+    def _retire(self, driver):
+        with self._lock:
+            self._drivers.pop(driver, None)
+            self._stats["recycled"] += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _drain(self):
+        while True:
+            try:
+                self._retire(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def restart(self):
+        """Replace every driver, e.g. after the browser options changed."""
+        with self._lock:
+            self._generation += 1
+        self._drain()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._drain()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "size": self.size,
+                "alive": len(self._drivers),
+                "idle": self._idle.qsize(),
+            }
+
+
 class CrawlerStrategy(ABC):
+    # Page loads the strategy can run in parallel, None if unbounded
+    max_concurrency = None
+
     @abstractmethod
     def crawl(self, url: str, **kwargs) -> str:
         pass
 
+    def crawl_page(
+        self,
+        url: str,
+        screenshot: bool = False,
+        user_agent: str = None,
+        headers: dict = None,
+    ) -> dict:
+        """
+        HTML of `url` and, if requested, a base64 screenshot of the same page. `headers`
+        are extra request headers for strategies that fetch over HTTP.
+        """
+        if user_agent:
+            self.update_user_agent(user_agent)
+        html = self.crawl(url)
+        return {
+            "html": html,
+            "screenshot": self.take_screenshot() if screenshot else None,
+        }
+
     @abstractmethod
     def take_screenshot(self, save_path: str):
         pass
@@ -86,49 +333,111 @@ class LocalSeleniumCrawlerStrategy(CrawlerStrategy):
         # self.options.add_argument("--disable-web-security")
         self.options.add_argument("--log-level=3")
         self.use_cached_html = use_cached_html
-        self.use_cached_html = use_cached_html
         self.js_code = js_code
         self.verbose = kwargs.get("verbose", False)
+        # Text extraction only needs the DOM: images, media, fonts, stylesheets and
+        # tracking hosts are not downloaded unless the page is photographed
+        self.block_resources = kwargs.get("block_resources", True)
+        self.blocked_urls = blocked_url_patterns(
+            kwargs.get("blocked_resource_types"), kwargs.get("blocked_hosts")
+        )
+        self.screenshot_settings = {
+            **SCREENSHOT_SETTINGS,
+            **kwargs.get("screenshot_settings", {}),
+        }
+        if self.screenshot_settings["format"] not in SCREENSHOT_FORMATS:
+            raise ValueError(
+                f"Invalid screenshot format. Choose from: {', '.join(SCREENSHOT_FORMATS)}"
+            )
 
         # chromedriver_autoinstaller.install()
         # import chromedriver_autoinstaller
-        self.service = Service(ChromeDriverManager().install())
-        self.service.log_path = "NUL"
-        self.driver = webdriver.Chrome(service=self.service, options=self.options)
+        self.driver_path = ChromeDriverManager().install()
+        pool_settings = {**BROWSER_POOL_SETTINGS, **kwargs.get("pool_settings", {})}
+        self.pool = BrowserPool(self._create_driver, **pool_settings)
+        self.max_concurrency = self.pool.size
+        self.pool.start(1)
+
+    def _create_driver(self):
+        # Every driver needs its own chromedriver service
+        service = Service(self.driver_path)
+        service.log_path = "NUL"
+        driver = webdriver.Chrome(service=service, options=self.options)
+        # Network.setBlockedURLs only applies once the Network domain is enabled
+        driver.execute_cdp_cmd("Network.enable", {})
+        return driver
 
     def update_user_agent(self, user_agent: str):
         self.options.add_argument(f"user-agent={user_agent}")
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=self.service, options=self.options)
+        self.pool.restart()
 
     def crawl(self, url: str) -> str:
+        return self.crawl_page(url)["html"]
+
+    def crawl_page(
+        self,
+        url: str,
+        screenshot: bool = False,
+        user_agent: str = None,
+        headers: dict = None,
+    ) -> dict:
+        # Conditional request headers would leave the browser with an empty page
+        with self.pool.driver() as driver:
+            if user_agent:
+                # Reset to the driver's own user agent on checkin
+                driver.execute_cdp_cmd(
+                    "Network.setUserAgentOverride", {"userAgent": user_agent}
+                )
+            # Set on every page load, the previous one on this driver may differ
+            block = self.block_resources and not screenshot
+            driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": self.blocked_urls if block else []}
+            )
+            start = time.time()
+            html = self._load_page(driver, url)
+            seconds = time.time() - start
+            transferred = driver.execute_script(TRANSFERRED_BYTES_JS)
+            image = self.capture_screenshot(driver) if screenshot else {}
+        return {
+            "html": html,
+            "screenshot": image.pop("data", None),
+            "screenshot_info": image,
+            "fetch": {
+                "path": "browser",
+                "seconds": round(seconds, 3),
+                "bytes": transferred,
+                "blocked_resources": block,
+            },
+        }
+
+    def _load_page(self, driver, url: str) -> str:
         try:
             if self.verbose:
                 print(f"[LOG] Crawling {url} using Web Crawler...")
-            self.driver.get(url)
-            WebDriverWait(self.driver, 10).until(
+            driver.get(url)
+            WebDriverWait(driver, 10).until(
                 EC.presence_of_all_elements_located((By.TAG_NAME, "html"))
             )
 
             # Execute JS code if provided
             if self.js_code and type(self.js_code) == str:
-                self.driver.execute_script(self.js_code)
+                driver.execute_script(self.js_code)
                 # Optionally, wait for some condition after executing the JS code
-                WebDriverWait(self.driver, 10).until(
+                WebDriverWait(driver, 10).until(
                     lambda driver: driver.execute_script("return document.readyState")
                     == "complete"
                 )
             elif self.js_code and type(self.js_code) == list:
                 for js in self.js_code:
-                    self.driver.execute_script(js)
-                    WebDriverWait(self.driver, 10).until(
+                    driver.execute_script(js)
+                    WebDriverWait(driver, 10).until(
                         lambda driver: driver.execute_script(
                             "return document.readyState"
                         )
                         == "complete"
                     )
 
-            html = self.driver.page_source
+            html = driver.page_source
             if self.verbose:
                 print(f"[LOG] ✅ Crawled {url} successfully!")
 
@@ -138,32 +447,48 @@ class LocalSeleniumCrawlerStrategy(CrawlerStrategy):
         except Exception as e:
             raise Exception(f"Failed to crawl {url}: {str(e)}")
 
-    def take_screenshot(self) -> str:
+    def take_screenshot(self, driver) -> str:
+        return self.capture_screenshot(driver)["data"]
+
+    def capture_screenshot(self, driver) -> dict:
+        """
+        Base64 image of the page from the top, clipped to `max_width` x `max_height` CSS
+        pixels and encoded by Chrome, with its format, size and scale. The window is
+        not resized and the image is not decoded here, so memory stays bounded by the
+        clip however long the page is.
+        """
+        settings = self.screenshot_settings
         try:
-            # Get the dimensions of the page
-            total_width = self.driver.execute_script("return document.body.scrollWidth")
-            total_height = self.driver.execute_script(
-                "return document.body.scrollHeight"
-            )
-
-            # Set the window size to the dimensions of the page
-            self.driver.set_window_size(total_width, total_height)
-
-            # Take screenshot
-            screenshot = self.driver.get_screenshot_as_png()
-
-            # Open the screenshot with PIL
-            image = Image.open(BytesIO(screenshot))
-
-            # Convert to JPEG and compress
-            buffered = BytesIO()
-            image.save(buffered, format="JPEG", quality=85)
-            img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
+            metrics = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+            content = metrics.get("cssContentSize") or metrics["contentSize"]
+            width = min(int(content["width"]), settings["max_width"])
+            height = min(int(content["height"]), settings["max_height"])
+            params = {
+                "format": settings["format"],
+                "clip": {
+                    "x": 0,
+                    "y": 0,
+                    "width": width,
+                    "height": height,
+                    "scale": settings["scale"],
+                },
+                "captureBeyondViewport": True,
+            }
+            if settings["format"] != "png":
+                params["quality"] = settings["quality"]
+            data = driver.execute_cdp_cmd("Page.captureScreenshot", params)["data"]
 
             if self.verbose:
                 print(f"[LOG] 📸 Screenshot taken and converted to base64")
 
-            return img_base64
+            return {
+                "data": data,
+                "format": settings["format"],
+                "width": round(width * settings["scale"]),
+                "height": round(height * settings["scale"]),
+                "scale": settings["scale"],
+                "truncated": content["height"] > height or content["width"] > width,
+            }
 
         except Exception as e:
             error_message = f"Failed to take screenshot: {str(e)}"
@@ -195,7 +520,238 @@ class LocalSeleniumCrawlerStrategy(CrawlerStrategy):
             img.save(buffered, format="JPEG")
             img_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
 
-            return img_base64
+            return {
+                "data": img_base64,
+                "format": "jpeg",
+                "width": 800,
+                "height": 600,
+                "error": error_message,
+            }
+
+    def quit(self):
+        self.pool.close()
+
+
+HTTP_FETCH_SETTINGS = {
+    "pool_maxsize": 16,  # keep-alive connections per host, also the parallel fetches
+    "max_connections": 256,  # open connections of the async client across hosts
+    "timeout": 15,  # seconds to connect and between bytes
+    "min_text_chars": 200,  # less visible body text than this needs the browser
+    "noscript_text_chars": 1000,  # pages warning about JavaScript below this too
+    "user_agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/126.0.0.0 Safari/537.36"
+    ),
+}
+
+# Mount points of client-side rendered apps (React, Next.js, Nuxt, Vue, Angular, Svelte)
+SPA_ROOT_IDS = {"root", "app", "__next", "__nuxt", "svelte", "main", "application"}
+SPA_ROOT_ATTRIBUTES = ("ng-app", "ng-version", "data-reactroot", "data-v-app")
+NOSCRIPT_MARKERS = re.compile(
+    r"(enable|requires?|turn on|activate)\s+javascript|javascript\s+(is\s+)?(required|disabled)",
+    re.IGNORECASE,
+)
+# Usually bot protection that a real browser gets through
+BROWSER_RETRY_STATUSES = {401, 403, 429, 503}
+META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+def decode_html(content: bytes, content_type: str = "") -> str:
+    """
+    Text of a fetched page in the charset of its Content-Type header, else of its meta
+    tag, else UTF-8 (HTTP clients fall back to ISO-8859-1 for text/html).
+    """
+    match = re.search(r"charset=[\"']?([\w-]+)", content_type, re.IGNORECASE)
+    if match:
+        encoding = match.group(1)
+    else:
+        match = META_CHARSET.search(content[:4096])
+        encoding = match.group(1).decode() if match else "utf-8"
+    try:
+        return content.decode(encoding, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def browser_fallback_reason(status: int, html: str, **http_settings):
+    """Why a page fetched over HTTP has to be rendered by the browser, or None."""
+    if status in BROWSER_RETRY_STATUSES:
+        return f"status_{status}"
+    return needs_javascript(html, **http_settings)
+
+
+def needs_javascript(html: str, **http_settings):
+    """
+    Reason the page has to be rendered by a browser ("empty_body", "noscript",
+    "spa_root"), or None if the fetched HTML already holds the content.
+    """
+    settings = {**HTTP_FETCH_SETTINGS, **http_settings}
+    if not html or not html.strip():
+        return "empty_body"
+    try:
+        root = lxml.html.document_fromstring(
+            html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8")
+        )
+    except (lxml.etree.ParserError, ValueError):
+        return "empty_body"
+    body = root.find("body")
+    if body is None:
+        return "empty_body"
+
+    noscript = " ".join(tag.text_content() for tag in body.iter("noscript"))
+    text_chars = len(
+        "".join(
+            text
+            for element in body.iter()
+            if isinstance(element.tag, str)
+            and element.tag not in ("script", "style", "noscript", "template")
+            for text in (element.text, element.tail)
+            if text and not text.isspace()
+        )
+    )
+
+    if text_chars < settings["min_text_chars"]:
+        for element in body.iter():
+            if element.get("id") in SPA_ROOT_IDS or any(
+                attribute in element.attrib for attribute in SPA_ROOT_ATTRIBUTES
+            ):
+                return "spa_root"
+        return "empty_body"
+    if text_chars < settings["noscript_text_chars"] and NOSCRIPT_MARKERS.search(
+        noscript
+    ):
+        return "noscript"
+    return None
+
+
+class HttpCrawlerStrategy(CrawlerStrategy):
+    """
+    Fetches pages with a pooled keep-alive HTTP client and renders them with a browser
+    only when they need JavaScript, need a screenshot, or the server refused the client.
+
+    `crawl_page` reports the path taken in its `fetch` entry.
+    """
+
+    def __init__(self, browser_factory=None, js_code=None, **kwargs):
+        super().__init__()
+        self.settings = {**HTTP_FETCH_SETTINGS, **kwargs.get("http_settings", {})}
+        self.verbose = kwargs.get("verbose", False)
+        self.js_code = js_code
+        self.user_agent = kwargs.get("user_agent") or self.settings["user_agent"]
+        self.max_concurrency = self.settings["pool_maxsize"]
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.settings["pool_maxsize"],
+            pool_maxsize=self.settings["pool_maxsize"],
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {
+                "User-Agent": self.user_agent,
+                "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+                "Accept-Encoding": ACCEPT_ENCODING,
+            }
+        )
+
+        # The browser starts on the first page that needs it
+        self.browser_factory = browser_factory or (
+            lambda: LocalSeleniumCrawlerStrategy(js_code=js_code, verbose=self.verbose)
+        )
+        self._browser = None
+        self._browser_lock = threading.Lock()
+
+    @property
+    def browser(self) -> CrawlerStrategy:
+        with self._browser_lock:
+            if self._browser is None:
+                self._browser = self.browser_factory()
+            return self._browser
+
+    def update_user_agent(self, user_agent: str):
+        self.user_agent = user_agent
+        self.session.headers["User-Agent"] = user_agent
+        if self._browser is not None:
+            self._browser.update_user_agent(user_agent)
+
+    def _fetch(self, url: str, user_agent: str = None, headers: dict = None):
+        headers = {
+            **(headers or {}),
+            **({"User-Agent": user_agent} if user_agent else {}),
+        }
+        response = self.session.get(
+            url, headers=headers, timeout=self.settings["timeout"]
+        )
+        html = decode_html(response.content, response.headers.get("Content-Type", ""))
+        return response.status_code, html, cache_headers(response.headers)
+
+    def crawl_page(
+        self,
+        url: str,
+        screenshot: bool = False,
+        user_agent: str = None,
+        headers: dict = None,
+    ) -> dict:
+        response_headers = {}
+        if screenshot:
+            reason, status = "screenshot", None
+        elif self.js_code:
+            reason, status = "js_code", None
+        else:
+            start = time.time()
+            try:
+                status, html, response_headers = self._fetch(url, user_agent, headers)
+            except requests.RequestException as e:
+                raise Exception(f"Failed to crawl {url}: {str(e)}")
+            # A 304 answers the conditional headers, the caller has the page
+            reason = (
+                None
+                if status == 304
+                else browser_fallback_reason(status, html, **self.settings)
+            )
+            if reason is None:
+                if self.verbose:
+                    print(f"[LOG] ✅ Fetched {url} over HTTP")
+                return {
+                    "html": None if status == 304 else html,
+                    "screenshot": None,
+                    "fetch": {
+                        "path": "http",
+                        "status": status,
+                        "seconds": round(time.time() - start, 3),
+                        "headers": response_headers,
+                    },
+                }
+
+        if self.verbose:
+            print(f"[LOG] Rendering {url} in the browser ({reason})")
+        page = self.browser.crawl_page(
+            url, screenshot=screenshot, user_agent=user_agent
+        )
+        page["fetch"] = {
+            **page.get("fetch", {}),
+            "reason": reason,
+            "status": status,
+            "headers": response_headers,
+        }
+        return page
+
+    def crawl(self, url: str) -> str:
+        return self.crawl_page(url)["html"]
+
+    def take_screenshot(self, *args):
+        # Screenshots need a browser, crawl_page(url, screenshot=True) loads the page once
+        return self.browser.take_screenshot(*args)
 
     def quit(self):
-        self.driver.quit()
+        self.session.close()
+        if self._browser is not None:
+            self._browser.quit()
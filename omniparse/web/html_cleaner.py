@@ -0,0 +1,480 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Single-parse HTML cleaning and markdown conversion.
+
+Produces the markdown, cleaned HTML, links, media and metadata of
+`get_content_of_website` + `extract_metadata` with the page parsed once, by lxml, and
+every node visited a constant number of times:
+
+1. a post-order pass records links and media and decides for every element whether it
+   is dropped (non-content tags, images without alt text), replaced by its alt text,
+   pruned (too few words) or unwrapped (only child of the same tag). Word counts are
+   aggregated bottom-up instead of calling `get_text` on every subtree;
+2. a pre-order pass over the surviving elements writes the cleaned HTML and feeds
+   html2text the same tag and text events its own HTML parser would produce.
+
+The tree itself is never modified, so the text around a removed element stays split in
+separate strings, as it does after BeautifulSoup's `decompose`.
+"""
+
+import re
+import hashlib
+from typing import Optional
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+from cssselect import SelectorError
+from html2text.utils import pad_tables_in_text
+
+from .config import MIN_WORD_THRESHOLD
+from .utils import CustomHTML2Text, InvalidCSSSelectorError, sanitize_html
+
+NON_CONTENT_TAGS = {"script", "style", "link", "meta", "noscript"}
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+ASCII_SPACES = " \n\t\f\r"
+ENTITY_PATTERN = re.compile(r"&(amp|lt|gt);")
+# Elements hashed as blocks for boilerplate templates
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "details",
+    "dialog",
+    "div",
+    "dl",
+    "fieldset",
+    "figure",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "section",
+    "table",
+    "ul",
+}
+
+
+def _string_stats(text: Optional[str]):
+    """(words, strings) of one text node, counting only strings with visible text."""
+    if not text:
+        return 0, 0
+    words = len(text.split())
+    return (words, 1) if words else (0, 0)
+
+
+def _collapse_whitespace(text: str) -> str:
+    """BeautifulSoup keeps whitespace-only strings outside <pre> as one newline or space."""
+    if text.strip(ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class _PageCleaner:
+    """Cleaning decisions for one page; the lxml tree itself is left untouched."""
+
+    def __init__(self, url, root_tag, root_text, root_children, root_tails, threshold):
+        self.url_base = url.split("/")[2]
+        self.root_tag = root_tag
+        self.root_text = root_text
+        self.root_children = root_children
+        self.root_tails = root_tails
+        self.threshold = threshold
+        # Elements selected with a CSS selector are moved out of their parents
+        self.detached = set() if root_tails else set(root_children)
+
+        self.dropped = set()
+        self.alt_text = {}
+        self.pruned = set()
+        self.unwrapped = set()
+        self.pre_text = {}
+        self.stats = {}
+        self.preserve_whitespace = set()
+        self.stripped = set()
+
+        self.links = {"internal": [], "external": []}
+        self.media = {"images": [], "videos": [], "audios": []}
+
+    def _add_link(self, a):
+        href = a.get("href")
+        if href is None:
+            return
+        kind = (
+            "external"
+            if href.startswith("http") and self.url_base not in href
+            else "internal"
+        )
+        self.links[kind].append({"href": href, "text": a.text_content()})
+
+    def _enter(self, el) -> bool:
+        """Record links and media of `el`; False if its subtree is not visited."""
+        tag = el.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions
+            self.dropped.add(el)
+            return False
+        if (
+            tag in PRESERVE_WHITESPACE_TAGS
+            or el.getparent() in self.preserve_whitespace
+        ):
+            self.preserve_whitespace.add(el)
+        if tag in NON_CONTENT_TAGS:
+            for a in el.iter("a"):
+                self._add_link(a)
+            self.dropped.add(el)
+            return False
+        if tag == "a":
+            self._add_link(el)
+        elif tag == "img":
+            self.media["images"].append(
+                {"src": el.get("src"), "alt": el.get("alt"), "type": "image"}
+            )
+            alt = el.get("alt")
+            if alt:
+                self.alt_text[el] = alt
+            else:
+                self.dropped.add(el)
+            return False
+        elif tag in ("video", "audio"):
+            self.media[f"{tag}s"].append(
+                {"src": el.get("src"), "alt": el.get("alt"), "type": tag}
+            )
+        return True
+
+    def _is_kept(self, el, top=False) -> bool:
+        return not (
+            el in self.dropped
+            or el in self.pruned
+            or el in self.alt_text
+            or el in self.stripped
+            or (not top and el in self.detached)
+        )
+
+    def _contents(self, text, children, tails=True, top=False, preserve=False):
+        """Surviving content of an element: ("text", str) and ("el", element) items."""
+        collapse = (lambda text: text) if preserve else _collapse_whitespace
+        items = [("text", collapse(text))] if text else []
+        for child in children:
+            if self._is_kept(child, top):
+                items.append(("el", child))
+            elif child in self.alt_text and (top or child not in self.detached):
+                items.append(("text", self.alt_text[child]))
+            if tails and child.tail:
+                items.append(("text", collapse(child.tail)))
+        return items
+
+    def _pre_text(self, pre) -> str:
+        """
+        Text of a <pre> like `get_text()` after tag removal. <pre> is flattened before
+        pruning in the original pipeline, so pruned descendants still contribute.
+        """
+        parts = []
+        stack = [pre]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            if item is not pre and item in self.pre_text:
+                parts.append(self.pre_text[item])
+                continue
+            items = [item.text or ""]
+            for child in item:
+                if child in self.alt_text and child not in self.detached:
+                    items.append(self.alt_text[child])
+                elif not (child in self.dropped or child in self.detached):
+                    items.append(child)
+                items.append(child.tail or "")
+            stack.extend(reversed(items))
+        return "".join(parts)
+
+    def _leave(self, el):
+        """Aggregate the word count of `el` from its children and prune or unwrap it."""
+        if el.tag == "pre":
+            text = self._pre_text(el)
+            self.pre_text[el] = text
+            words, strings = _string_stats(text)
+        else:
+            words, strings = _string_stats(el.text)
+            for child in el:
+                if self._is_kept(child):
+                    child_words, child_strings = self.stats[child]
+                elif child in self.alt_text and child not in self.detached:
+                    child_words, child_strings = _string_stats(self.alt_text[child])
+                else:
+                    child_words, child_strings = 0, 0
+                tail_words, tail_strings = _string_stats(child.tail)
+                words += child_words + tail_words
+                strings += child_strings + tail_strings
+
+        # get_text(strip=True) joins the strings without a separator, merging the
+        # last word of each string with the first word of the next
+        word_count = words - strings + 1 if strings else 0
+        if strings == 0 or word_count < self.threshold:
+            self.pruned.add(el)
+            return
+        self.stats[el] = (words, strings)
+
+        if el.tag != "pre" and not el.text:
+            contents = self._contents(None, el)
+            if (
+                len(contents) == 1
+                and contents[0][0] == "el"
+                and contents[0][1].tag == el.tag
+            ):
+                self.unwrapped.add(el)
+
+    def prune(self):
+        stack = [(child, False) for child in reversed(self.root_children)]
+        while stack:
+            el, visited = stack.pop()
+            if visited:
+                self._leave(el)
+            elif self._enter(el):
+                stack.append((el, True))
+                stack.extend(
+                    (child, False)
+                    for child in reversed(el)
+                    if child not in self.detached
+                )
+
+    def block_hashes(self) -> dict:
+        """
+        Hash of the cleaned subtree (tags and whitespace-normalized text) of every kept
+        block element, computed bottom-up from the hashes of its children.
+        """
+        hashes, blocks = {}, {}
+        stack = [
+            (child, False)
+            for child in reversed(self.root_children)
+            if self._is_kept(child, top=True)
+        ]
+        while stack:
+            el, visited = stack.pop()
+            if not visited:
+                stack.append((el, True))
+                if el not in self.pre_text:
+                    stack.extend(
+                        (child, False) for child in reversed(el) if self._is_kept(child)
+                    )
+                continue
+            digest = hashlib.blake2b(el.tag.encode(), digest_size=8)
+            if el in self.pre_text:
+                contents = [("text", self.pre_text[el])]
+            else:
+                contents = self._contents(el.text, el)
+            for kind, value in contents:
+                if kind == "el":
+                    digest.update(b"\1" + hashes[value])
+                elif value.strip():
+                    digest.update(b"\0" + " ".join(value.split()).encode())
+            hashes[el] = digest.digest()
+            if el.tag in BLOCK_TAGS:
+                blocks[el] = digest.hexdigest()
+        return blocks
+
+    def strip(self, elements) -> int:
+        """
+        Leave `elements` out of the output, unless they hold all the words of the
+        page. Returns the number of outermost elements removed.
+        """
+        outermost = [
+            el
+            for el in elements
+            if not any(parent in elements for parent in el.iterancestors())
+        ]
+        page_words = _string_stats(self.root_text)[0] + sum(
+            self.stats[child][0]
+            for child in self.root_children
+            if self._is_kept(child, top=True)
+        )
+        if sum(self.stats[el][0] for el in outermost) >= page_words:
+            return 0
+        self.stripped.update(outermost)
+        return len(outermost)
+
+    def events(self):
+        """("start" | "end" | "text", value) events of the cleaned tree, text merged."""
+        events = [("start", self.root_tag)]
+        stack = [("end", self.root_tag)]
+        stack.extend(
+            reversed(
+                self._contents(
+                    self.root_text, self.root_children, self.root_tails, top=True
+                )
+            )
+        )
+        text = []
+        while stack:
+            kind, value = stack.pop()
+            if kind == "text":
+                text.append(value)
+                continue
+            if text:
+                events.append(("text", "".join(text)))
+                text = []
+            if kind == "end":
+                events.append(("end", value))
+            elif value in self.unwrapped:
+                stack.extend(reversed(self._contents(None, value)))
+            else:
+                events.append(("start", value.tag))
+                stack.append(("end", value.tag))
+                if value in self.pre_text:
+                    stack.append(("text", self.pre_text[value]))
+                else:
+                    stack.extend(
+                        reversed(
+                            self._contents(
+                                value.text,
+                                value,
+                                preserve=value in self.preserve_whitespace,
+                            )
+                        )
+                    )
+        if text:
+            events.append(("text", "".join(text)))
+        return events
+
+
+def _markdown(events) -> str:
+    h = CustomHTML2Text()
+    h.ignore_links = True
+    h.start = True
+    for kind, value in events:
+        if kind == "start":
+            h.handle_starttag(value, [])
+        elif kind == "end":
+            h.handle_endtag(value)
+        else:
+            # html2text's parser reports character references separately
+            for i, part in enumerate(ENTITY_PATTERN.split(value)):
+                if i % 2:
+                    h.handle_entityref(part)
+                elif part:
+                    h.handle_data(part)
+    markdown = h.optwrap(h.finish())
+    if h.pad_tables:
+        markdown = pad_tables_in_text(markdown)
+    return markdown.replace("    ```", "```")
+
+
+def extract_page_metadata(root) -> dict:
+    """Title, description, keywords, author, Open Graph and Twitter Card metadata."""
+    title = root.find(".//title")
+    metadata = {
+        "title": title.text if title is not None else None,
+        "description": None,
+        "keywords": None,
+        "author": None,
+    }
+    seen, open_graph, twitter = set(), {}, {}
+    for meta in root.iter("meta"):
+        name, prop = meta.get("name"), meta.get("property")
+        if name in ("description", "keywords", "author") and name not in seen:
+            seen.add(name)
+            metadata[name] = meta.get("content")
+        if prop and prop.startswith("og:"):
+            open_graph[prop] = meta.get("content")
+        if name and name.startswith("twitter:"):
+            twitter[name] = meta.get("content")
+    metadata.update(open_graph)
+    metadata.update(twitter)
+    return metadata
+
+
+def clean_html(
+    url: str,
+    html: str,
+    word_count_threshold: int = MIN_WORD_THRESHOLD,
+    css_selector: str = None,
+    template=None,
+) -> Optional[dict]:
+    """
+    Markdown, cleaned HTML, links, media and metadata of a page.
+
+    With a site `template`, blocks it knows as boilerplate are left out and the page's
+    blocks are learned; `boilerplate` then reports the template revision used and the
+    number of blocks removed, and `block_hashes` the distinct hashes learned.
+
+    Returns None for an empty page and raises InvalidCSSSelectorError if `css_selector`
+    is invalid or matches nothing.
+    """
+    if not html:
+        return None
+    parser = lxml.html.HTMLParser(encoding="utf-8")
+    root = lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+    body = root.find("body")
+
+    if css_selector:
+        try:
+            selected = CSSSelector(css_selector)(body) if body is not None else []
+        except SelectorError as e:
+            raise InvalidCSSSelectorError(
+                f"Invalid CSS selector: {css_selector}"
+            ) from e
+        if not selected:
+            raise InvalidCSSSelectorError(
+                f"Invalid CSS selector , No elements found for CSS selector: {css_selector}"
+            )
+        page = _PageCleaner(url, "div", None, selected, False, word_count_threshold)
+    else:
+        children = list(body) if body is not None else []
+        text = body.text if body is not None else None
+        page = _PageCleaner(url, "body", text, children, True, word_count_threshold)
+
+    page.prune()
+    boilerplate = block_hashes = None
+    if template is not None:
+        blocks = page.block_hashes()
+        revision, elements = template.strip(blocks)
+        boilerplate = {
+            "site": template.site,
+            "revision": revision,
+            "blocks_removed": page.strip(elements),
+        }
+        block_hashes = sorted(set(blocks.values()))
+        template.learn(url, block_hashes)
+
+    events = []
+    html_parts = []
+    for kind, value in page.events():
+        if kind == "start":
+            html_parts.append(f"<{value}>")
+        elif kind == "end":
+            html_parts.append(f"</{value}>")
+        else:
+            # Same clean-up as on the serialized tree; tags contain no spaces or newlines
+            value = sanitize_html(
+                _escape(value).replace("\n\n", "\n").replace("  ", " ")
+            )
+            html_parts.append(value)
+        events.append((kind, value))
+
+    return {
+        "markdown": _markdown(events),
+        "cleaned_html": "".join(html_parts),
+        "success": True,
+        "media": page.media,
+        "links": page.links,
+        "metadata": extract_page_metadata(root),
+        "boilerplate": boilerplate,
+        "block_hashes": block_hashes,
+    }
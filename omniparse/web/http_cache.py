@@ -0,0 +1,324 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Disk cache of fetched pages with HTTP revalidation.
+
+Pages live under ~/.omniparse/cache/pages with the ETag, Last-Modified and
+Cache-Control headers they were served with. A page is served from disk while it is
+fresh (Cache-Control max-age, Expires, a heuristic on Last-Modified, or a per-request
+TTL). Once it is stale it is revalidated with a conditional GET, and a 304 reuses the
+stored HTML. Cleaned documents are stored next to the HTML under its content hash, so
+an unchanged page is not cleaned again either.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from omniparse.utils import get_home_folder
+
+HTTP_CACHE_SETTINGS = {
+    "default_ttl": 0,  # seconds a page without freshness headers is served unchecked
+    "heuristic_fraction": 0.1,  # of the time since Last-Modified, as browsers do
+    "max_heuristic_ttl": 24 * 3600,
+    "max_entries": 5000,
+    "max_disk_mb": 1024,
+}
+
+# Response headers kept with a page, in `fetch["headers"]` of crawl_page results
+CACHE_HEADERS = ("ETag", "Last-Modified", "Cache-Control", "Expires", "Date", "Age")
+
+
+def cache_headers(headers) -> dict:
+    """The caching headers of a response, by their canonical names."""
+    return {name: headers[name] for name in CACHE_HEADERS if headers.get(name)}
+
+
+def parse_cache_control(value: str) -> dict:
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"')
+    return directives
+
+
+def _http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers: dict, now: float = None, **settings) -> Optional[float]:
+    """
+    Seconds a response stays fresh after it was received, per RFC 9111, or None if
+    it must not be stored.
+    """
+    settings = {**HTTP_CACHE_SETTINGS, **settings}
+    now = now or time.time()
+    directives = parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-store" in directives:
+        return None
+    try:
+        age = float(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(0, int(directives[name]) - age)
+            except ValueError:
+                return 0
+
+    date = _http_date(headers.get("Date")) or now
+    if "Expires" in headers:
+        expires = _http_date(headers["Expires"])
+        # An invalid date, such as "0", means already expired
+        return max(0, expires - date) if expires else 0
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified and last_modified < date:
+        return min(
+            (date - last_modified) * settings["heuristic_fraction"],
+            settings["max_heuristic_ttl"],
+        )
+    return settings["default_ttl"]
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha1(html.encode("utf-8", errors="replace")).hexdigest()
+
+
+class PageCache:
+    """
+    Disk-backed LRU of fetched pages. `lookup` serves fresh pages and gives the
+    conditional headers for stale ones, `resolve` merges the fetched page with the
+    stored one, and documents are stored per page content and cleaning options.
+    """
+
+    def __init__(self, folder: str = None, **cache_settings):
+        self.settings = {**HTTP_CACHE_SETTINGS, **cache_settings}
+        self.folder = folder or os.path.join(get_home_folder(), "cache", "pages")
+        os.makedirs(self.folder, exist_ok=True)
+        self.index_path = os.path.join(self.folder, "index.json")
+        self._lock = threading.Lock()
+        self._index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self._index = json.load(f)
+        self._stats = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "cleans_avoided": 0,
+        }
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.folder, f"{key}{suffix}")
+
+    def _read_html(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key, ".html"), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _cached_page(self, entry: dict, html: str, fetch: dict) -> dict:
+        return {
+            "html": html,
+            "screenshot": None,
+            "fetch": {**entry["fetch"], **fetch},
+            "content_hash": entry["content_hash"],
+        }
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def lookup(self, url: str, ttl: float = None):
+        """
+        (page, None) if a fresh copy of `url` is stored, else (None, headers) with the
+        conditional request headers for a stale copy, or (None, None) if there is none.
+        `ttl` overrides the freshness lifetime of the stored response.
+        """
+        key = self._key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None, None
+            lifetime = entry["lifetime"] if ttl is None else ttl
+            if time.time() - entry["stored_at"] < lifetime:
+                html = self._read_html(key)
+                if html is not None:
+                    entry["last_access"] = time.time()
+                    self._stats["hits"] += 1
+                    return self._cached_page(entry, html, {"cache": "hit"}), None
+            headers = {}
+            if entry["headers"].get("ETag"):
+                headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+            return None, headers or None
+
+    def resolve(self, url: str, page: dict) -> Optional[dict]:
+        """
+        Store a fetched page, or complete a 304 response with the stored HTML. None
+        if the server answered 304 to a page that is no longer stored.
+        """
+        fetch = page.get("fetch") or {}
+        headers = fetch.get("headers") or {}
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(key)
+            if fetch.get("status") == 304:
+                html = self._read_html(key) if entry else None
+                if html is None:
+                    return None
+                # The 304 carries the updated freshness of the stored response
+                entry["headers"] = {**entry["headers"], **headers}
+                entry["lifetime"] = (
+                    freshness_lifetime(entry["headers"], now, **self.settings) or 0
+                )
+                entry["stored_at"] = entry["last_access"] = now
+                self._stats["revalidated"] += 1
+                self._save_index()
+                return self._cached_page(entry, html, {**fetch, "cache": "revalidated"})
+
+            self._stats["misses"] += 1
+            page = {**page, "fetch": {**fetch, "cache": "miss"}}
+            status = fetch.get("status")
+            lifetime = freshness_lifetime(headers, now, **self.settings)
+            if page.get("html") is None or lifetime is None or (status or 200) >= 400:
+                return page
+
+            page["content_hash"] = content_hash(page["html"])
+            if entry and entry["content_hash"] != page["content_hash"]:
+                # Documents cleaned from the old content are stale
+                self._remove_documents(key, entry)
+            documents = entry["documents"] if entry else {}
+            with open(self._path(key, ".html"), "w", encoding="utf-8") as f:
+                f.write(page["html"])
+            self._index[key] = {
+                "url": url,
+                "headers": headers,
+                "fetch": {
+                    name: value
+                    for name, value in fetch.items()
+                    if name not in ("seconds", "cache")
+                },
+                "content_hash": page["content_hash"],
+                "lifetime": lifetime,
+                "stored_at": now,
+                "last_access": now,
+                "size": len(page["html"]) + sum(documents.values()),
+                "documents": documents,
+            }
+            self._evict()
+            self._save_index()
+        return page
+
+    def load_document(self, url: str, page: dict, options_key: str) -> Optional[dict]:
+        """Document stored for this content of `url` and these cleaning options."""
+        key = self._key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if (
+                entry is None
+                or entry["content_hash"] != page.get("content_hash")
+                or options_key not in entry["documents"]
+            ):
+                return None
+            try:
+                with open(self._path(key, f".{options_key}.json")) as f:
+                    document = json.load(f)
+            except FileNotFoundError:
+                return None
+            self._stats["cleans_avoided"] += 1
+        return document
+
+    def save_document(self, url: str, page: dict, options_key: str, document: dict):
+        key = self._key(url)
+        data = json.dumps(document)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or entry["content_hash"] != page.get("content_hash"):
+                return
+            with open(self._path(key, f".{options_key}.json"), "w") as f:
+                f.write(data)
+            entry["size"] += len(data) - entry["documents"].get(options_key, 0)
+            entry["documents"][options_key] = len(data)
+            self._evict()
+            self._save_index()
+
+    def _remove_documents(self, key: str, entry: dict):
+        for options_key in entry["documents"]:
+            path = self._path(key, f".{options_key}.json")
+            if os.path.exists(path):
+                os.remove(path)
+        entry["documents"] = {}
+
+    def _evict(self):
+        max_bytes = self.settings["max_disk_mb"] * 1024 * 1024
+        entries = sorted(self._index, key=lambda e: self._index[e]["last_access"])
+        total = sum(entry["size"] for entry in self._index.values())
+        for key in entries:
+            if len(self._index) <= self.settings["max_entries"] and total <= max_bytes:
+                break
+            entry = self._index.pop(key)
+            total -= entry["size"]
+            self._remove_documents(key, entry)
+            path = self._path(key, ".html")
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _save_index(self):
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = (
+                self._stats["hits"] + self._stats["revalidated"] + self._stats["misses"]
+            )
+            return {
+                **self._stats,
+                "hit_rate": (
+                    round(
+                        (self._stats["hits"] + self._stats["revalidated"]) / lookups, 4
+                    )
+                    if lookups
+                    else 0.0
+                ),
+                "entries": len(self._index),
+                "disk_mb": round(
+                    sum(entry["size"] for entry in self._index.values()) / 1024 / 1024,
+                    3,
+                ),
+            }
+
+
+_page_cache = None
+_page_cache_guard = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    global _page_cache
+    with _page_cache_guard:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
@@ -19,6 +19,7 @@ import subprocess
 import shutil
 import tarfile
 from .config import MODEL_REPO_BRANCH
+from omniparse.utils import get_home_folder
 import argparse
 import urllib.request
 
@@ -77,14 +78,6 @@ def set_model_device(model):
 
 
 @lru_cache()
-def get_home_folder():
-    home_folder = os.path.join(Path.home(), ".omniparse")
-    os.makedirs(home_folder, exist_ok=True)
-    os.makedirs(f"{home_folder}/cache", exist_ok=True)
-    os.makedirs(f"{home_folder}/models", exist_ok=True)
-    return home_folder
-
-
 @lru_cache()
 def load_bert_base_uncased():
     from transformers import BertTokenizer, BertModel, AutoTokenizer, AutoModel
@@ -0,0 +1,180 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Near-duplicate detection of crawled pages with SimHash.
+
+Pagination, faceted listings and print views of a site differ in a few words. The
+SimHash of a page's markdown (64 bits, from word shingles) differs in only a few bits
+between such pages, so a page within `hamming_threshold` bits of one already seen on
+the same site joins that page's cluster. An index belongs to one crawl job: the pages
+it has seen are the ones the job already emitted. Fingerprints are split into
+`hamming_threshold + 1` bands: two fingerprints that close agree exactly on at least
+one band, so candidates are found by dictionary lookups instead of a scan.
+"""
+
+import re
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import List
+
+import numpy as np
+
+from omniparse.web.site_crawler import site_of
+
+NEAR_DUPLICATE_SETTINGS = {
+    "hamming_threshold": 3,  # max differing bits of two near-duplicate pages
+    "shingle_size": 3,  # words per shingle
+    "min_words": 20,  # shorter pages are fingerprinted but never clustered
+    "max_pages_per_site": 10000,  # most recent fingerprints kept per site
+    "max_sites": 1000,
+}
+
+WORD = re.compile(r"\w+")
+# Link and image targets, which differ between pages of a listing
+MARKDOWN_TARGET = re.compile(r"\]\([^)]*\)")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash of the word shingles of `text`, weighted by their counts."""
+    words = WORD.findall(MARKDOWN_TARGET.sub("]", text).lower())
+    if len(words) < shingle_size:
+        shingles = Counter([" ".join(words)])
+    else:
+        shingles = Counter(
+            " ".join(words[i : i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        )
+    hashes = np.frombuffer(
+        b"".join(
+            hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+            for shingle in shingles
+        ),
+        dtype=np.uint8,
+    ).reshape(-1, 8)
+    weights = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    # +weight for every set bit of a shingle's hash, -weight for every clear one
+    bits = np.unpackbits(hashes, axis=1).astype(np.int64)
+    totals = (2 * bits - 1).T @ weights
+    return int.from_bytes(np.packbits(totals > 0).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def band_ranges(bands: int, bits: int = 64) -> List[tuple]:
+    """(shift, mask) of `bands` contiguous bit ranges covering a `bits`-bit hash."""
+    ranges, shift = [], 0
+    for band in range(bands):
+        width = bits // bands + (1 if band < bits % bands else 0)
+        ranges.append((shift, (1 << width) - 1))
+        shift += width
+    return ranges
+
+
+class SiteIndex:
+    """Recent fingerprints of one site, looked up by band."""
+
+    def __init__(self, bands: List[tuple], max_pages: int):
+        self.bands = bands
+        self.max_pages = max_pages
+        # url -> (fingerprint, cluster id), oldest first
+        self.pages = OrderedDict()
+        # cluster id -> URL of the cluster's first page
+        self.clusters = {}
+        self.tables = [{} for _ in bands]
+
+    def _band_values(self, fingerprint: int):
+        for table, (shift, mask) in zip(self.tables, self.bands):
+            yield table, (fingerprint >> shift) & mask
+
+    def nearest(self, url: str, fingerprint: int, threshold: int):
+        """(url, distance) of the closest page within `threshold` bits, or None."""
+        best = None
+        seen = set()
+        for table, value in self._band_values(fingerprint):
+            for candidate in table.get(value, ()):
+                if candidate == url or candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = hamming_distance(fingerprint, self.pages[candidate][0])
+                if distance <= threshold and (best is None or distance < best[1]):
+                    best = (candidate, distance)
+        return best
+
+    def add(self, url: str, fingerprint: int, cluster_id: str):
+        self.remove(url)
+        self.pages[url] = (fingerprint, cluster_id)
+        self.clusters.setdefault(cluster_id, url)
+        for table, value in self._band_values(fingerprint):
+            table.setdefault(value, set()).add(url)
+        while len(self.pages) > self.max_pages:
+            self.remove(next(iter(self.pages)))
+
+    def remove(self, url: str):
+        if url not in self.pages:
+            return
+        fingerprint, cluster_id = self.pages.pop(url)
+        if self.clusters.get(cluster_id) == url:
+            del self.clusters[cluster_id]
+        for table, value in self._band_values(fingerprint):
+            table[value].discard(url)
+            if not table[value]:
+                del table[value]
+
+
+class NearDuplicateIndex:
+    """
+    Per-site index of the recent page fingerprints of one crawl job. `check`
+    fingerprints a page, records it and reports the cluster it belongs to.
+    """
+
+    def __init__(self, **settings):
+        self.settings = {**NEAR_DUPLICATE_SETTINGS, **settings}
+        self.bands = band_ranges(self.settings["hamming_threshold"] + 1)
+        self._sites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, url: str, markdown: str) -> dict:
+        """
+        Near-duplicate metadata of a page: its `simhash`, the `cluster_id` shared by
+        near-duplicates (the SimHash of the first page of the cluster), and, if an
+        earlier page is within the threshold, the URL of the cluster's first page in
+        `duplicate_of` and the `distance` in bits to the closest one.
+        """
+        settings = self.settings
+        fingerprint = simhash(markdown, settings["shingle_size"])
+        result = {
+            "simhash": f"{fingerprint:016x}",
+            "cluster_id": f"{fingerprint:016x}",
+            "duplicate_of": None,
+            "distance": None,
+        }
+        if len(WORD.findall(markdown)) < settings["min_words"]:
+            return result
+
+        site = site_of(url)
+        with self._lock:
+            index = self._sites.get(site)
+            if index is None:
+                index = self._sites[site] = SiteIndex(
+                    self.bands, settings["max_pages_per_site"]
+                )
+                if len(self._sites) > settings["max_sites"]:
+                    self._sites.popitem(last=False)
+            self._sites.move_to_end(site)
+
+            nearest = index.nearest(url, fingerprint, settings["hamming_threshold"])
+            if nearest is not None:
+                closest, distance = nearest
+                cluster_id = index.pages[closest][1]
+                result.update(
+                    cluster_id=cluster_id,
+                    duplicate_of=index.clusters.get(cluster_id, closest),
+                    distance=distance,
+                )
+            index.add(url, fingerprint, result["cluster_id"])
+        return result
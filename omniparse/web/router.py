@@ -1,7 +1,8 @@
 from fastapi import HTTPException, APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from omniparse import get_shared_state
-from omniparse.web import parse_url
+from omniparse.web import parse_url, crawl_site, check_crawl_url
+from omniparse.web.http_cache import get_page_cache
 from omniparse.models import responseDocument
 # from omniparse.models import Document
 
@@ -11,9 +12,9 @@ website_router = APIRouter()
 
 # Website parsing endpoint
 @website_router.post("/parse")
-async def parse_website(url: str):
+async def parse_website(url: str, bypass_cache: bool = False, cache_ttl: float = None, screenshot: bool = False, strip_boilerplate: bool = False):
     try:
-        parse_web_result: responseDocument = await parse_url(url, model_state)
+        parse_web_result: responseDocument = await parse_url(url, model_state, bypass_cache, cache_ttl, screenshot, strip_boilerplate)
 
         return JSONResponse(content=parse_web_result.model_dump())
 
@@ -22,8 +23,21 @@ async def parse_website(url: str):
 
 
 @website_router.post("/crawl")
-async def crawl_website(url: str):
-    return {"Coming soon"}
+async def crawl_website(url: str, max_depth: int = 2, max_pages: int = 50, skip_duplicates: bool = False, strip_boilerplate: bool = False):
+    try:
+        check_crawl_url(url)
+        return StreamingResponse(
+            crawl_site(url, model_state, max_depth, max_pages, skip_duplicates, strip_boilerplate),
+            media_type="application/x-ndjson",
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@website_router.get("/cache")
+async def page_cache_endpoint():
+    return JSONResponse(content=get_page_cache().stats())
 
 
 @website_router.post("/search")
@@ -0,0 +1,339 @@
+"""
+Title: OmniParse
+Author: Adithya S K
+Date: 2024-07-02
+
+Concurrent multi-page site crawler.
+
+SiteCrawler walks a site breadth first from a start URL on top of WebCrawler.arun.
+Links come from the lists the HTML cleaner already extracts, so no page is parsed
+twice. URLs are normalized before they are deduplicated, the crawl stays on the start
+URL's site, robots.txt is honoured and every host gets a bounded number of
+concurrent fetches spaced by a politeness delay. Documents are yielded as soon as
+their page is done, in completion order.
+"""
+
+import re
+import time
+import asyncio
+import itertools
+import posixpath
+from urllib import robotparser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import httpx
+
+from omniparse.web.config import MIN_WORD_THRESHOLD
+from omniparse.web.crawler_strategy import HTTP_FETCH_SETTINGS
+
+SITE_CRAWL_SETTINGS = {
+    # Link hops from the start URL
+    "max_depth": 2,
+    "max_pages": 100,
+    # Page loads in flight per host
+    "per_host_concurrency": 4,
+    # Minimum seconds between two page loads starting on one host, raised to the
+    # host's robots.txt Crawl-delay
+    "delay_seconds": 0.5,
+    "respect_robots": True,
+    # Near-duplicates of pages already emitted come without their content
+    "skip_duplicates": False,
+    # Blocks learned as the site's boilerplate are left out of later pages
+    "strip_boilerplate": False,
+    "robots_timeout": 10,
+}
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMETERS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid)$", re.I)
+
+# Links to these are files, not pages
+SKIPPED_EXTENSIONS = {
+    ".7z", ".avi", ".bmp", ".css", ".csv", ".doc", ".docx", ".exe", ".gif", ".gz",
+    ".ico", ".jpeg", ".jpg", ".js", ".json", ".mov", ".mp3", ".mp4", ".pdf", ".png",
+    ".ppt", ".pptx", ".rar", ".svg", ".tar", ".tgz", ".wav", ".webm", ".webp",
+    ".woff", ".woff2", ".xls", ".xlsx", ".xml", ".zip",
+}  # fmt: skip
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str, base: str = None):
+    """
+    Canonical form of `url`, resolved against `base`, or None if it is not an HTTP(S)
+    URL. The fragment and tracking parameters are dropped, scheme and host are
+    lowercased, default ports removed and the remaining query sorted.
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    netloc = parts.hostname.lower()
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = parts.path or "/"
+    if "/." in path:
+        # Resolve "." and ".." segments, keeping a trailing slash
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        if trailing and path != "/":
+            path += "/"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not TRACKING_PARAMETERS.match(key)
+        )
+    )
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def site_of(url: str) -> str:
+    """Host of `url` without a leading "www.", the scope of a crawl."""
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def is_page_url(url: str) -> bool:
+    extension = posixpath.splitext(urlsplit(url).path)[1].lower()
+    return extension not in SKIPPED_EXTENSIONS
+
+
+class RobotsCache:
+    """robots.txt rules per origin, fetched once per crawl."""
+
+    def __init__(self, user_agent: str, timeout: float):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._parsers = {}
+        self._locks = {}
+
+    async def _parser(self, client: httpx.AsyncClient, origin: str):
+        if origin in self._parsers:
+            return self._parsers[origin]
+        # The first page of an origin fetches the file, the others wait for it
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            if origin not in self._parsers:
+                parser = robotparser.RobotFileParser(f"{origin}/robots.txt")
+                try:
+                    response = await client.get(
+                        f"{origin}/robots.txt", timeout=self.timeout
+                    )
+                    status = response.status_code
+                    lines = response.text.splitlines()
+                except httpx.HTTPError:
+                    status, lines = None, []
+                # Same rules as RobotFileParser.read: no file allows everything,
+                # an authorization error disallows everything
+                if status in (401, 403):
+                    parser.disallow_all = True
+                elif status is not None and status < 400:
+                    parser.parse(lines)
+                else:
+                    parser.allow_all = True
+                self._parsers[origin] = parser
+        return self._parsers[origin]
+
+    async def allowed(self, client: httpx.AsyncClient, url: str) -> bool:
+        parts = urlsplit(url)
+        parser = await self._parser(client, f"{parts.scheme}://{parts.netloc}")
+        return parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str):
+        parts = urlsplit(url)
+        parser = self._parsers.get(f"{parts.scheme}://{parts.netloc}")
+        return parser.crawl_delay(self.user_agent) if parser else None
+
+
+class HostThrottle:
+    """Caps concurrent page loads on one host and spaces out their starts."""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.delay = delay
+        self._slots = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._slots.acquire()
+        # Reserve a start time under the lock, sleep outside it
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+
+class SiteCrawler:
+    """
+    Breadth-first crawl of one site with a WebCrawler. Pages closer to the start URL
+    are always fetched first; `crawl` is an async generator of per-page results.
+    """
+
+    def __init__(self, crawler, **settings):
+        self.crawler = crawler
+        self.settings = {**SITE_CRAWL_SETTINGS, **settings}
+        self.user_agent = HTTP_FETCH_SETTINGS["user_agent"]
+        self.stats = {"pages": 0, "errors": 0, "skipped_robots": 0, "duplicates": 0}
+
+    def _check_duplicate(self, index, result: dict):
+        """Fingerprint an emitted page into the job's index, blank it if skipped."""
+        document = result["document"]
+        near_duplicate = index.check(result["url"], document.text)
+        document.metadata["near_duplicate"] = near_duplicate
+        if not near_duplicate["duplicate_of"]:
+            return
+        self.stats["duplicates"] += 1
+        if self.settings["skip_duplicates"]:
+            # Only what is needed to report the page is kept, its links were followed
+            document.text = ""
+            document.chunks = []
+            for name in ("html", "cleaned_html", "markdown", "media"):
+                document.metadata.pop(name, None)
+            document.metadata["skipped"] = "near_duplicate"
+
+    async def crawl(
+        self,
+        start_url: str,
+        max_depth: int = None,
+        max_pages: int = None,
+        word_count_threshold=MIN_WORD_THRESHOLD,
+        css_selector: str = None,
+        user_agent: str = None,
+        verbose: bool = False,
+    ):
+        """
+        Yield {"url", "depth", "document"} for every crawled page, or {"url", "depth",
+        "error"} for a page that failed, in the order they complete. Documents get
+        `metadata["near_duplicate"]` against the pages emitted before them.
+        """
+        # Imported here, near_duplicates uses site_of from this module
+        from omniparse.web.near_duplicates import NearDuplicateIndex
+
+        settings = self.settings
+        max_depth = settings["max_depth"] if max_depth is None else max_depth
+        max_pages = settings["max_pages"] if max_pages is None else max_pages
+        start_url = normalize_url(start_url)
+        if start_url is None:
+            raise ValueError("The start URL must be an absolute http(s) URL")
+        site = site_of(start_url)
+        self.stats = {"pages": 0, "errors": 0, "skipped_robots": 0, "duplicates": 0}
+        user_agent = user_agent or self.user_agent
+        robots = RobotsCache(user_agent, settings["robots_timeout"])
+        throttles = {}
+        near_duplicates = NearDuplicateIndex()
+
+        # (depth, order) keeps the crawl breadth first and FIFO within a depth
+        queue = asyncio.PriorityQueue()
+        order = itertools.count()
+        seen = {start_url}
+        results = asyncio.Queue()
+        # Pages queued or in flight, the crawl ends when it drops to zero
+        pending = 0
+        scheduled = 0
+
+        def enqueue(url, depth):
+            nonlocal pending, scheduled
+            if scheduled >= max_pages:
+                return
+            scheduled += 1
+            pending += 1
+            queue.put_nowait((depth, next(order), url))
+
+        def throttle(url):
+            host = urlsplit(url).netloc
+            if host not in throttles:
+                delay = settings["delay_seconds"]
+                if settings["respect_robots"]:
+                    delay = max(delay, robots.crawl_delay(url) or 0)
+                throttles[host] = HostThrottle(settings["per_host_concurrency"], delay)
+            return throttles[host]
+
+        async def admit(client, url):
+            # Disallowed URLs are dropped before they take a place in the budget
+            if settings["respect_robots"] and not await robots.allowed(client, url):
+                self.stats["skipped_robots"] += 1
+                return False
+            return True
+
+        async def visit(client, depth, url):
+            async with throttle(url):
+                document = await self.crawler.arun(
+                    url,
+                    word_count_threshold,
+                    bypass_cache=False,
+                    css_selector=css_selector,
+                    user_agent=user_agent,
+                    verbose=verbose,
+                    strip_boilerplate=settings["strip_boilerplate"],
+                )
+            if depth < max_depth:
+                links = document.metadata.get("links", {})
+                for link in links.get("internal", []) + links.get("external", []):
+                    link = normalize_url(link["href"], url)
+                    if (
+                        link
+                        and link not in seen
+                        and site_of(link) == site
+                        and is_page_url(link)
+                    ):
+                        seen.add(link)
+                        if await admit(client, link):
+                            enqueue(link, depth + 1)
+            return {"url": url, "depth": depth, "document": document}
+
+        async def worker(client):
+            nonlocal pending
+            while True:
+                depth, _, url = await queue.get()
+                try:
+                    result = await visit(client, depth, url)
+                    self.stats["pages"] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    result = {"url": url, "depth": depth, "error": str(e)}
+                pending -= 1
+                results.put_nowait(result)
+                if pending == 0:
+                    results.put_nowait(None)
+
+        # A site is served from one or two hosts (with and without "www."), the
+        # throttles decide which pages run
+        concurrency = 2 * settings["per_host_concurrency"]
+        async with httpx.AsyncClient(
+            follow_redirects=True, headers={"User-Agent": user_agent}
+        ) as client:
+            if not await admit(client, start_url):
+                return
+            enqueue(start_url, 0)
+            workers = [asyncio.create_task(worker(client)) for _ in range(concurrency)]
+            try:
+                while True:
+                    result = await results.get()
+                    if result is None:
+                        break
+                    if "document" in result:
+                        self._check_duplicate(near_duplicates, result)
+                    yield result
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
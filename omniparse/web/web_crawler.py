@@ -13,35 +13,68 @@ URL: https://github.com/unclecode/crawl4ai/blob/main/LICENSE
 """
 
 import os
+import json
 import time
+import asyncio
+import hashlib
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 from omniparse.web.models import UrlModel
-from omniparse.web.utils import (
-    get_content_of_website,
-    extract_metadata,
-    InvalidCSSSelectorError,
+from omniparse.web.utils import InvalidCSSSelectorError
+from omniparse.web.html_cleaner import clean_html
+from omniparse.web.http_cache import PageCache, get_page_cache
+from omniparse.web.boilerplate import BoilerplateStore, get_boilerplate_store
+from omniparse.web.crawler_strategy import CrawlerStrategy, HttpCrawlerStrategy
+from omniparse.web.async_strategy import (
+    AsyncCrawlerStrategy,
+    AsyncHttpCrawlerStrategy,
+    SyncStrategyAdapter,
 )
-from omniparse.web.crawler_strategy import CrawlerStrategy, LocalSeleniumCrawlerStrategy
 from typing import List
 from concurrent.futures import ThreadPoolExecutor
 from omniparse.web.config import DEFAULT_PROVIDER, MIN_WORD_THRESHOLD
-from omniparse.models import responseDocument
+from omniparse.models import responseDocument, responseImage
 
 
 class WebCrawler:
     def __init__(
         self,
         crawler_strategy: CrawlerStrategy = None,
-        always_by_pass_cache: bool = True,
+        always_by_pass_cache: bool = False,
         verbose: bool = False,
+        async_strategy: AsyncCrawlerStrategy = None,
+        cache: PageCache = None,
+        boilerplate: BoilerplateStore = None,
     ):
-        self.crawler_strategy = crawler_strategy or LocalSeleniumCrawlerStrategy(
-            verbose=verbose
-        )
+        if crawler_strategy is None:
+            # Static pages are fetched over HTTP, the browser renders the rest. Both
+            # strategies share one browser pool.
+            crawler_strategy = HttpCrawlerStrategy(verbose=verbose)
+            async_strategy = async_strategy or AsyncHttpCrawlerStrategy(
+                browser_factory=lambda: SyncStrategyAdapter(crawler_strategy.browser),
+                verbose=verbose,
+            )
+        self.crawler_strategy = crawler_strategy
+        self.async_strategy = async_strategy or SyncStrategyAdapter(crawler_strategy)
         self.always_by_pass_cache = always_by_pass_cache
+        self.cache = cache or (None if always_by_pass_cache else get_page_cache())
+        self._boilerplate = boilerplate
         self.ready = False
 
+    @property
+    def boilerplate(self) -> BoilerplateStore:
+        # Created on the first strip_boilerplate crawl, with its folder
+        if self._boilerplate is None:
+            self._boilerplate = get_boilerplate_store()
+        return self._boilerplate
+
+    async def close(self):
+        """Close the HTTP clients and quit the browsers of both strategies."""
+        await self.async_strategy.close()
+        quit = getattr(self.crawler_strategy, "quit", None)
+        if quit is not None:
+            await asyncio.to_thread(quit)
+
     def warmup(self):
         print("[LOG]   Warming up the WebCrawler")
         result = self.run(
@@ -91,7 +124,9 @@ class WebCrawler:
         def fetch_page_wrapper(url_model, *args, **kwargs):
             return self.fetch_page(url_model, *args, **kwargs)
 
-        with ThreadPoolExecutor() as executor:
+        with ThreadPoolExecutor(
+            max_workers=self.crawler_strategy.max_concurrency
+        ) as executor:
             results = list(
                 executor.map(
                     fetch_page_wrapper,
@@ -118,36 +153,157 @@ class WebCrawler:
         screenshot: bool = False,
         user_agent: str = None,
         verbose=True,
+        cache_ttl: float = None,
+        strip_boilerplate: bool = False,
         **kwargs,
     ) -> responseDocument:
-        extracted_content = None
-        cached = None
         if word_count_threshold < MIN_WORD_THRESHOLD:
             word_count_threshold = MIN_WORD_THRESHOLD
 
-        else:
-            if user_agent:
-                self.crawler_strategy.update_user_agent(user_agent)
-            html = self.crawler_strategy.crawl(url)
-            if screenshot:
-                screenshot = self.crawler_strategy.take_screenshot()
+        use_cache = self._use_cache(bypass_cache, screenshot)
+        page, headers = None, None
+        if use_cache:
+            page, headers = self.cache.lookup(url, cache_ttl)
+        if page is None:
+            # The page and its screenshot come from the same page load
+            page = self.crawler_strategy.crawl_page(
+                url, screenshot=screenshot, user_agent=user_agent, headers=headers
+            )
+            if use_cache:
+                page = self.cache.resolve(
+                    url, page
+                ) or self.crawler_strategy.crawl_page(url, user_agent=user_agent)
+        return self._build_document(
+            url,
+            page,
+            word_count_threshold,
+            css_selector,
+            verbose,
+            use_cache,
+            strip_boilerplate,
+            **kwargs,
+        )
 
+    async def arun(
+        self,
+        url: str,
+        word_count_threshold=MIN_WORD_THRESHOLD,
+        bypass_cache: bool = False,
+        css_selector: str = None,
+        screenshot: bool = False,
+        user_agent: str = None,
+        verbose=True,
+        cache_ttl: float = None,
+        strip_boilerplate: bool = False,
+        **kwargs,
+    ) -> responseDocument:
+        """`run` for the event loop: the page is awaited, cleaning runs in a worker thread."""
+        if word_count_threshold < MIN_WORD_THRESHOLD:
+            word_count_threshold = MIN_WORD_THRESHOLD
+
+        use_cache = self._use_cache(bypass_cache, screenshot)
+        page, headers = None, None
+        if use_cache:
+            page, headers = await asyncio.to_thread(self.cache.lookup, url, cache_ttl)
+        if page is None:
+            page = await self.async_strategy.crawl_page(
+                url, screenshot=screenshot, user_agent=user_agent, headers=headers
+            )
+            if use_cache:
+                page = await asyncio.to_thread(self.cache.resolve, url, page)
+                if page is None:
+                    page = await self.async_strategy.crawl_page(
+                        url, user_agent=user_agent
+                    )
+        return await asyncio.to_thread(
+            self._build_document,
+            url,
+            page,
+            word_count_threshold,
+            css_selector,
+            verbose,
+            use_cache,
+            strip_boilerplate,
+            **kwargs,
+        )
+
+    def _use_cache(self, bypass_cache: bool, screenshot: bool) -> bool:
+        if self.cache is None:
+            return False
+        # Screenshots are not stored, pages with one are always loaded
+        if bypass_cache or self.always_by_pass_cache or screenshot:
+            self.cache.record_bypass()
+            return False
+        return True
+
+    def _build_document(
+        self,
+        url: str,
+        page: dict,
+        word_count_threshold: int,
+        css_selector: str,
+        verbose: bool,
+        use_cache: bool = False,
+        strip_boilerplate: bool = False,
+        **kwargs,
+    ) -> responseDocument:
+        options = [word_count_threshold, css_selector]
+        template = None
+        if strip_boilerplate:
+            # A new revision of the site's template cleans the page again
+            template = self.boilerplate.template(url)
+            options.append(template.revision)
+        # Unchanged content cleaned with the same options is served from the cache
+        options_key = hashlib.sha1(json.dumps(options).encode()).hexdigest()[:16]
+        if use_cache:
+            document = self.cache.load_document(url, page, options_key)
+            if document is not None:
+                # A template that lost the page (reset, or its URL evicted) learns it again
+                block_hashes = document.pop("block_hashes", None)
+                if template is not None and block_hashes:
+                    template.learn(url, block_hashes)
+                document["metadata"].update(html=page["html"], fetch=page.get("fetch"))
+                return responseDocument(**document)
+
+        extracted_content = None
+        cached = None
         processed_html = self.process_html(
             url,
-            html,
+            page["html"],
             extracted_content,
             word_count_threshold,
             css_selector,
-            screenshot,
+            page["screenshot"],
             verbose,
             bool(cached),
+            template=template,
             **kwargs,
         )
+        processed_html["fetch"] = page.get("fetch")
+        block_hashes = processed_html.pop("block_hashes", None)
 
         crawl_result = responseDocument(
             text=processed_html["markdown"], metadata=processed_html
         )
-        crawl_result.add_image("screenshot", image_data=processed_html["screenshot"])
+        if processed_html["screenshot"]:
+            # Already encoded by the browser, add_image would decode and re-encode it
+            crawl_result.images.append(
+                responseImage(
+                    image=processed_html["screenshot"],
+                    image_name="screenshot",
+                    image_info=page.get("screenshot_info", {}),
+                )
+            )
+        if use_cache:
+            document = crawl_result.model_dump()
+            # The raw HTML is stored once, next to the documents
+            document["metadata"] = {
+                name: value
+                for name, value in document["metadata"].items()
+                if name not in ("html", "fetch")
+            }
+            document["block_hashes"] = block_hashes
+            self.cache.save_document(url, page, options_key, document)
         return crawl_result
 
     def process_html(
@@ -160,15 +316,19 @@ class WebCrawler:
         screenshot: bool,
         verbose: bool,
         is_cached: bool,
+        template=None,
         **kwargs,
     ):
         t = time.time()
         # Extract content from HTML
         try:
-            result = get_content_of_website(
-                url, html, word_count_threshold, css_selector=css_selector
+            result = clean_html(
+                url,
+                html,
+                word_count_threshold,
+                css_selector=css_selector,
+                template=template,
             )
-            metadata = extract_metadata(html)
             if result is None:
                 raise ValueError(f"Failed to extract content from the website: {url}")
         except InvalidCSSSelectorError as e:
@@ -178,6 +338,7 @@ class WebCrawler:
         markdown = result.get("markdown", "")
         media = result.get("media", [])
         links = result.get("links", [])
+        metadata = result.get("metadata", {})
 
         if verbose:
             print(
@@ -194,6 +355,8 @@ class WebCrawler:
             "media": media,
             "links": links,
             "metadata": metadata,
+            "boilerplate": result.get("boilerplate"),
+            "block_hashes": result.get("block_hashes"),
             "screenshot": screenshot,
             "extracted_content": extracted_content,
             "success": True,
@@ -3,7 +3,7 @@ import argparse
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from omniparse import load_omnimodel
+from omniparse import load_omnimodel, get_shared_state
 from omniparse.documents.router import document_router
 from omniparse.media.router import media_router
 from omniparse.image.router import image_router
@@ -38,6 +38,14 @@ app.include_router(website_router, prefix="/parse_website", tags=["Website"])
 app = gr.mount_gradio_app(app, demo_ui, path="")
 
 
+@app.on_event("shutdown")
+async def close_crawler():
+    # Chrome processes of the browser pool would outlive the server otherwise
+    crawler = get_shared_state().crawler
+    if crawler is not None:
+        await crawler.close()
+
+
 def main():
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Run the omniparse server.")
@@ -46,11 +54,17 @@ def main():
     parser.add_argument("--documents", action="store_true", help="Load document models")
     parser.add_argument("--media", action="store_true", help="Load media models")
     parser.add_argument("--web", action="store_true", help="Load web models")
+    parser.add_argument(
+        "--vision-backend",
+        choices=["torch", "onnx"],
+        default="torch",
+        help="Runtime for the Florence-2 vision model (onnx runs on CPU)",
+    )
     parser.add_argument("--reload", action="store_true", help="Reload Server")
     args = parser.parse_args()
 
     # Set global variables based on parsed arguments
-    load_omnimodel(args.documents, args.media, args.web)
+    load_omnimodel(args.documents, args.media, args.web, args.vision_backend)
 
     # Conditionally include routers based on arguments
     app.include_router(
@@ -0,0 +1,21 @@
+"""
+Registers the omniparse packages by path, like the benchmarks do: the package
+`__init__` modules load every model at import time, which the unit tests do not need.
+"""
+
+import os
+import sys
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "omniparse")
+
+for name, path in (
+    ("omniparse", ROOT),
+    ("omniparse.web", f"{ROOT}/web"),
+    ("omniparse.media", f"{ROOT}/media"),
+    ("omniparse.image", f"{ROOT}/image"),
+):
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [path]
+        sys.modules[name] = package
@@ -0,0 +1,66 @@
+import io
+
+import pytest
+from PIL import Image
+
+from omniparse.image.decode import (
+    IMAGE_DECODE_SETTINGS,
+    ImageTooLargeError,
+    decode_image,
+    max_side_for_task,
+)
+
+
+def jpeg_bytes(size, exif_orientation=None):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    if exif_orientation:
+        exif[0x0112] = exif_orientation
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_max_side_for_task():
+    max_sides = IMAGE_DECODE_SETTINGS["max_side"]
+    assert max_side_for_task("ocr") == max_sides["ocr"]
+    assert max_side_for_task("OCR with Region") == max_sides["vision_ocr"]
+    assert max_side_for_task("Caption") == max_sides["vision"]
+
+
+@pytest.mark.parametrize(
+    "size, max_side, expected",
+    [
+        ((6000, 4000), 4096, (4096, 2731)),
+        ((9000, 6000), 4096, (4096, 2731)),
+        ((6000, 4000), 1024, (1024, 683)),
+        ((3000, 2000), 4096, (3000, 2000)),
+    ],
+)
+def test_jpeg_keeps_the_configured_resolution(size, max_side, expected):
+    assert decode_image(jpeg_bytes(size), max_side).size == expected
+
+
+def test_png_is_downscaled():
+    buffer = io.BytesIO()
+    Image.new("RGB", (2000, 1000)).save(buffer, "PNG")
+    image = decode_image(buffer.getvalue(), 1000)
+    assert image.size == (1000, 500)
+    assert image.format == "PNG"
+
+
+def test_exif_orientation_is_applied():
+    # Orientation 6 is a 90 degree rotation, width and height swap
+    image = decode_image(jpeg_bytes((400, 200), exif_orientation=6))
+    assert image.size == (200, 400)
+    assert image.format == "JPEG"
+
+
+def test_too_many_pixels_is_rejected_before_decoding():
+    with pytest.raises(ImageTooLargeError):
+        decode_image(jpeg_bytes((400, 400)), max_pixels=100_000)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        decode_image(12)
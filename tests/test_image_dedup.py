@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from omniparse.image.dedup import (
+    cluster_images,
+    hamming_distance,
+    hash_to_hex,
+    image_hash,
+)
+
+
+def gradient(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).resize((width, height), Image.BILINEAR)
+
+
+def test_hash_survives_rescaling():
+    image = gradient(400, 300)
+    scaled = image.resize((200, 150))
+    assert hamming_distance(image_hash(image), image_hash(scaled)) <= 4
+
+
+def test_unrelated_images_hash_apart():
+    assert (
+        hamming_distance(
+            image_hash(gradient(400, 300, 0)), image_hash(gradient(400, 300, 1))
+        )
+        > 4
+    )
+
+
+@pytest.mark.parametrize("method", ["ahash", "dhash"])
+def test_hash_has_hash_size_squared_bits(method):
+    value = image_hash(gradient(64, 64), method=method, hash_size=16)
+    assert len(hash_to_hex(value, 16)) == 64
+
+
+def test_unknown_hash_method():
+    with pytest.raises(ValueError):
+        image_hash(gradient(8, 8), method="phash")
+
+
+def test_duplicates_map_to_the_first_seen_image():
+    logo = gradient(200, 100)
+    images = {
+        "page1_logo": logo,
+        "page1_chart": gradient(200, 100, seed=1),
+        "page2_logo": logo.resize((100, 50)),
+    }
+    canonical_of, hashes = cluster_images(images)
+    assert canonical_of == {
+        "page1_logo": "page1_logo",
+        "page1_chart": "page1_chart",
+        "page2_logo": "page1_logo",
+    }
+    assert set(hashes) == set(images)
+
+
+def test_flat_images_of_different_shapes_stay_apart():
+    # Blank images hash alike whatever their shape, the aspect ratio tells them apart
+    images = {
+        "wide": Image.new("RGB", (400, 50)),
+        "square": Image.new("RGB", (100, 100)),
+    }
+    canonical_of, _ = cluster_images(images)
+    assert canonical_of["square"] == "square"
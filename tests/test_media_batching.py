@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from omniparse.media.batching import stitch_windows, timestamp_segments
+
+TIMESTAMP_BEGIN = 1000
+
+
+class Tokenizer:
+    timestamp_begin = TIMESTAMP_BEGIN
+
+    def decode(self, tokens):
+        return "".join(f" w{token}" for token in tokens)
+
+
+def ts(seconds):
+    return TIMESTAMP_BEGIN + round(seconds / 0.02)
+
+
+def result(tokens):
+    return SimpleNamespace(
+        tokens=tokens,
+        temperature=0.0,
+        avg_logprob=-0.2,
+        compression_ratio=1.1,
+        no_speech_prob=0.01,
+    )
+
+
+def spans(segments):
+    return [(s["id"], s["start"], s["end"], s["text"]) for s in segments]
+
+
+def test_segments_between_timestamp_pairs():
+    tokens = [ts(0), 1, 2, ts(1.5), ts(1.5), 3, ts(4)]
+    segments = timestamp_segments(result(tokens), Tokenizer(), clip_seconds=10.0)
+    assert spans(segments) == [(0, 0.0, 1.5, " w1 w2"), (1, 1.5, 4.0, " w3")]
+    assert segments[0]["tokens"] == [1, 2]
+    assert segments[0]["avg_logprob"] == -0.2
+
+
+def test_text_after_the_last_timestamp_ends_with_the_clip():
+    tokens = [ts(0), 1, ts(2), ts(2), 2, 3]
+    segments = timestamp_segments(result(tokens), Tokenizer(), clip_seconds=7.5)
+    assert spans(segments) == [(0, 0.0, 2.0, " w1"), (1, 2.0, 7.5, " w2 w3")]
+
+
+def test_timestamps_are_clamped_to_the_clip():
+    tokens = [ts(0), 1, ts(29.0)]
+    segments = timestamp_segments(result(tokens), Tokenizer(), clip_seconds=12.0)
+    assert spans(segments) == [(0, 0.0, 12.0, " w1")]
+
+
+def test_tokens_without_timestamps_span_the_clip():
+    segments = timestamp_segments(result([1, 2]), Tokenizer(), clip_seconds=3.0)
+    assert spans(segments) == [(0, 0.0, 3.0, " w1 w2")]
+
+
+def test_no_tokens():
+    assert timestamp_segments(result([]), Tokenizer(), clip_seconds=3.0) == []
+
+
+def test_windows_are_stitched_onto_the_clip_timeline():
+    first = {"text": " a", "segments": [{"start": 0.0, "end": 1.0}], "language": "en"}
+    second = {"text": " b", "segments": [{"start": 0.5, "end": 2.0}], "language": "en"}
+    transcript = stitch_windows([(0, 16000), (32000, 64000)], [first, second])
+    assert transcript["text"] == "a b"
+    assert [(s["id"], s["start"], s["end"]) for s in transcript["segments"]] == [
+        (0, 0.0, 1.0),
+        (1, 2.5, 4.0),
+    ]
+    assert stitch_windows([], [])["segments"] == []
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from omniparse.media.fingerprint import FingerprintCache
+from omniparse.media.utils import SAMPLE_RATE
+
+TRANSCRIPT = {"text": "hello", "segments": [], "language": "en"}
+
+
+def speech(seconds, seed):
+    """Voiced bursts of random length and pitch, like syllables and pauses."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = np.zeros_like(t)
+    position = 0
+    while position < len(t):
+        length = int(rng.uniform(0.1, 0.6) * SAMPLE_RATE)
+        envelope[position : position + length] = rng.uniform(0.2, 1)
+        position += length + int(rng.uniform(0.05, 0.4) * SAMPLE_RATE)
+    f0 = rng.uniform(100, 250)
+    signal = sum(
+        np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, 6)) / k for k in range(1, 15)
+    )
+    signal = signal * (1 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+    signal += 0.3 * rng.standard_normal(len(t))
+    envelope = np.convolve(envelope, np.ones(400) / 400, "same")
+    return (signal * envelope * 0.1).astype(np.float32)
+
+
+def reencode(audio, seed):
+    """Encoder delay, a gain change, low-pass filtering and noise."""
+    rng = np.random.default_rng(seed)
+    delay = np.zeros(int(rng.integers(0, 1200)), dtype=np.float32)
+    audio = np.concatenate([delay, audio]) * 0.7
+    audio = np.convolve(audio, np.ones(3) / 3, "same")
+    return (audio + 0.002 * rng.standard_normal(len(audio))).astype(np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FingerprintCache(str(tmp_path))
+
+
+def test_reencoded_copy_hits(cache):
+    audio = speech(40, seed=0)
+    cache.put(audio, "base", {}, TRANSCRIPT, 2.0)
+    assert cache.get(reencode(audio, seed=1), "base", {}) == TRANSCRIPT
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["seconds_avoided"] == 2.0
+
+
+def test_unrelated_audio_misses(cache):
+    cache.put(speech(40, seed=0), "base", {}, TRANSCRIPT, 2.0)
+    assert cache.get(speech(40, seed=2), "base", {}) is None
+
+
+def test_same_edges_with_a_different_middle_miss(cache):
+    audio = speech(40, seed=0)
+    edited = speech(40, seed=3)
+    edges = 14 * SAMPLE_RATE
+    edited[:edges], edited[-edges:] = audio[:edges], audio[-edges:]
+    cache.put(audio, "base", {}, TRANSCRIPT, 2.0)
+    assert cache.get(edited, "base", {}) is None
+
+
+def test_model_and_settings_are_part_of_the_key(cache):
+    audio = speech(40, seed=0)
+    cache.put(audio, "base", {"batched": False}, TRANSCRIPT, 2.0)
+    assert cache.get(audio, "small", {"batched": False}) is None
+    assert cache.get(audio, "base", {"batched": True}) is None
+
+
+def test_short_clips_are_not_cached(cache):
+    audio = speech(10, seed=0)
+    cache.put(audio, "base", {}, TRANSCRIPT, 2.0)
+    assert cache.stats()["entries"] == 0
+    assert cache.get(audio, "base", {}) is None
+
+
+def test_entries_survive_a_restart(tmp_path):
+    audio = speech(40, seed=0)
+    FingerprintCache(str(tmp_path)).put(audio, "base", {}, TRANSCRIPT, 2.0)
+    assert FingerprintCache(str(tmp_path)).get(audio, "base", {}) == TRANSCRIPT
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = FingerprintCache(str(tmp_path), max_entries=1)
+    first, second = speech(40, seed=0), speech(40, seed=1)
+    cache.put(first, "base", {}, TRANSCRIPT, 2.0)
+    cache.put(second, "base", {}, TRANSCRIPT, 2.0)
+    assert cache.get(first, "base", {}) is None
+    assert cache.get(second, "base", {}) == TRANSCRIPT
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from omniparse.media.utils import (
+    SAMPLE_RATE,
+    detect_speech_segments,
+    quietest_cut,
+    split_on_silence,
+    trim_silence,
+    voiced_frames,
+)
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def speech(*parts):
+    """Alternating tone and silence lengths in seconds, starting with silence."""
+    return np.concatenate(
+        [tone(s) if i % 2 else silence(s) for i, s in enumerate(parts)]
+    )
+
+
+def seconds(regions):
+    return [(start / SAMPLE_RATE, end / SAMPLE_RATE) for start, end in regions]
+
+
+def frames(expected):
+    # Boundaries fall on 30 ms frames, within one frame of the edge
+    return [pytest.approx(region, abs=0.035) for region in expected]
+
+
+def test_speech_regions_are_padded():
+    regions = detect_speech_segments(speech(2, 3, 2, 3, 2))
+    assert seconds(regions) == frames([(1.8, 5.2), (6.8, 10.2)])
+
+
+def test_short_pauses_are_bridged_and_short_bursts_dropped():
+    audio = speech(1, 2, 0.3, 2, 2, 0.1, 1)
+    regions = detect_speech_segments(audio, padding_ms=0)
+    assert seconds(regions) == frames([(1.0, 5.3)])
+
+
+def test_no_speech():
+    assert detect_speech_segments(silence(5)) == []
+    assert split_on_silence(silence(5)) == []
+
+
+def test_regions_are_grouped_into_chunks():
+    audio = speech(1, 10, 1, 10, 1, 10, 1)
+    chunks = split_on_silence(audio, max_chunk_seconds=25.0)
+    assert len(chunks) == 2
+    assert chunks[0][0] == detect_speech_segments(audio)[0][0]
+    assert all(end - start <= 25 * SAMPLE_RATE for start, end in chunks)
+
+
+def test_long_regions_are_cut_at_the_quietest_frame():
+    audio = speech(0, 20)
+    # A dip within the search window of the 12 s limit
+    audio[int(10.5 * SAMPLE_RATE) : int(10.53 * SAMPLE_RATE)] *= 0.01
+    chunks = split_on_silence(audio, max_chunk_seconds=12.0, padding_ms=0)
+    assert seconds(chunks) == frames([(0.0, 10.53), (10.53, 20.0)])
+
+
+def test_quietest_cut_without_frames():
+    assert quietest_cut(tone(1), 0, 100) == 100
+
+
+def test_trim_keeps_padded_speech():
+    start, end = trim_silence(speech(2, 1, 1, 1, 3))
+    assert seconds([(start, end)]) == frames([(1.7, 5.3)])
+
+
+def test_silent_and_too_short_files_have_no_speech():
+    assert trim_silence(silence(3)) == (0, 0)
+    assert trim_silence(speech(1, 0.03, 1)) == (0, 0)
+
+
+def test_quiet_recordings_are_not_silence():
+    # Speech at about -55 dBFS, under the absolute threshold
+    audio = speech(2, 1, 1, 1, 3) * 0.006
+    start, end = trim_silence(audio)
+    assert seconds([(start, end)]) == frames([(1.7, 5.3)])
+    assert seconds(detect_speech_segments(audio[start:end], padding_ms=0)) == frames(
+        [(0.3, 1.3), (2.3, 3.3)]
+    )
+
+
+def test_threshold_is_relative_to_the_loudest_frame():
+    energy = np.array([-20.0, -50.0, -60.0])
+    assert voiced_frames(energy).tolist() == [True, False, False]
+    energy = np.array([-50.0, -80.0, -100.0])
+    assert voiced_frames(energy).tolist() == [True, False, False]
+    # Digital silence stays silence
+    assert not voiced_frames(np.array([-200.0, -200.0])).any()
+    assert voiced_frames(np.zeros(0)).tolist() == []
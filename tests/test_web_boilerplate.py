@@ -0,0 +1,114 @@
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+
+from omniparse.web import web_crawler  # noqa: E402
+from omniparse.web.boilerplate import BoilerplateStore, SiteTemplate  # noqa: E402
+from omniparse.web.html_cleaner import clean_html  # noqa: E402
+from omniparse.web.http_cache import PageCache  # noqa: E402
+
+NAV = "<nav><p>Home About Contact Pricing Blog Careers Support Login</p></nav>"
+
+
+def page(i):
+    return (
+        f"<html><body>{NAV}<article><p>Article number {i} has its own words and "
+        "more words after them</p></article></body></html>"
+    )
+
+
+@pytest.fixture
+def template(tmp_path):
+    return SiteTemplate("example.com", str(tmp_path / "example.com.json"), min_pages=3)
+
+
+def test_blocks_on_most_pages_become_boilerplate(template):
+    template.learn("https://example.com/1", ["nav", "a1"])
+    template.learn("https://example.com/2", ["nav", "a2"])
+    assert template.revision == 0
+    template.learn("https://example.com/3", ["nav", "a3"])
+    assert template.revision == 1
+    assert template.strip({"nav element": "nav", "article": "a4"}) == (
+        1,
+        {"nav element"},
+    )
+
+
+def test_a_url_is_learned_once(template):
+    for _ in range(3):
+        template.learn("https://example.com/1", ["nav", "nav", "a1"])
+    assert template.pages == 1
+    assert template.counts["nav"] == 1
+
+
+def test_templates_are_saved_and_reloaded(template):
+    for i in range(3):
+        template.learn(f"https://example.com/{i}", ["nav", f"a{i}"])
+    reloaded = SiteTemplate("example.com", template.path)
+    assert reloaded.revision == 1
+    assert reloaded.pages == 3
+    # Learned URLs are remembered across restarts
+    reloaded.learn("https://example.com/0", ["nav"])
+    assert reloaded.pages == 3
+
+
+def test_cleaner_strips_learned_boilerplate(tmp_path):
+    store = BoilerplateStore(str(tmp_path), min_pages=3)
+    results = [
+        clean_html(url, page(i), 1, template=store.template(url))
+        for i, url in enumerate(f"https://example.com/{i}" for i in range(4))
+    ]
+    assert "Home About" in results[0]["markdown"]
+    assert results[3]["boilerplate"] == {
+        "site": "example.com",
+        "revision": 1,
+        "blocks_removed": 1,
+    }
+    assert "Home About" not in results[3]["markdown"]
+    assert "Article number 3" in results[3]["markdown"]
+
+
+def test_boilerplate_store_is_created_on_first_use(monkeypatch, tmp_path):
+    stores = []
+
+    def get_boilerplate_store():
+        stores.append(BoilerplateStore(str(tmp_path)))
+        return stores[-1]
+
+    monkeypatch.setattr(web_crawler, "get_boilerplate_store", get_boilerplate_store)
+    crawler = web_crawler.WebCrawler(always_by_pass_cache=True)
+    assert stores == []
+    assert crawler.boilerplate is crawler.boilerplate is stores[0]
+
+
+def test_cached_documents_are_learned(tmp_path):
+    url = "https://example.com/1"
+    cache = PageCache(str(tmp_path / "pages"))
+    fetched = cache.resolve(
+        url,
+        {
+            "html": page(1),
+            "screenshot": None,
+            "fetch": {"status": 200, "headers": {"Cache-Control": "max-age=600"}},
+        },
+    )
+    build = dict(
+        word_count_threshold=1,
+        css_selector=None,
+        verbose=False,
+        use_cache=True,
+        strip_boilerplate=True,
+    )
+    first = web_crawler.WebCrawler(
+        cache=cache, boilerplate=BoilerplateStore(str(tmp_path / "first"))
+    )
+    first._build_document(url, fetched, **build)
+
+    # A template that never saw the page, served the cached document
+    store = BoilerplateStore(str(tmp_path / "second"))
+    second = web_crawler.WebCrawler(cache=cache, boilerplate=store)
+    document = second._build_document(url, fetched, **build)
+    assert cache.stats()["cleans_avoided"] == 1
+    assert "block_hashes" not in document.metadata
+    assert store.template(url).pages == 1
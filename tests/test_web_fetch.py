@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+
+from omniparse.web.crawler_strategy import (  # noqa: E402
+    browser_fallback_reason,
+    decode_html,
+    needs_javascript,
+)
+
+ARTICLE = "<p>" + "Plenty of server rendered article text. " * 20 + "</p>"
+
+
+def page(body):
+    return f"<html><head><title>t</title></head><body>{body}</body></html>"
+
+
+def test_static_page_needs_no_browser():
+    assert needs_javascript(page(ARTICLE)) is None
+
+
+@pytest.mark.parametrize("html", ["", "   ", "<html><head></head></html>"])
+def test_empty_page(html):
+    assert needs_javascript(html) == "empty_body"
+
+
+@pytest.mark.parametrize(
+    "mount",
+    [
+        '<div id="root"></div>',
+        '<div id="__next"></div>',
+        "<app-root ng-version='17'></app-root>",
+    ],
+)
+def test_single_page_app_root(mount):
+    assert (
+        needs_javascript(page(mount + "<script src='/app.js'></script>")) == "spa_root"
+    )
+
+
+def test_scripts_and_styles_are_not_text():
+    body = "<script>" + "var x = 1;" * 100 + "</script><style>p { color: red }</style>"
+    assert needs_javascript(page(body)) == "empty_body"
+
+
+def test_noscript_warning_on_a_short_page():
+    body = (
+        "<noscript>You need to enable JavaScript to run this app.</noscript>"
+        + "<p>"
+        + "Some text. " * 30
+        + "</p>"
+    )
+    assert needs_javascript(page(body)) == "noscript"
+    # Long pages with the warning are rendered on the server anyway
+    assert needs_javascript(page(body + ARTICLE * 3)) is None
+
+
+def test_thresholds_come_from_the_settings():
+    assert needs_javascript(page(ARTICLE), min_text_chars=100_000) == "empty_body"
+
+
+@pytest.mark.parametrize("status", [403, 429, 503])
+def test_refused_clients_retry_in_the_browser(status):
+    assert browser_fallback_reason(status, page(ARTICLE)) == f"status_{status}"
+
+
+def test_not_found_is_not_retried():
+    assert browser_fallback_reason(404, page(ARTICLE)) is None
+
+
+def test_charset_from_header_then_meta_then_utf8():
+    text = "Café"
+    assert decode_html(text.encode("latin-1"), "text/html; charset=ISO-8859-1") == text
+    meta = '<meta charset="windows-1252"><p>Café</p>'
+    assert decode_html(meta.encode("cp1252")) == meta
+    assert decode_html(text.encode("utf-8")) == text
+    assert decode_html(text.encode("utf-8"), "text/html; charset=bogus") == text
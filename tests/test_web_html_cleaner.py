@@ -0,0 +1,74 @@
+import pytest
+
+from omniparse.web.html_cleaner import clean_html
+from omniparse.web.utils import (
+    InvalidCSSSelectorError,
+    extract_metadata,
+    get_content_of_website,
+)
+
+URL = "https://example.com/article"
+
+PAGES = {
+    "article": """<!DOCTYPE html>
+<html><head><title>An article</title>
+<meta name="description" content="A short page">
+<meta property="og:title" content="Article"></head>
+<body><nav><a href="/">Home</a> <a href="https://example.com/about">About</a></nav>
+<main>
+  <div><div><h2>The parser reads every node once</h2></div></div>
+  <!-- comment -->
+  <script>window.track("view");</script>
+  <p>Markdown output stays identical while <b>cleaning runs</b> in linear time.
+  <a href="/post/1">read more</a> about it here.</p>
+  <img src="/img/1.png" alt="A chart of parse times"> <img src="/pixel.gif">
+  <ul><li><span>First item of the list</span></li><li>Second</li></ul>
+  <p>Tom &amp; Jerry said "<i>hello there friend</i>" &mdash; see
+  <a href="https://other.example.org/x">elsewhere</a>.</p>
+  <style>.s { color: red; }</style>
+</main><footer>footer text</footer></body></html>""",
+    "code": """<html><body><p>Some code follows in the block below here:</p>
+<pre><code>def f(x):
+    return x &lt; 1 and "quoted"</code><span> # trailing comment</span></pre>
+<table><tr><td>one cell of text</td><td>another cell of text</td></tr></table>
+</body></html>""",
+    "short blocks": """<html><body><div><span>tiny</span></div>
+<div><p>This paragraph has more than enough words to be kept by the cleaner.</p></div>
+<noscript><a href="/nojs">Enable JavaScript to continue</a></noscript>
+</body></html>""",
+}
+
+
+@pytest.mark.parametrize("name", list(PAGES))
+def test_same_output_as_the_beautifulsoup_pipeline(name):
+    html = PAGES[name]
+    expected = get_content_of_website(URL, html, 5)
+    result = clean_html(URL, html, 5)
+    assert result["markdown"] == expected["markdown"]
+    assert result["cleaned_html"] == expected["cleaned_html"]
+    assert result["links"] == expected["links"]
+    assert result["metadata"] == extract_metadata(html)
+
+
+def test_css_selector_keeps_the_selected_elements():
+    result = clean_html(URL, PAGES["article"], 1, css_selector="main ul")
+    expected = get_content_of_website(URL, PAGES["article"], 1, css_selector="main ul")
+    assert result["markdown"] == expected["markdown"]
+    assert "First item" in result["markdown"]
+    assert "Markdown output" not in result["markdown"]
+
+
+@pytest.mark.parametrize("css_selector", ["main >>> p", "article.missing"])
+def test_invalid_css_selector(css_selector):
+    with pytest.raises(InvalidCSSSelectorError):
+        clean_html(URL, PAGES["article"], 1, css_selector=css_selector)
+
+
+def test_empty_page():
+    assert clean_html(URL, "") is None
+
+
+def test_media_sources_are_reported():
+    html = '<html><body><p>Watch this clip with words</p><video src="/v.mp4"></video></body></html>'
+    videos = clean_html(URL, html, 1)["media"]["videos"]
+    assert [video["src"] for video in videos] == ["/v.mp4"]
@@ -0,0 +1,109 @@
+from email.utils import formatdate
+
+import pytest
+
+from omniparse.web.http_cache import PageCache, freshness_lifetime
+
+NOW = 1_700_000_000.0
+URL = "https://example.com/page"
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+@pytest.mark.parametrize(
+    "headers, lifetime",
+    [
+        ({"Cache-Control": "max-age=600"}, 600),
+        ({"Cache-Control": "public, max-age=600", "Age": "100"}, 500),
+        ({"Cache-Control": "max-age=60, s-maxage=600"}, 600),
+        ({"Cache-Control": "max-age=60", "Age": "600"}, 0),
+        ({"Cache-Control": "max-age=oops"}, 0),
+        ({"Cache-Control": "no-cache, max-age=600"}, 0),
+        ({"Cache-Control": "no-store"}, None),
+        ({"Date": http_date(NOW), "Expires": http_date(NOW + 300)}, 300),
+        ({"Date": http_date(NOW), "Expires": "0"}, 0),
+        ({"Date": http_date(NOW), "Last-Modified": http_date(NOW - 1000)}, 100),
+        ({"Date": http_date(NOW), "Last-Modified": http_date(NOW - 10**7)}, 24 * 3600),
+        ({}, 0),
+    ],
+)
+def test_freshness_lifetime(headers, lifetime):
+    assert freshness_lifetime(headers, NOW) == lifetime
+
+
+def test_default_ttl_for_pages_without_headers():
+    assert freshness_lifetime({}, NOW, default_ttl=60) == 60
+
+
+def fetched(html, status=200, **headers):
+    return {
+        "html": html,
+        "screenshot": None,
+        "fetch": {"status": status, "headers": headers},
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(str(tmp_path))
+
+
+def test_fresh_page_is_served_from_disk(cache):
+    cache.resolve(URL, fetched("<p>one</p>", **{"Cache-Control": "max-age=600"}))
+    page, headers = cache.lookup(URL)
+    assert page["html"] == "<p>one</p>"
+    assert page["fetch"]["cache"] == "hit"
+    assert headers is None
+
+
+def test_not_modified_reuses_the_stored_page(cache):
+    page = cache.resolve(
+        URL,
+        fetched(
+            "<p>one</p>",
+            ETag='"v1"',
+            **{"Last-Modified": http_date(NOW), "Cache-Control": "no-cache"},
+        ),
+    )
+    assert page["fetch"]["cache"] == "miss"
+
+    # Stale at once, revalidated with the stored validators
+    stale, headers = cache.lookup(URL)
+    assert stale is None
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": http_date(NOW)}
+
+    revalidated = cache.resolve(
+        URL, fetched(None, status=304, **{"Cache-Control": "max-age=600"})
+    )
+    assert revalidated["html"] == "<p>one</p>"
+    assert revalidated["content_hash"] == page["content_hash"]
+    assert revalidated["fetch"]["cache"] == "revalidated"
+    # The 304 refreshed the stored response
+    assert cache.lookup(URL)[0]["fetch"]["cache"] == "hit"
+
+
+def test_not_modified_without_a_stored_page(cache):
+    assert cache.resolve(URL, fetched(None, status=304)) is None
+
+
+def test_changed_content_drops_the_stored_documents(cache):
+    page = cache.resolve(URL, fetched("<p>one</p>", ETag='"v1"'))
+    cache.save_document(URL, page, "options", {"text": "one"})
+    assert cache.load_document(URL, page, "options") == {"text": "one"}
+
+    changed = cache.resolve(URL, fetched("<p>two</p>", ETag='"v2"'))
+    assert cache.load_document(URL, changed, "options") is None
+
+
+@pytest.mark.parametrize(
+    "page",
+    [
+        fetched("<p>gone</p>", status=404),
+        fetched("<p>x</p>", **{"Cache-Control": "no-store"}),
+    ],
+)
+def test_errors_and_no_store_are_not_stored(cache, page):
+    cache.resolve(URL, page)
+    assert cache.lookup(URL) == (None, None)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+
+from omniparse.web.near_duplicates import (  # noqa: E402
+    NearDuplicateIndex,
+    band_ranges,
+    hamming_distance,
+    simhash,
+)
+
+VOCABULARY = [f"word{i}" for i in range(500)]
+
+
+def article(seed, words=400):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def edited(text, position=200, replacement="changed"):
+    words = text.split()
+    words[position] = replacement
+    return " ".join(words)
+
+
+def test_small_edits_flip_few_bits():
+    text = article(0)
+    assert hamming_distance(simhash(text), simhash(edited(text))) <= 3
+
+
+def test_unrelated_pages_are_far_apart():
+    assert hamming_distance(simhash(article(0)), simhash(article(1))) > 10
+
+
+def test_case_and_link_targets_are_ignored():
+    text = article(0)
+    linked = f"[Next page](/list?page=2) {text}"
+    other = f"[NEXT PAGE](/list?page=3) {text.upper()}"
+    assert simhash(linked) == simhash(other)
+
+
+def test_short_texts_have_a_fingerprint():
+    assert simhash("") == simhash("")
+    assert simhash("two words") != simhash("other words")
+
+
+@pytest.mark.parametrize("bands", [1, 4, 7])
+def test_bands_cover_every_bit_once(bands):
+    covered = 0
+    for shift, mask in band_ranges(bands):
+        assert covered & (mask << shift) == 0
+        covered |= mask << shift
+    assert covered == (1 << 64) - 1
+
+
+def test_near_duplicates_join_the_first_page_of_their_cluster():
+    index = NearDuplicateIndex()
+    text = article(0)
+    first = index.check("https://example.com/list?page=1", text)
+    assert first["duplicate_of"] is None
+
+    second = index.check("https://example.com/list?page=2", edited(text))
+    third = index.check("https://example.com/list?page=3", edited(text, 300))
+    for result in (second, third):
+        assert result["duplicate_of"] == "https://example.com/list?page=1"
+        assert result["cluster_id"] == first["cluster_id"]
+        assert result["distance"] <= 3
+
+    assert index.check("https://example.com/other", article(1))["duplicate_of"] is None
+
+
+def test_pages_of_other_sites_are_not_duplicates():
+    index = NearDuplicateIndex()
+    index.check("https://example.com/a", article(0))
+    assert index.check("https://example.org/a", article(0))["duplicate_of"] is None
+
+
+def test_a_page_is_not_a_duplicate_of_itself():
+    index = NearDuplicateIndex()
+    index.check("https://example.com/a", article(0))
+    assert index.check("https://example.com/a", article(0))["duplicate_of"] is None
+
+
+def test_short_pages_are_never_clustered():
+    index = NearDuplicateIndex()
+    index.check("https://example.com/a", "Page not found")
+    result = index.check("https://example.com/b", "Page not found")
+    assert result["duplicate_of"] is None
+    assert result["simhash"] == result["cluster_id"]
+
+
+def test_old_fingerprints_are_forgotten():
+    index = NearDuplicateIndex(max_pages_per_site=2)
+    text = article(0)
+    index.check("https://example.com/1", text)
+    index.check("https://example.com/2", article(1))
+    index.check("https://example.com/3", article(2))
+    assert index.check("https://example.com/4", text)["duplicate_of"] is None